@@ -10,11 +10,9 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+# Chỉ import module nhẹ ở top-level: torch / supervision / cv2 / PySide6 được
+# import lazy trong main() theo mode (--help, --video, --batch không load Qt)
 from src.utils import load_config, setup_logging, create_directory_structure
-from src.detector import create_detector
-from src.tracker import ObjectTracker
-from src.violation_logic import ViolationDetector
-from src.gui import run_gui
 from loguru import logger
 
 
@@ -31,6 +29,17 @@ Examples:
   # Process video file (CLI mode)
   python main.py --video path/to/video.mp4
   
+  # Process all videos in a directory / glob on 4 worker processes
+  python main.py --batch data/videos --workers 4
+  python main.py --batch "recordings/2024-05-*/*.mp4"
+  
+  # Headless service: xử lý liên tục các camera trong config (service.cameras)
+  python main.py --service
+  
+  # Inference server dùng chung: 1 model cho nhiều process camera
+  python main.py --inference-server --model rt-detr
+  python main.py --video cam01.mp4 --model remote
+  
   # Use specific model
   python main.py --gui --model yolov11
   
@@ -43,8 +52,17 @@ Examples:
                        help='Launch GUI application')
     parser.add_argument('--video', type=str,
                        help='Process video file (CLI mode)')
+    parser.add_argument('--batch', type=str, metavar='DIR_OR_GLOB',
+                       help='Process all videos in a directory or glob (batch mode)')
+    parser.add_argument('--service', action='store_true',
+                       help='Run headless multi-camera service (config: service.cameras)')
+    parser.add_argument('--inference-server', action='store_true',
+                       help='Run shared inference server (clients: --model remote)')
+    parser.add_argument('--workers', type=int,
+                       help='Worker processes for batch mode (default: performance.num_workers)')
     parser.add_argument('--model', type=str,
-                       choices=['yolov11', 'yolo-nas', 'rt-detr'],
+                       choices=['yolov11', 'yolo-nas', 'rt-detr', 'yolov11-onnx', 'yolov11-int8',
+                                'remote'],
                        help='Model type (overrides config)')
     parser.add_argument('--config', type=str, default='config.yaml',
                        help='Path to config file (default: config.yaml)')
@@ -74,16 +92,50 @@ Examples:
     # Create directory structure
     create_directory_structure(Path.cwd())
     
+    # Batch mode: model được load trong từng worker process
+    if args.batch:
+        from src.batch_processor import process_batch
+        workers = args.workers or config.get('performance', {}).get('num_workers', 1)
+        try:
+            summary = process_batch(args.batch, config, args.output, workers)
+        except FileNotFoundError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        sys.exit(0 if summary['failed'] == 0 else 1)
+    
+    if not (args.gui or args.video or args.service or args.inference_server):
+        parser.print_help()
+        print("\nPlease specify --gui, --video, --batch, --service or --inference-server")
+        sys.exit(1)
+    
+    if args.inference_server and config['model']['type'] == 'remote':
+        logger.error("Inference server needs a local model (--model yolov11, rt-detr, ...)")
+        sys.exit(1)
+    
     # Initialize components
     try:
+        from src.detector import create_detector
+        if args.gui:
+            from src.gui import run_gui  # fail fast nếu thiếu PySide6
+        if args.service:
+            from src.service import run_service
+        if args.inference_server:
+            from src.inference_server import run_inference_server
+        
         logger.info("Initializing detector...")
         detector = create_detector(config)
         
-        logger.info("Initializing tracker...")
-        tracker = ObjectTracker(config)
-        
-        logger.info("Initializing violation detector...")
-        violation_detector = ViolationDetector(config)
+        # Service tạo tracker / violation detector riêng cho từng camera,
+        # inference server không cần: chỉ GUI và CLI video dùng bộ chung này
+        if args.gui or args.video:
+            from src.tracker import ObjectTracker
+            from src.violation_logic import ViolationDetector
+            
+            logger.info("Initializing tracker...")
+            tracker = ObjectTracker(config)
+            
+            logger.info("Initializing violation detector...")
+            violation_detector = ViolationDetector(config)
         
     except Exception as e:
         logger.error(f"Failed to initialize components: {e}")
@@ -92,130 +144,42 @@ Examples:
         sys.exit(1)
     
     # Run application
-    if args.gui:
+    if args.inference_server:
+        logger.info("Starting inference server...")
+        try:
+            run_inference_server(config, detector)
+        except (OSError, RuntimeError) as e:
+            logger.error(str(e))
+            sys.exit(1)
+    
+    elif args.service:
+        logger.info("Starting service...")
+        try:
+            run_service(config, detector)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+    
+    elif args.gui:
         logger.info("Launching GUI...")
         run_gui(config, detector, tracker, violation_detector)
     
-    elif args.video:
+    else:
         logger.info(f"Processing video: {args.video}")
         process_video_cli(args.video, detector, tracker, violation_detector, config, args.output)
-    
-    else:
-        parser.print_help()
-        print("\nPlease specify --gui or --video")
-        sys.exit(1)
 
 
 def process_video_cli(video_path: str, detector, tracker, violation_detector, 
                      config: dict, output_dir: str):
     """Process video in CLI mode"""
-    import cv2
-    from datetime import datetime
-    from tqdm import tqdm
+    from src.pipeline import process_video
     
-    # Open video
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        logger.error(f"Cannot open video: {video_path}")
+    try:
+        return process_video(video_path, detector, tracker, violation_detector,
+                             config, output_dir)
+    except IOError as e:
+        logger.error(str(e))
         sys.exit(1)
-    
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    logger.info(f"Video: {total_frames} frames, {fps} FPS, {width}x{height}")
-    
-    # Create session directory
-    session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
-    session_dir = Path(output_dir) / session_id
-    session_dir.mkdir(parents=True, exist_ok=True)
-    
-    logger.info(f"Session directory: {session_dir}")
-    
-    # Output video
-    output_video_path = session_dir / 'output.mp4'
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(str(output_video_path), fourcc, fps, (width, height))
-    
-    # Process frames
-    frame_number = 0
-    
-    with tqdm(total=total_frames, desc="Processing") as pbar:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_number += 1
-            timestamp = datetime.now()
-            
-            # Detect
-            detections = detector.detect(frame)
-            
-            # Track
-            tracked_vehicles = tracker.update(detections)
-            
-            # Check violations
-            violations = violation_detector.update(
-                tracked_vehicles, detections, frame, frame_number, timestamp
-            )
-            
-            # Draw on frame
-            annotated = detector.draw_detections(frame, detections)
-            
-            # Draw tracking IDs
-            for vehicle in tracked_vehicles:
-                x1, y1, x2, y2 = vehicle.detection.bbox
-                cv2.putText(annotated, f"ID:{vehicle.track_id}",
-                           (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX,
-                           0.5, (255, 255, 0), 2)
-            
-            # Write frame
-            out.write(annotated)
-            
-            # Update progress
-            pbar.update(1)
-            pbar.set_postfix({
-                'vehicles': len(tracked_vehicles),
-                'violations': len(violation_detector.violations)
-            })
-    
-    cap.release()
-    out.release()
-    
-    # Save violations
-    logger.info(f"Total violations detected: {len(violation_detector.violations)}")
-    
-    if violation_detector.violations:
-        # Save evidence images
-        violations_dir = session_dir / 'violations'
-        violations_dir.mkdir(exist_ok=True)
-        
-        for violation in violation_detector.violations.values():
-            violation_detector.save_violation_evidence(violation, violations_dir)
-        
-        # Save JSON
-        from src.utils import save_violations_json
-        json_path = session_dir / 'violations.json'
-        save_violations_json(violation_detector.violations, json_path)
-        
-        # Generate PDF report
-        try:
-            from src.report_generator import ViolationReportGenerator
-            report_gen = ViolationReportGenerator(config)
-            pdf_path = session_dir / 'report.pdf'
-            report_gen.generate_report(
-                list(violation_detector.violations.values()), 
-                str(pdf_path)
-            )
-            logger.info(f"Report saved: {pdf_path}")
-        except Exception as e:
-            logger.warning(f"Failed to generate PDF: {e}")
-    
-    logger.info(f"Output video: {output_video_path}")
-    logger.info(f"Session saved to: {session_dir}")
-    logger.info("Processing complete!")
 
 
 if __name__ == '__main__':
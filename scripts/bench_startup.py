@@ -0,0 +1,182 @@
+"""
+Startup Time Benchmark
+
+Đo thời gian khởi động (process mới mỗi lần, lấy median) cho từng mode và
+kiểm tra import graph: CLI / batch không được load PySide6, --help không
+được load torch / supervision / cv2.
+
+Scenarios:
+    help  - python main.py --help
+    cli   - import pipeline + tracker + violation logic, tạo ObjectTracker,
+            ViolationDetector (giống --video, KHÔNG load model)
+    gui   - import src.gui, tạo QApplication + MainWindow (Qt offscreen)
+
+Usage:
+    python scripts/bench_startup.py
+    python scripts/bench_startup.py --runs 10 --budget-cli 2.0
+    python scripts/bench_startup.py --with-model   # cli gồm cả create_detector
+
+Exit code 1 nếu vượt budget hoặc import graph sai (dùng được trong CI).
+"""
+
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Budget mặc định (giây, median wall time kể cả khởi động interpreter)
+DEFAULT_BUDGETS = {
+    'help': 0.5,
+    'cli': 3.0,
+    'gui': 5.0,
+}
+
+# Module không được có trong sys.modules sau từng scenario
+FORBIDDEN_MODULES = {
+    'help': ['PySide6', 'torch', 'supervision', 'cv2', 'ultralytics'],
+    'cli': ['PySide6'],
+    'gui': [],
+}
+
+WATCHED_MODULES = ['PySide6', 'torch', 'supervision', 'cv2', 'ultralytics',
+                   'onnxruntime', 'reportlab']
+
+# Code chạy trong subprocess; in ra JSON module đã load ở dòng cuối
+_REPORT = """
+import json as _json, sys as _sys
+print(_json.dumps({{m: m in _sys.modules for m in {watched!r}}}))
+"""
+
+_SCENARIOS = {
+    'help': """
+import runpy, sys
+sys.argv = ['main.py', '--help']
+try:
+    runpy.run_path('main.py', run_name='__main__')
+except SystemExit:
+    pass
+""",
+    'cli': """
+from src.utils import load_config
+config = load_config({config!r})
+from src.tracker import ObjectTracker
+from src.violation_logic import ViolationDetector
+from src.pipeline import process_video
+if {with_model!r}:
+    from src.detector import create_detector
+    create_detector(config)
+ObjectTracker(config)
+ViolationDetector(config)
+""",
+    'gui': """
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from src.utils import load_config
+config = load_config({config!r})
+from PySide6.QtWidgets import QApplication
+from src.gui import MainWindow
+app = QApplication([])
+window = MainWindow(config, None, None, None)
+""",
+}
+
+
+def run_scenario(name: str, runs: int, config: str, with_model: bool) -> dict:
+    """Chạy scenario `runs` lần trong process mới, trả về timing + modules"""
+    code = _SCENARIOS[name].format(config=config, with_model=with_model)
+    code += _REPORT.format(watched=WATCHED_MODULES)
+
+    timings = []
+    modules = {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+
+        if result.returncode != 0:
+            error = (result.stderr.strip().splitlines() or ['unknown error'])[-1]
+            return {'status': 'error', 'error': error}
+
+        timings.append(elapsed)
+        modules = json.loads(result.stdout.strip().splitlines()[-1])
+
+    return {
+        'status': 'ok',
+        'median_s': statistics.median(timings),
+        'min_s': min(timings),
+        'max_s': max(timings),
+        'modules': modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Số lần chạy mỗi scenario')
+    parser.add_argument('--config', type=str, default='config.yaml', help='Config file')
+    parser.add_argument('--scenarios', type=str, nargs='+', default=list(_SCENARIOS),
+                       choices=list(_SCENARIOS), help='Scenarios cần đo')
+    parser.add_argument('--with-model', action='store_true',
+                       help='Scenario cli gồm cả load model (create_detector)')
+    parser.add_argument('--budget-help', type=float, default=DEFAULT_BUDGETS['help'])
+    parser.add_argument('--budget-cli', type=float, default=DEFAULT_BUDGETS['cli'])
+    parser.add_argument('--budget-gui', type=float, default=DEFAULT_BUDGETS['gui'])
+    parser.add_argument('--json', type=str, help='Lưu kết quả ra file JSON')
+
+    args = parser.parse_args()
+    budgets = {'help': args.budget_help, 'cli': args.budget_cli, 'gui': args.budget_gui}
+
+    print("=" * 60)
+    print("⏱️  STARTUP BENCHMARK")
+    print("=" * 60)
+    print(f"Python: {sys.executable}")
+    print(f"Runs per scenario: {args.runs}\n")
+
+    results = {}
+    failed = False
+
+    for name in args.scenarios:
+        result = run_scenario(name, args.runs, args.config, args.with_model)
+        result['budget_s'] = budgets[name]
+        results[name] = result
+
+        if result['status'] != 'ok':
+            # GUI không chạy được khi thiếu PySide6 -> skip, không tính là fail
+            if name == 'gui' and 'PySide6' in result['error']:
+                result['status'] = 'skipped'
+                print(f"⏭️  {name:<5} skipped ({result['error']})")
+            else:
+                failed = True
+                print(f"❌ {name:<5} error: {result['error']}")
+            continue
+
+        leaked = [m for m in FORBIDDEN_MODULES[name] if result['modules'].get(m)]
+        over_budget = result['median_s'] > budgets[name]
+        result['leaked_modules'] = leaked
+        failed |= over_budget or bool(leaked)
+
+        icon = "❌" if over_budget or leaked else "✅"
+        loaded = ", ".join(m for m, v in result['modules'].items() if v) or "-"
+        print(f"{icon} {name:<5} median {result['median_s']:.3f}s "
+              f"(min {result['min_s']:.3f}s, max {result['max_s']:.3f}s) "
+              f"budget {budgets[name]:.2f}s")
+        print(f"   loaded: {loaded}")
+        if leaked:
+            print(f"   ⚠️  must not import: {', '.join(leaked)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved: {args.json}")
+
+    print("\n" + ("❌ Startup budget check FAILED" if failed else "✅ All startup checks passed"))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""
+Microbenchmark ViolationDetector.update
+
+Cho rule engine chạy trên N track synthetic / frame (mặc định 10, 100, 1000),
+đèn chạy chu kỳ đỏ / xanh (đa số frame đỏ: nhánh kiểm tra vi phạm), track
+sinh ra / mất liên tục. Đo mỗi frame:
+    - update():  thời gian cả hàm (gồm copy frame vào / ra evidence buffer)
+    - rules:     update() trừ FrameRingBuffer.put / get (chi phí theo số track;
+                 copy frame bằng chứng theo độ phân giải / số vi phạm)
+    - bộ nhớ:    tracemalloc, peak cấp phát trong một update() và bộ nhớ giữ
+                 lại tăng dần theo frame (lượt chạy riêng, không đo thời gian)
+
+Fail (exit 1) khi:
+    - rules tăng nhanh hơn tuyến tính theo số track: số mũ log-log giữa hai
+      N liên tiếp > --max-exponent
+    - rules p95 tại --rush-hour track vượt --budget-ms
+
+Detections / TrackedObject tạo sẵn ngoài phần đo (như khi lấy từ tracker).
+Log chạy với sink rỗng ở logging.level của config (chi phí format log như
+production, không ghi ra console / file).
+
+Usage:
+    python scripts/bench_violation_update.py
+    python scripts/bench_violation_update.py --tracks 10 100 1000 3000 --frames 300
+    python scripts/bench_violation_update.py --json bench/violation_update.json
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from src.utils import load_config
+from src.detector import CLASS_IDS, DetectionBatch
+
+# Chu kỳ đèn (frame): đỏ rồi xanh
+RED_FRAMES = 240
+GREEN_FRAMES = 60
+
+
+# ============================================================================
+# SYNTHETIC TRACKS
+# ============================================================================
+
+class TrackScenario:
+    """
+    N track mỗi frame, deterministic theo seed
+
+    - ~75% track nằm trong ROI, còn lại ở lane ngược chiều / mép frame
+    - Đa số đứng yên (hàng chờ đèn đỏ), một phần đi ngang (hướng đang xanh),
+      ít xe chạy về phía camera (vượt đèn đỏ -> tạo violation + evidence)
+    - Mỗi track sống 60-300 frame (hoặc tới khi ra khỏi frame) rồi được thay
+      bằng track ID mới
+    """
+
+    def __init__(self, n_tracks: int, width: int, height: int, fps: float,
+                 violator_rate: float = 0.01, seed: int = 0):
+        self.n = n_tracks
+        self.violator_rate = violator_rate
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.rng = np.random.default_rng(seed)
+        self.next_id = 1
+
+        self.ids = np.zeros(n_tracks, dtype=np.int64)
+        self.boxes = np.zeros((n_tracks, 4), dtype=np.float64)
+        self.velocity = np.zeros((n_tracks, 2), dtype=np.float64)
+        self.expires = np.zeros(n_tracks, dtype=np.int64)
+        self.classes = np.zeros(n_tracks, dtype=np.int64)
+        self._respawn(np.arange(n_tracks), frame_number=0)
+
+        self.light_box = (int(0.9 * width), 20, int(0.9 * width) + 20, 60)
+        stop_y = int(0.45 * height)
+        self.stop_line_box = (int(0.25 * width), stop_y - 3, int(0.85 * width), stop_y + 3)
+
+    def _respawn(self, indices: np.ndarray, frame_number: int):
+        k = len(indices)
+        if not k:
+            return
+        rng, w, h = self.rng, self.width, self.height
+
+        self.ids[indices] = np.arange(self.next_id, self.next_id + k)
+        self.next_id += k
+
+        in_roi = rng.random(k) < 0.75
+        cx = np.where(in_roi, rng.uniform(0.3, 0.8, k), rng.uniform(0.02, 0.2, k)) * w
+        cy = rng.uniform(0.25, 0.9, k) * h
+        bw = rng.uniform(0.03, 0.1, k) * w
+        bh = bw * rng.uniform(0.8, 1.2, k)
+        self.boxes[indices] = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+
+        # violator_rate chạy về phía camera, 25% đi ngang (hướng đang xanh), còn lại đứng yên
+        motion = rng.random(k)
+        forward = motion < self.violator_rate
+        vx = np.where(~forward & (motion < self.violator_rate + 0.25),
+                      rng.choice([-12.0, 12.0], k), 0.0)
+        vy = np.where(forward, rng.uniform(2, 8, k), 0.0)
+        self.velocity[indices] = np.stack([vx, vy], axis=1)
+
+        self.expires[indices] = frame_number + rng.integers(60, 300, k)
+        self.classes[indices] = np.where(rng.random(k) < 0.7, CLASS_IDS['car'], CLASS_IDS['motobike'])
+
+    def light_class(self, frame_number: int) -> str:
+        phase = frame_number % (RED_FRAMES + GREEN_FRAMES)
+        return 'red_light' if phase < RED_FRAMES else 'green_light'
+
+    def step(self, frame_number: int, tracked_objects: dict):
+        """
+        Sang frame tiếp theo
+
+        Returns:
+            (tracked vehicles, DetectionBatch) như output tracker / detector
+        """
+        from src.tracker import TrackedObject
+
+        x1, y1, x2, _ = self.boxes.T
+        gone = (self.expires <= frame_number) | (y1 >= self.height) | (x2 <= 0) | (x1 >= self.width)
+        self._respawn(np.flatnonzero(gone), frame_number)
+        self.boxes += np.hstack([self.velocity, self.velocity])
+        # Jitter detection ±1px (box đứng yên vẫn dao động nhẹ như detector thật)
+        jitter = self.rng.integers(-1, 2, (self.n, 4))
+        xyxy = np.clip(self.boxes + jitter, 0, [self.width - 1, self.height - 1] * 2)
+
+        xyxy = np.vstack([xyxy, [self.light_box, self.stop_line_box]])
+        class_id = np.concatenate([self.classes, [CLASS_IDS[self.light_class(frame_number)],
+                                                  CLASS_IDS['stop_line']]])
+        confidence = np.full(len(class_id), 0.85, dtype=np.float32)
+        batch = DetectionBatch(xyxy, confidence, class_id)
+
+        vehicles = []
+        for i, track_id in enumerate(self.ids.tolist()):
+            det = batch[i]
+            tracked = tracked_objects.get(track_id)
+            if tracked is None:
+                tracked = TrackedObject(track_id=track_id, detection=det)
+                tracked_objects[track_id] = tracked
+            tracked.update_position(det)
+            vehicles.append(tracked)
+
+        # Bỏ track đã chết (giống tracker cleanup)
+        if len(tracked_objects) > 2 * self.n:
+            alive = set(self.ids.tolist())
+            for track_id in [t for t in tracked_objects if t not in alive]:
+                del tracked_objects[track_id]
+        return vehicles, batch
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _make_detector(config: dict):
+    from src.violation_logic import ViolationDetector
+
+    violation_detector = ViolationDetector(config)
+    violation_detector.fps = 30.0
+    return violation_detector
+
+
+def _engine_memory() -> int:
+    """Bytes đang giữ bởi allocation trong violation_logic / frame_buffer"""
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(True, '*violation_logic.py'),
+        tracemalloc.Filter(True, '*frame_buffer.py')])
+    return sum(stat.size for stat in snapshot.statistics('filename'))
+
+
+def bench_tracks(n_tracks: int, config: dict, frames: int, warmup: int,
+                 width: int, height: int, violator_rate: float = 0.01, seed: int = 0) -> dict:
+    """Thời gian + cấp phát mỗi frame của update() với n_tracks track"""
+    frame = np.zeros((height, width, 3), dtype=np.uint8)
+    start_time = datetime(2024, 1, 1, 8, 0, 0)
+
+    def run(measure_memory: bool):
+        scenario = TrackScenario(n_tracks, width, height, 30.0, violator_rate, seed)
+        violation_detector = _make_detector(config)
+        tracked_objects = {}
+
+        # Tách thời gian copy frame vào / ra evidence buffer khỏi rule engine
+        buffer = violation_detector.frame_buffer
+        buffer_time = [0]
+
+        def timed(method):
+            def wrapper(*args, **kwargs):
+                t0 = time.perf_counter_ns()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    buffer_time[0] += time.perf_counter_ns() - t0
+            return wrapper
+
+        buffer.put = timed(buffer.put)
+        buffer.get = timed(buffer.get)
+
+        update_ns, rules_ns, peak_bytes = [], [], []
+        retained = [0, 0]  # Bộ nhớ của rule engine sau warm-up, cuối lượt chạy
+        for frame_number in range(1, warmup + frames + 1):
+            vehicles, detections = scenario.step(frame_number, tracked_objects)
+            timestamp = start_time + timedelta(seconds=frame_number / 30.0)
+
+            if measure_memory:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+            buffer_time[0] = 0
+            t0 = time.perf_counter_ns()
+            violation_detector.update(vehicles, detections, frame, frame_number, timestamp)
+            elapsed = time.perf_counter_ns() - t0
+            if measure_memory:
+                _, peak = tracemalloc.get_traced_memory()
+            # Như EvidenceWriter: ghi xong thì bỏ evidence frames khỏi RAM
+            for violation in violation_detector.pop_finalized_violations():
+                violation.evidence_frames = []
+
+            if measure_memory and frame_number in (warmup, warmup + frames):
+                retained[frame_number > warmup] = _engine_memory()
+            if frame_number <= warmup:
+                continue
+            if measure_memory:
+                peak_bytes.append(peak - before)
+            else:
+                update_ns.append(elapsed)
+                rules_ns.append(elapsed - buffer_time[0])
+        return update_ns, rules_ns, peak_bytes, retained, violation_detector
+
+    update_ns, rules_ns, _, _, violation_detector = run(measure_memory=False)
+
+    tracemalloc.start()
+    try:
+        _, _, peak_bytes, retained, _ = run(measure_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    def ms(values, q):
+        return round(float(np.percentile(values, q)) / 1e6, 4)
+
+    return {
+        'tracks': n_tracks,
+        'frames': frames,
+        'update_ms': {'p50': ms(update_ns, 50), 'p95': ms(update_ns, 95),
+                      'mean': round(float(np.mean(update_ns)) / 1e6, 4)},
+        'rules_ms': {'p50': ms(rules_ns, 50), 'p95': ms(rules_ns, 95), 'p99': ms(rules_ns, 99),
+                     'mean': round(float(np.mean(rules_ns)) / 1e6, 4)},
+        'rules_us_per_track': round(float(np.median(rules_ns)) / 1e3 / n_tracks, 3),
+        'alloc_peak_kb': {'p50': round(float(np.percentile(peak_bytes, 50)) / 1024, 1),
+                          'p95': round(float(np.percentile(peak_bytes, 95)) / 1024, 1)},
+        'retained_kb_per_frame': round((retained[1] - retained[0]) / frames / 1024, 2),
+        'violations': len(violation_detector.violations)
+    }
+
+
+def check_scaling(results: list, max_exponent: float) -> list:
+    """
+    Số mũ log-log của rules p50 giữa các N liên tiếp (1.0 = tuyến tính)
+
+    Returns:
+        List (n_from, n_to, exponent) vượt max_exponent
+    """
+    failures = []
+    for a, b in zip(results, results[1:]):
+        t_a, t_b = a['rules_ms']['p50'], b['rules_ms']['p50']
+        if t_a <= 0 or b['tracks'] <= a['tracks']:
+            continue
+        exponent = math.log(t_b / t_a) / math.log(b['tracks'] / a['tracks'])
+        b['scaling_exponent'] = round(exponent, 3)
+        if exponent > max_exponent:
+            failures.append((a['tracks'], b['tracks'], exponent))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ViolationDetector.update microbenchmark')
+    parser.add_argument('--config', type=str, default='config.yaml', help='Config file')
+    parser.add_argument('--tracks', type=int, nargs='+', default=[10, 100, 1000],
+                       help='Số track / frame')
+    parser.add_argument('--frames', type=int, default=300, help='Số frame đo mỗi N')
+    parser.add_argument('--warmup', type=int, default=60, help='Số frame đầu không tính')
+    parser.add_argument('--resolution', type=str, default='1280x720', help='WxH')
+    parser.add_argument('--violator-rate', type=float, default=0.01,
+                       help='Tỉ lệ track chạy về phía camera khi đèn đỏ (tạo violation)')
+    parser.add_argument('--max-exponent', type=float, default=1.25,
+                       help='Fail khi rules tăng nhanh hơn N^x giữa hai N liên tiếp')
+    parser.add_argument('--rush-hour', type=int, default=100,
+                       help='Số track / frame giờ cao điểm (áp dụng --budget-ms)')
+    parser.add_argument('--budget-ms', type=float, default=1.0,
+                       help='Ngưỡng rules p95 (ms / frame) tại --rush-hour track')
+    parser.add_argument('--json', type=str, help='Lưu kết quả ra file JSON')
+
+    args = parser.parse_args()
+    config = load_config(args.config)
+    width, height = (int(v) for v in args.resolution.lower().split('x'))
+
+    # Sink rỗng: log vẫn được format / lọc như production nhưng không in ra
+    logger.remove()
+    logger.add(lambda message: None, level=config.get('logging', {}).get('level', 'INFO'))
+
+    results = []
+    for n_tracks in sorted(args.tracks):
+        print(f"▶️  {n_tracks} tracks / frame ...", flush=True)
+        results.append(bench_tracks(n_tracks, config, args.frames, args.warmup, width, height,
+                                    args.violator_rate))
+
+    failures = check_scaling(results, args.max_exponent)
+
+    print(f"\n{'tracks':>7} {'update p50':>11} {'rules p50':>10} {'rules p95':>10} "
+          f"{'us/track':>9} {'exp':>6} {'alloc p50':>10} {'alloc p95':>10} {'retained':>10}")
+    for r in results:
+        exponent = r.get('scaling_exponent')
+        print(f"{r['tracks']:>7} {r['update_ms']['p50']:>9.3f}ms {r['rules_ms']['p50']:>8.3f}ms "
+              f"{r['rules_ms']['p95']:>8.3f}ms {r['rules_us_per_track']:>9.2f} "
+              f"{exponent if exponent is not None else '-':>6} "
+              f"{r['alloc_peak_kb']['p50']:>8.1f}KB {r['alloc_peak_kb']['p95']:>8.1f}KB "
+              f"{r['retained_kb_per_frame']:>8.2f}KB")
+
+    over_budget = [r for r in results
+                   if r['tracks'] <= args.rush_hour and r['rules_ms']['p95'] > args.budget_ms]
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'created': datetime.now().isoformat(), 'resolution': args.resolution,
+                       'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 Saved: {args.json}")
+
+    for n_from, n_to, exponent in failures:
+        print(f"❌ Super-linear scaling {n_from} -> {n_to} tracks: "
+              f"N^{exponent:.2f} (max N^{args.max_exponent})")
+    for r in over_budget:
+        print(f"❌ {r['tracks']} tracks: rules p95 {r['rules_ms']['p95']:.3f} ms "
+              f"> budget {args.budget_ms} ms")
+    if failures or over_budget:
+        sys.exit(1)
+    print(f"\n✅ Linear scaling, rules p95 <= {args.budget_ms} ms at {args.rush_hour} tracks")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+"""
+Pipeline Benchmark
+
+Chạy một bộ video cố định (hoặc video synthetic tạo deterministic) qua đủ các
+stage như production: decode → detect → track → rules (ViolationDetector.update)
+→ annotate → encode, đo từng stage trên từng frame.
+
+Report:
+    - p50 / p95 / p99 / mean / max latency mỗi stage (ms / frame; detect chạy
+      theo batch performance.batch_size, latency = thời gian batch / số frame)
+    - FPS end-to-end, peak RSS, CPU utilization (CPU time / wall time, >100% = đa core)
+    - JSON (--json), so sánh với baseline (--baseline) theo ngưỡng regression
+
+Stages chạy tuần tự trên 1 thread để latency của từng stage không bị lẫn;
+throughput của pipeline đa luồng xem log của process_video().
+
+Usage:
+    python scripts/benchmark_pipeline.py data/videos/bench_*.mp4
+    python scripts/benchmark_pipeline.py --synthetic 2 --frames 300 --model yolov11-onnx
+
+    # Không model: MockDetector trả ground truth (đo tracker / rules / writers + accuracy)
+    python scripts/benchmark_pipeline.py --synthetic 2 --frames 900 --mock
+
+    # Lưu baseline, lần sau so sánh (exit 1 nếu chậm / tốn RAM hơn > 10%)
+    python scripts/benchmark_pipeline.py --synthetic 2 --save-baseline bench/baseline.json
+    python scripts/benchmark_pipeline.py --synthetic 2 --baseline bench/baseline.json --threshold 0.1
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from src.utils import load_config
+
+STAGES = ('decode', 'detect', 'track', 'rules', 'annotate', 'encode')
+PERCENTILES = (50, 95, 99)
+
+
+# ============================================================================
+# RESOURCES
+# ============================================================================
+
+def current_rss_mb() -> float:
+    """RSS hiện tại của process (MB)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+class ResourceMonitor:
+    """Lấy mẫu RSS định kỳ (peak) + CPU time của process trong khoảng đo"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> 'ResourceMonitor':
+        self._wall = time.perf_counter()
+        self._cpu = sum(os.times()[:2])
+        self.peak_rss_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.wall_time = time.perf_counter() - self._wall
+        self.cpu_time = sum(os.times()[:2]) - self._cpu
+        self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss_mb = max(self.peak_rss_mb, current_rss_mb())
+
+    @property
+    def cpu_percent(self) -> float:
+        return 100.0 * self.cpu_time / self.wall_time if self.wall_time > 0 else 0.0
+
+
+def summarize(samples) -> dict:
+    """Percentiles (ms) của danh sách latency (giây)"""
+    if not samples:
+        return {'count': 0}
+    values = np.asarray(samples) * 1000.0
+    summary = {'count': int(values.size)}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = round(float(np.percentile(values, p)), 3)
+    summary['mean'] = round(float(values.mean()), 3)
+    summary['max'] = round(float(values.max()), 3)
+    return summary
+
+
+# ============================================================================
+# SYNTHETIC VIDEO
+# ============================================================================
+
+def make_synthetic_video(path: Path, frames: int, width: int, height: int, seed: int,
+                         config: dict) -> Path:
+    """Video ngã tư synthetic deterministic (src/synthetic.py) + <tên>.gt.json"""
+    from src.synthetic import SyntheticScene
+
+    fps = config.get('synthetic', {}).get('fps', 30)
+    scene = SyntheticScene.from_config(config, width=width, height=height,
+                                       duration=frames / fps, seed=seed)
+    return scene.write_video(path)
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def bench_video(video_path: str, detector, config: dict, output_dir: Path,
+                warmup_frames: int = 10, max_frames: int = 0) -> dict:
+    """
+    Chạy 1 video qua tất cả stages, trả về latency samples (giây) mỗi stage
+    (MockDetector: kèm accuracy so với ground truth của scene)
+    """
+    from src.tracker import ObjectTracker
+    from src.violation_logic import ViolationDetector
+    from src.clock import create_clock
+
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    clock = create_clock(config, video_path, fps)
+
+    tracker = ObjectTracker(config)
+    violation_detector = ViolationDetector(config)
+    violation_detector.fps = clock.fps
+    out = cv2.VideoWriter(str(output_dir / f"{Path(video_path).stem}_bench.mp4"),
+                          cv2.VideoWriter_fourcc(*'mp4v'), fps or 30, (width, height))
+
+    samples = {stage: [] for stage in STAGES}
+    frame_number = 0
+    measured = 0
+    start = None
+    done = False
+
+    while not done:
+        # Decode một batch (cùng batch size với pipeline CLI)
+        batch = []
+        while len(batch) < detector.batch_size:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            elapsed = time.perf_counter() - t0
+            if not ret or (max_frames and frame_number >= max_frames):
+                done = True
+                break
+            frame_number += 1
+            timestamp = clock.timestamp(frame_number, cap.get(cv2.CAP_PROP_POS_MSEC))
+            batch.append((frame_number, frame, timestamp, elapsed))
+        if not batch:
+            break
+
+        t0 = time.perf_counter()
+        results = detector.detect_batch([frame for _, frame, _, _ in batch])
+        detect_time = (time.perf_counter() - t0) / len(batch)
+
+        for (number, frame, timestamp, decode_time), detections in zip(batch, results):
+            t0 = time.perf_counter()
+            tracked_vehicles = tracker.update(detections)
+            t1 = time.perf_counter()
+            violation_detector.update(tracked_vehicles, detections, frame, number, timestamp)
+            violation_detector.pop_finalized_violations()
+            t2 = time.perf_counter()
+            annotated = detector.draw_detections(frame, detections)
+            for vehicle in tracked_vehicles:
+                x1, y1, x2, y2 = vehicle.detection.bbox
+                cv2.putText(annotated, f"ID:{vehicle.track_id}", (x1, y2 + 20),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+            t3 = time.perf_counter()
+            out.write(annotated)
+            t4 = time.perf_counter()
+
+            # Bỏ warm-up frames (cache lạnh, lazy init)
+            if number <= warmup_frames:
+                continue
+            if start is None:
+                start = t0 - decode_time - detect_time
+            measured += 1
+            for stage, value in zip(STAGES, (decode_time, detect_time, t1 - t0,
+                                              t2 - t1, t3 - t2, t4 - t3)):
+                samples[stage].append(value)
+
+    wall = time.perf_counter() - start if start is not None else 0.0
+    cap.release()
+    out.release()
+
+    result = {
+        'video': str(video_path),
+        'resolution': f"{width}x{height}",
+        'frames': frame_number,
+        'measured_frames': measured,
+        'wall_time_s': round(wall, 3),
+        'fps': round(measured / wall, 2) if wall > 0 else 0.0,
+        'violations': len(violation_detector.violations),
+        'samples': samples
+    }
+    if hasattr(detector, 'scene') and not max_frames:
+        from src.synthetic import evaluate
+        result['accuracy'] = evaluate(violation_detector.violations.values(), detector.scene)
+    return result
+
+
+def run_benchmark(videos, config: dict, warmup_frames: int, max_frames: int,
+                  mock: bool = False) -> dict:
+    """mock: MockDetector (ground truth của video synthetic) thay cho model"""
+    from src.detector import create_detector
+    from src.synthetic import MockDetector
+
+    rss_before = current_rss_mb()
+    detector = MockDetector.for_video(videos[0], config) if mock else create_detector(config)
+    rss_model = current_rss_mb()
+
+    results = []
+    all_samples = {stage: [] for stage in STAGES}
+    with ResourceMonitor() as monitor, tempfile.TemporaryDirectory() as tmp:
+        for video in videos:
+            print(f"▶️  {video}")
+            if mock:
+                detector = MockDetector.for_video(video, config)
+            result = bench_video(video, detector, config, Path(tmp), warmup_frames, max_frames)
+            for stage in STAGES:
+                all_samples[stage].extend(result['samples'][stage])
+            samples = result.pop('samples')
+            result['stages'] = {stage: summarize(samples[stage]) for stage in STAGES}
+            results.append(result)
+
+    measured = sum(r['measured_frames'] for r in results)
+    wall = sum(r['wall_time_s'] for r in results)
+    return {
+        'created': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'model': 'mock' if mock else config['model']['type'],
+            'device': getattr(detector, 'device', None),
+            'batch_size': detector.batch_size
+        },
+        'frames': measured,
+        'fps': round(measured / wall, 2) if wall > 0 else 0.0,
+        'stages': {stage: summarize(all_samples[stage]) for stage in STAGES},
+        'peak_rss_mb': round(monitor.peak_rss_mb, 1),
+        'model_rss_mb': round(rss_model - rss_before, 1),
+        'cpu_percent': round(monitor.cpu_percent, 1),
+        'videos': results
+    }
+
+
+# ============================================================================
+# BASELINE
+# ============================================================================
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    So sánh với baseline: FPS giảm, p95 mỗi stage / peak RSS tăng quá threshold
+    (tỉ lệ, 0.1 = 10%) là regression
+
+    Returns:
+        List (metric, baseline, current, change) của các regression
+    """
+    checks = [('fps', baseline.get('fps'), current['fps'], False),
+              ('peak_rss_mb', baseline.get('peak_rss_mb'), current['peak_rss_mb'], True)]
+    for stage in STAGES:
+        checks.append((f"{stage}.p95", baseline.get('stages', {}).get(stage, {}).get('p95'),
+                       current['stages'][stage].get('p95'), True))
+
+    regressions = []
+    for metric, old, new, higher_is_worse in checks:
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (change > threshold) if higher_is_worse else (change < -threshold):
+            regressions.append((metric, old, new, change))
+    return regressions
+
+
+def print_report(report: dict):
+    env = report['environment']
+    print(f"\n📊 {report['frames']} frames | model {env['model']} ({env['device']}, "
+          f"batch {env['batch_size']})")
+    print(f"{'stage':<10} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9} {'max':>9}   (ms / frame)")
+    for stage in STAGES:
+        s = report['stages'][stage]
+        if s['count']:
+            print(f"{stage:<10} {s['p50']:>9.3f} {s['p95']:>9.3f} {s['p99']:>9.3f} "
+                  f"{s['mean']:>9.3f} {s['max']:>9.3f}")
+    print(f"\nFPS: {report['fps']:.1f} | peak RSS: {report['peak_rss_mb']:.0f} MB "
+          f"(model {report['model_rss_mb']:.0f} MB) | CPU: {report['cpu_percent']:.0f}%")
+    for video in report['videos']:
+        accuracy = video.get('accuracy')
+        if accuracy:
+            print(f"🎯 {Path(video['video']).name}: {accuracy['true_positives']}/"
+                  f"{accuracy['ground_truth']} violations, {accuracy['false_positives']} false "
+                  f"positives (precision {accuracy['precision']:.2f}, recall {accuracy['recall']:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Full pipeline benchmark')
+    parser.add_argument('videos', type=str, nargs='*', help='Video files')
+    parser.add_argument('--config', type=str, default='config.yaml', help='Config file')
+    parser.add_argument('--model', type=str, help='Model type (ghi đè config)')
+    parser.add_argument('--mock', action='store_true',
+                       help='MockDetector: detections ground truth của video synthetic '
+                            '(cần <tên>.gt.json), đo tracker / rules / writers + accuracy')
+    parser.add_argument('--synthetic', type=int, default=0,
+                       help='Số video synthetic deterministic (khi không truyền videos)')
+    parser.add_argument('--resolution', type=str, default='1280x720', help='Synthetic: WxH')
+    parser.add_argument('--frames', type=int, default=300, help='Synthetic: số frame / video')
+    parser.add_argument('--max-frames', type=int, default=0, help='Giới hạn frame / video (0 = hết)')
+    parser.add_argument('--warmup', type=int, default=10, help='Số frame đầu không tính')
+    parser.add_argument('--json', type=str, help='Lưu kết quả ra file JSON')
+    parser.add_argument('--baseline', type=str, help='So sánh với baseline JSON')
+    parser.add_argument('--save-baseline', type=str, help='Lưu kết quả làm baseline')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                       help='Ngưỡng regression so với baseline (0.10 = 10%%)')
+
+    args = parser.parse_args()
+
+    # Log của pipeline (vi phạm, ...) không nằm trong phép đo
+    logger.remove()
+    logger.add(sys.stderr, level='ERROR')
+
+    config = load_config(args.config)
+    if args.model:
+        config['model']['type'] = args.model
+
+    with tempfile.TemporaryDirectory() as synthetic_dir:
+        videos = list(args.videos)
+        if not videos:
+            width, height = (int(v) for v in args.resolution.lower().split('x'))
+            for i in range(max(1, args.synthetic)):
+                path = Path(synthetic_dir) / f"synthetic_{i}.mp4"
+                videos.append(str(make_synthetic_video(path, args.frames, width, height,
+                                                       seed=i, config=config)))
+
+        report = run_benchmark(videos, config, args.warmup, args.max_frames, args.mock)
+
+    print_report(report)
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"💾 Saved: {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ Regressions vs {args.baseline} (threshold {args.threshold:.0%}):")
+            for metric, old, new, change in regressions:
+                print(f"   {metric:<14} {old:>10} -> {new:>10} ({change:+.1%})")
+            sys.exit(1)
+        print(f"\n✅ No regression vs {args.baseline} (threshold {args.threshold:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""
+Export YOLOv11 (.pt) sang ONNX / OpenVINO IR + kiểm tra parity
+
+Usage:
+    # Export ONNX (dynamic batch)
+    python scripts/export_onnx.py --format onnx
+
+    # Export OpenVINO IR
+    python scripts/export_onnx.py --format openvino
+
+    # Export + so sánh kết quả với YOLOv11Detector trên frames từ video
+    python scripts/export_onnx.py --format onnx --check-parity --video data/videos/test.mp4
+"""
+
+import sys
+import time
+import copy
+import argparse
+import cv2
+import numpy as np
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config
+from src.detector import resolve_weights_path
+
+
+def export_model(weights: str, export_format: str, img_size: int, half: bool = False) -> Path:
+    """Export bằng Ultralytics, trả về path của file/thư mục đã export"""
+    from ultralytics import YOLO
+
+    weights_path = resolve_weights_path(weights)
+    print(f"📂 Loading weights: {weights_path}")
+    model = YOLO(str(weights_path))
+
+    print(f"📦 Exporting to {export_format} (imgsz={img_size})...")
+    start = time.time()
+    if export_format == 'onnx':
+        exported = model.export(format='onnx', imgsz=img_size, dynamic=True,
+                                simplify=True, half=half)
+    else:
+        exported = model.export(format='openvino', imgsz=img_size, half=half)
+    print(f"✅ Exported in {time.time() - start:.1f}s: {exported}")
+
+    return Path(exported)
+
+
+def load_sample_frames(video: str = None, images: str = None, num_frames: int = 20) -> list:
+    """Lấy frames mẫu đều nhau từ video hoặc thư mục ảnh"""
+    frames = []
+
+    if video:
+        cap = cv2.VideoCapture(video)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        step = max(1, total // num_frames)
+        for idx in range(0, total, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+            if len(frames) >= num_frames:
+                break
+        cap.release()
+
+    elif images:
+        paths = sorted(p for p in Path(images).iterdir()
+                       if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+        for path in paths[:num_frames]:
+            frame = cv2.imread(str(path))
+            if frame is not None:
+                frames.append(frame)
+
+    return frames
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare_detections(reference: list, candidate: list, iou_threshold: float = 0.9) -> dict:
+    """Match từng detection reference với candidate cùng class có IoU cao nhất"""
+    matched, ious, conf_deltas = 0, [], []
+    used = set()
+
+    for ref in reference:
+        best_j, best_iou = None, 0.0
+        for j, cand in enumerate(candidate):
+            if j in used or cand.class_id != ref.class_id:
+                continue
+            iou = _iou(ref.bbox, cand.bbox)
+            if iou > best_iou:
+                best_j, best_iou = j, iou
+        if best_j is not None and best_iou >= iou_threshold:
+            used.add(best_j)
+            matched += 1
+            ious.append(best_iou)
+            conf_deltas.append(abs(ref.confidence - candidate[best_j].confidence))
+
+    return {
+        'reference': len(reference),
+        'candidate': len(candidate),
+        'matched': matched,
+        'ious': ious,
+        'conf_deltas': conf_deltas
+    }
+
+
+def check_parity(config: dict, exported: Path, runtime: str, frames: list,
+                 min_match_rate: float = 0.95) -> bool:
+    """So sánh ONNXDetector với YOLOv11Detector trên cùng frames"""
+    from src.detector import YOLOv11Detector, ONNXDetector
+
+    print("\n" + "=" * 60)
+    print(f"🔍 PARITY CHECK: YOLOv11Detector vs ONNXDetector ({runtime})")
+    print("=" * 60)
+
+    onnx_config = copy.deepcopy(config)
+    onnx_config['model'].setdefault('onnx', {})
+    onnx_config['model']['onnx'].update({
+        'weights': str(exported),
+        'runtime': runtime,
+        'conf_threshold': config['model']['yolov11'].get('conf_threshold', 0.25),
+        'iou_threshold': config['model']['yolov11'].get('iou_threshold', 0.45),
+    })
+
+    reference_detector = YOLOv11Detector(config)
+    onnx_detector = ONNXDetector(onnx_config)
+
+    # Warm-up
+    reference_detector.detect(frames[0])
+    onnx_detector.detect(frames[0])
+
+    totals = {'reference': 0, 'candidate': 0, 'matched': 0}
+    all_ious, all_deltas = [], []
+    ref_time, onnx_time = 0.0, 0.0
+
+    for frame in frames:
+        t0 = time.perf_counter()
+        reference = reference_detector.detect(frame)
+        ref_time += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        candidate = onnx_detector.detect(frame)
+        onnx_time += time.perf_counter() - t0
+
+        result = compare_detections(reference, candidate)
+        for key in totals:
+            totals[key] += result[key]
+        all_ious.extend(result['ious'])
+        all_deltas.extend(result['conf_deltas'])
+
+    match_rate = totals['matched'] / totals['reference'] if totals['reference'] else 1.0
+    n = len(frames)
+
+    print(f"\n📊 Frames: {n}")
+    print(f"   - Detections (PyTorch / {runtime}): {totals['reference']} / {totals['candidate']}")
+    print(f"   - Matched (same class, IoU >= 0.9): {totals['matched']} ({match_rate:.1%})")
+    if all_ious:
+        print(f"   - Mean IoU: {np.mean(all_ious):.4f}")
+        print(f"   - Max confidence delta: {np.max(all_deltas):.4f}")
+    print(f"\n⏱️  Latency (ms/frame): PyTorch {ref_time / n * 1000:.1f} | "
+          f"{runtime} {onnx_time / n * 1000:.1f} | "
+          f"speedup {ref_time / onnx_time if onnx_time > 0 else 0:.2f}x")
+
+    passed = match_rate >= min_match_rate
+    print(f"\n{'✅ PARITY OK' if passed else '❌ PARITY FAILED'} "
+          f"(match rate {match_rate:.1%}, required {min_match_rate:.0%})")
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export YOLOv11 to ONNX / OpenVINO')
+    parser.add_argument('--config', type=str, default='config.yaml',
+                       help='Path to config file (default: config.yaml)')
+    parser.add_argument('--weights', type=str,
+                       help='PyTorch weights (default: model.yolov11.weights)')
+    parser.add_argument('--format', type=str, default='onnx', choices=['onnx', 'openvino'],
+                       help='Export format')
+    parser.add_argument('--img-size', type=int, default=640, help='Input size')
+    parser.add_argument('--half', action='store_true', help='Export FP16 weights')
+    parser.add_argument('--skip-export', type=str, metavar='PATH',
+                       help='Không export, dùng model đã có tại PATH')
+    parser.add_argument('--check-parity', action='store_true',
+                       help='So sánh kết quả với YOLOv11Detector')
+    parser.add_argument('--video', type=str, help='Video lấy frames cho parity check')
+    parser.add_argument('--images', type=str, help='Thư mục ảnh cho parity check')
+    parser.add_argument('--num-frames', type=int, default=20, help='Số frames cho parity check')
+    parser.add_argument('--min-match-rate', type=float, default=0.95,
+                       help='Tỉ lệ detections khớp tối thiểu để pass')
+
+    args = parser.parse_args()
+    config = load_config(args.config)
+
+    if args.skip_export:
+        exported = Path(args.skip_export)
+    else:
+        weights = args.weights or config['model']['yolov11']['weights']
+        exported = export_model(weights, args.format, args.img_size, args.half)
+
+    runtime = 'openvino' if args.format == 'openvino' else 'onnxruntime'
+    print(f"\n💡 Dùng model này: đặt trong config.yaml")
+    print(f"   model.type: yolov11-onnx")
+    print(f"   model.onnx.weights: {exported}")
+    print(f"   model.onnx.runtime: {runtime}")
+
+    if args.check_parity:
+        frames = load_sample_frames(args.video, args.images, args.num_frames)
+        if not frames:
+            print("❌ Không có frames cho parity check (dùng --video hoặc --images)")
+            sys.exit(1)
+        if not check_parity(config, exported, runtime, frames, args.min_match_rate):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
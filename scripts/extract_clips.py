@@ -0,0 +1,78 @@
+"""
+Cắt clip bằng chứng cho các vi phạm của một (hoặc nhiều) session
+
+Chạy sau khi xử lý video xong; dùng vị trí vi phạm trong nguồn đã ghi trong
+violations.json (source.video / pts_seconds), cần ffmpeg.
+
+Usage:
+    python scripts/extract_clips.py data/sessions/20240520_081500
+    python scripts/extract_clips.py data/sessions/batch_*/* --workers 8
+
+    # Video nguồn đã bị chuyển chỗ / clip có khung xe vi phạm
+    python scripts/extract_clips.py data/sessions/20240520_081500 \\
+        --video /mnt/recordings/cam01.mp4 --annotate
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config
+from src.clip_extractor import ClipExtractor
+from src.violation_store import ViolationStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract violation clips from source videos')
+    parser.add_argument('sessions', type=str, nargs='+', help='Session directories')
+    parser.add_argument('--config', type=str, default='config.yaml', help='Config file')
+    parser.add_argument('--video', type=str, help='Video nguồn (ghi đè source.video)')
+    parser.add_argument('--pre', type=float, help='Giây trước vi phạm (mặc định: config)')
+    parser.add_argument('--post', type=float, help='Giây sau vi phạm (mặc định: config)')
+    parser.add_argument('--annotate', action='store_true',
+                       help='Encode lại clip, vẽ khung xe vi phạm quanh thời điểm vi phạm')
+    parser.add_argument('--workers', type=int, default=4, help='Số ffmpeg chạy song song')
+
+    args = parser.parse_args()
+    config = load_config(args.config)
+
+    extractor = ClipExtractor.from_config(config)
+    if args.pre is not None:
+        extractor.pre_seconds = args.pre
+    if args.post is not None:
+        extractor.post_seconds = args.post
+    if args.annotate:
+        extractor.annotate = True
+
+    try:
+        extractor.check_ffmpeg()
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    # Cập nhật clip_path vào violation store (nếu bật storage)
+    store = ViolationStore.from_config(config)
+
+    failed = 0
+    for session in args.sessions:
+        session_dir = Path(session)
+        if not (session_dir / 'violations.json').exists():
+            print(f"⏭️  {session_dir}: no violations.json")
+            continue
+
+        clip_paths = extractor.extract_session(str(session_dir), args.video, args.workers, store)
+        done = sum(1 for p in clip_paths if p)
+        failed += len(clip_paths) - done
+        print(f"🎬 {session_dir}: {done}/{len(clip_paths)} clips")
+
+    if store is not None:
+        store.close()
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Sinh video ngã tư synthetic deterministic + ground truth vi phạm
+
+Mỗi video đi kèm <tên>.gt.json (tham số scene + vi phạm ground truth); dùng
+MockDetector (src/synthetic.py) để chạy tracker / ViolationDetector / writers
+trên video mà không cần model.
+
+Usage:
+    python scripts/generate_synthetic_video.py data/videos/synthetic.mp4
+    python scripts/generate_synthetic_video.py data/videos/syn.mp4 --resolution 1920x1080 \\
+        --duration 120 --density 1.0 --seed 3
+
+    # Nhiều video (seed tăng dần): syn_0.mp4, syn_1.mp4, ...
+    python scripts/generate_synthetic_video.py data/videos/syn.mp4 --count 4
+
+    # Kiểm tra: tracker + ViolationDetector với MockDetector phải khớp ground truth,
+    # cả qua pipeline CLI (batch_size 1 và performance.batch_size, threaded / tuần tự)
+    python scripts/generate_synthetic_video.py data/videos/synthetic.mp4 --check
+"""
+
+import sys
+import copy
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+import cv2
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from loguru import logger
+from src.utils import load_config
+from src.synthetic import SyntheticScene, MockDetector, evaluate
+
+
+def check_video(video_path: Path, config: dict) -> dict:
+    """Chạy tracker + ViolationDetector (MockDetector) trên video, so với ground truth"""
+    from src.tracker import ObjectTracker
+    from src.violation_logic import ViolationDetector
+    from src.clock import create_clock
+
+    detector = MockDetector.for_video(video_path, config)
+    tracker = ObjectTracker(config)
+    violation_detector = ViolationDetector(config)
+
+    cap = cv2.VideoCapture(str(video_path))
+    clock = create_clock(config, str(video_path), cap.get(cv2.CAP_PROP_FPS))
+    violation_detector.fps = clock.fps
+
+    frame_number = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_number += 1
+        timestamp = clock.timestamp(frame_number, cap.get(cv2.CAP_PROP_POS_MSEC))
+        detections = detector.detect(frame)
+        tracked_vehicles = tracker.update(detections)
+        violation_detector.update(tracked_vehicles, detections, frame, frame_number, timestamp)
+        violation_detector.pop_finalized_violations()
+    cap.release()
+
+    return evaluate(violation_detector.violations.values(), detector.scene)
+
+
+def check_pipeline(video_path: Path, config: dict, batch_size: int, threaded: bool) -> dict:
+    """Như check_video nhưng qua process_video (pipeline CLI) với batch_size / threaded cho trước"""
+    from src.tracker import ObjectTracker
+    from src.violation_logic import ViolationDetector
+    from src.pipeline import process_video
+
+    config = copy.deepcopy(config)
+    config.setdefault('performance', {})['batch_size'] = batch_size
+    config['performance'].setdefault('pipeline', {})['enabled'] = threaded
+    config.setdefault('storage', {})['enabled'] = False  # Không ghi vào DB dùng chung
+
+    detector = MockDetector.for_video(video_path, config)
+    violation_detector = ViolationDetector(config)
+    with tempfile.TemporaryDirectory() as session_dir:
+        process_video(str(video_path), detector, ObjectTracker(config), violation_detector,
+                      config, session_dir, session_dir=session_dir, show_progress=False)
+
+    return evaluate(violation_detector.violations.values(), detector.scene)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic intersection videos')
+    parser.add_argument('output', type=str, help='Video output (.mp4 / .avi)')
+    parser.add_argument('--config', type=str, default='config.yaml', help='Config file')
+    parser.add_argument('--resolution', type=str, help='WxH (mặc định: synthetic.resolution)')
+    parser.add_argument('--duration', type=float, help='Giây')
+    parser.add_argument('--fps', type=float, help='Frame rate')
+    parser.add_argument('--density', type=float, help='Xe mới / giây / lane')
+    parser.add_argument('--lanes', type=int, help='Số lane đi về phía camera')
+    parser.add_argument('--violation-rate', type=float, help='Tỉ lệ xe vượt đèn đỏ')
+    parser.add_argument('--seed', type=int, help='Seed (cùng seed -> cùng video)')
+    parser.add_argument('--count', type=int, default=1, help='Số video (seed, seed + 1, ...)')
+    parser.add_argument('--codec', type=str, default='mp4v', help='FourCC (mp4v, MJPG, ...)')
+    parser.add_argument('--check', action='store_true',
+                       help='Chạy tracker + ViolationDetector (MockDetector), so với ground truth')
+
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level='ERROR')
+
+    config = load_config(args.config)
+    overrides = {key: value for key, value in (
+        ('duration', args.duration), ('fps', args.fps), ('density', args.density),
+        ('lanes', args.lanes), ('violation_rate', args.violation_rate)) if value is not None}
+    if args.resolution:
+        overrides['width'], overrides['height'] = (
+            int(v) for v in args.resolution.lower().split('x'))
+    seed = args.seed if args.seed is not None else config.get('synthetic', {}).get('seed', 0)
+
+    output = Path(args.output)
+    failed = 0
+    for i in range(max(1, args.count)):
+        path = output if args.count <= 1 else output.with_name(f"{output.stem}_{i}{output.suffix}")
+        start = time.perf_counter()
+        scene = SyntheticScene.from_config(config, seed=seed + i, **overrides)
+        scene.write_video(path, fourcc=args.codec)
+        print(f"🎬 {path}: {scene.frame_count} frames {scene.width}x{scene.height}, "
+              f"{len(scene.ground_truth)} violations ({time.perf_counter() - start:.1f}s)")
+
+        if args.check:
+            batch_sizes = sorted({1, int(config.get('performance', {}).get('batch_size', 1))})
+            checks = [('frame-by-frame', lambda: check_video(path, config))]
+            checks += [(f"pipeline batch {bs} {'threaded' if threaded else 'sequential'}",
+                        lambda bs=bs, threaded=threaded: check_pipeline(path, config, bs, threaded))
+                       for bs in batch_sizes for threaded in (True, False)]
+            for name, check in checks:
+                result = check()
+                ok = result['false_positives'] == 0 and result['missed'] == 0
+                failed += not ok
+                print(f"   {'✅' if ok else '❌'} {name}: detected {result['detected']} / "
+                      f"ground truth {result['ground_truth']} | precision {result['precision']:.2f} "
+                      f"recall {result['recall']:.2f}")
+                if not ok:
+                    print(json.dumps(result, indent=2))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,474 @@
+"""
+INT8 Post-Training Quantization cho YOLOv11 (ONNX Runtime)
+
+Calibrate trên frames lấy từ data/videos, xuất models/yolov11_int8.onnx
+và báo cáo accuracy vs latency (FP32 vs INT8) theo từng class.
+
+Usage:
+    # Cần model FP32 trước: python scripts/export_onnx.py --format onnx
+    python scripts/quantize_int8.py
+
+    # Calibrate + báo cáo, đánh giá trên tập test có nhãn YOLO
+    python scripts/quantize_int8.py --report --eval-images data/test/images
+
+    # Chỉ báo cáo cho model INT8 đã có
+    python scripts/quantize_int8.py --skip-quantize --report
+
+Không có nhãn (--eval-images) thì dùng detections của model FP32 trên
+frames video (không dùng để calibrate) làm ground truth tham chiếu.
+"""
+
+import sys
+import json
+import copy
+import time
+import argparse
+import cv2
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils import load_config
+from src.detector import (
+    CLASS_NAMES, Detection, ONNXDetector, YOLOv11INT8Detector,
+    letterbox_batch, resolve_weights_path
+)
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Traffic light = object nhỏ, nhạy nhất với quantization
+LIGHT_CLASS_NAMES = ('red_light', 'yellow_light', 'green_light')
+
+
+# ============================================================================
+# CALIBRATION DATA
+# ============================================================================
+
+def sample_video_frames(videos_dir: Path, num_frames: int, offset: int = 0) -> list:
+    """
+    Lấy frames rải đều trên tất cả video trong videos_dir
+
+    offset dịch vị trí lấy mẫu (nửa bước) để tách frames calibrate / eval
+    """
+    videos = sorted(p for p in videos_dir.iterdir() if p.suffix.lower() in VIDEO_EXTENSIONS)
+    if not videos:
+        return []
+
+    per_video = max(1, num_frames // len(videos))
+    frames = []
+
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total <= 0:
+            cap.release()
+            continue
+        step = max(1, total // per_video)
+        start = (step // 2) if offset else 0
+        for idx in range(start, total, step):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+            if len(frames) >= num_frames:
+                break
+        cap.release()
+
+    return frames[:num_frames]
+
+
+class FrameCalibrationReader:
+    """CalibrationDataReader cho onnxruntime.quantization (1 frame / lần)"""
+
+    def __init__(self, frames: list, input_name: str, img_size: int):
+        self.input_name = input_name
+        self.img_size = img_size
+        self._iter = iter(frames)
+
+    def get_next(self):
+        frame = next(self._iter, None)
+        if frame is None:
+            return None
+        blob, _, _ = letterbox_batch([frame], self.img_size)
+        return {self.input_name: blob}
+
+    def rewind(self):
+        pass
+
+
+def quantize_model(fp32_path: Path, int8_path: Path, frames: list, img_size: int,
+                   method: str = 'minmax', exclude_patterns: list = None):
+    """Static INT8 quantization (QDQ, per-channel weights)"""
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import (
+        quantize_static, QuantFormat, QuantType, CalibrationMethod
+    )
+
+    methods = {
+        'minmax': CalibrationMethod.MinMax,
+        'entropy': CalibrationMethod.Entropy,
+        'percentile': CalibrationMethod.Percentile,
+    }
+
+    input_name = ort.InferenceSession(
+        str(fp32_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    # Node không quantize (vd: head decode '/model.23/' giữ FP32 cho box chính xác)
+    nodes_to_exclude = []
+    if exclude_patterns:
+        graph = onnx.load(str(fp32_path)).graph
+        nodes_to_exclude = [n.name for n in graph.node
+                            if any(pattern in n.name for pattern in exclude_patterns)]
+        print(f"   - Giữ FP32 cho {len(nodes_to_exclude)} nodes ({', '.join(exclude_patterns)})")
+
+    print(f"⚙️  Calibrating on {len(frames)} frames (method={method})...")
+    start = time.time()
+    quantize_static(
+        model_input=str(fp32_path),
+        model_output=str(int8_path),
+        calibration_data_reader=FrameCalibrationReader(frames, input_name, img_size),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        weight_type=QuantType.QInt8,
+        activation_type=QuantType.QUInt8,
+        calibrate_method=methods[method],
+        nodes_to_exclude=nodes_to_exclude,
+    )
+    print(f"✅ INT8 model saved: {int8_path} ({time.time() - start:.1f}s)")
+    print(f"   - Size: {fp32_path.stat().st_size / 1024 / 1024:.2f} MB -> "
+          f"{int8_path.stat().st_size / 1024 / 1024:.2f} MB")
+
+
+# ============================================================================
+# EVALUATION
+# ============================================================================
+
+def load_labeled_images(images_dir: Path, limit: int) -> list:
+    """
+    Load ảnh + nhãn YOLO (labels/ cạnh images/)
+
+    Returns:
+        [(frame, [Detection ground truth])]
+    """
+    labels_dir = images_dir.parent / 'labels'
+    samples = []
+
+    for image_path in sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS):
+        frame = cv2.imread(str(image_path))
+        if frame is None:
+            continue
+        h, w = frame.shape[:2]
+
+        ground_truth = []
+        label_path = labels_dir / f"{image_path.stem}.txt"
+        if label_path.exists():
+            for line in label_path.read_text().splitlines():
+                parts = line.split()
+                if len(parts) < 5:
+                    continue
+                class_id = int(parts[0])
+                cx, cy, bw, bh = (float(v) for v in parts[1:5])
+                ground_truth.append(Detection(
+                    class_id=class_id,
+                    class_name=CLASS_NAMES.get(class_id, f"class_{class_id}"),
+                    confidence=1.0,
+                    bbox=(int((cx - bw / 2) * w), int((cy - bh / 2) * h),
+                          int((cx + bw / 2) * w), int((cy + bh / 2) * h))
+                ))
+
+        samples.append((frame, ground_truth))
+        if len(samples) >= limit:
+            break
+
+    return samples
+
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def average_precision(predictions: list, ground_truths: list, class_id: int,
+                      iou_threshold: float = 0.5) -> float:
+    """
+    AP@iou_threshold cho một class (nội suy 101 điểm kiểu COCO)
+
+    Args:
+        predictions: list (per image) of Detection lists
+        ground_truths: list (per image) of Detection lists
+    """
+    scored = []  # (confidence, image_index, bbox)
+    gt_boxes = []
+    num_gt = 0
+
+    for i, (preds, gts) in enumerate(zip(predictions, ground_truths)):
+        boxes = [g.bbox for g in gts if g.class_id == class_id]
+        gt_boxes.append(boxes)
+        num_gt += len(boxes)
+        scored.extend((p.confidence, i, p.bbox) for p in preds if p.class_id == class_id)
+
+    if num_gt == 0:
+        return float('nan')
+    if not scored:
+        return 0.0
+
+    scored.sort(key=lambda x: -x[0])
+    matched = [set() for _ in gt_boxes]
+    tp = np.zeros(len(scored))
+
+    for k, (_, i, bbox) in enumerate(scored):
+        best_j, best_iou = -1, iou_threshold
+        for j, gt in enumerate(gt_boxes[i]):
+            if j in matched[i]:
+                continue
+            iou = _iou(bbox, gt)
+            if iou >= best_iou:
+                best_j, best_iou = j, iou
+        if best_j >= 0:
+            matched[i].add(best_j)
+            tp[k] = 1
+
+    tp_cum = np.cumsum(tp)
+    recall = tp_cum / num_gt
+    precision = tp_cum / np.arange(1, len(scored) + 1)
+
+    # Precision envelope + nội suy 101 điểm
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    recall_points = np.linspace(0, 1, 101)
+    idx = np.searchsorted(recall, recall_points, side='left')
+    interpolated = np.array([precision[i] if i < len(precision) else 0.0 for i in idx])
+    return float(interpolated.mean())
+
+
+def run_detector(detector, frames: list) -> tuple:
+    """Chạy detector từng frame, trả về (predictions, latencies ms)"""
+    detector.detect(frames[0])  # Warm-up
+    predictions, latencies = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        predictions.append(detector.detect(frame))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return predictions, latencies
+
+
+def build_report(config: dict, fp32_path: Path, int8_path: Path,
+                 frames: list, ground_truths: list, reference: str) -> dict:
+    """So sánh FP32 vs INT8: per-class AP@0.5 + latency"""
+    fp32_config = copy.deepcopy(config)
+    fp32_config['model'].setdefault('onnx', {})
+    fp32_config['model']['onnx'].update({'weights': str(fp32_path), 'runtime': 'onnxruntime'})
+
+    int8_config = copy.deepcopy(config)
+    int8_config['model'].setdefault('yolov11_int8', {})
+    int8_config['model']['yolov11_int8'].update({'weights': str(int8_path), 'runtime': 'onnxruntime'})
+
+    fp32_preds, fp32_latency = run_detector(ONNXDetector(fp32_config), frames)
+    int8_preds, int8_latency = run_detector(YOLOv11INT8Detector(int8_config), frames)
+
+    if ground_truths is None:
+        ground_truths = fp32_preds  # Pseudo ground truth = FP32
+
+    per_class = {}
+    for class_id, class_name in CLASS_NAMES.items():
+        ap_fp32 = average_precision(fp32_preds, ground_truths, class_id)
+        ap_int8 = average_precision(int8_preds, ground_truths, class_id)
+        per_class[class_name] = {
+            'instances': sum(1 for gts in ground_truths for g in gts if g.class_id == class_id),
+            'ap50_fp32': ap_fp32,
+            'ap50_int8': ap_int8,
+            'drift': ap_int8 - ap_fp32,
+            'is_light': class_name in LIGHT_CLASS_NAMES
+        }
+
+    def latency_stats(values):
+        return {
+            'mean_ms': float(np.mean(values)),
+            'p50_ms': float(np.percentile(values, 50)),
+            'p95_ms': float(np.percentile(values, 95))
+        }
+
+    def mean_ap(key, light_only=False):
+        values = [c[key] for c in per_class.values()
+                  if not np.isnan(c[key]) and (c['is_light'] or not light_only)]
+        return float(np.mean(values)) if values else float('nan')
+
+    return {
+        'created': datetime.now().isoformat(),
+        'reference': reference,
+        'frames': len(frames),
+        'fp32_model': str(fp32_path),
+        'int8_model': str(int8_path),
+        'size_mb': {
+            'fp32': fp32_path.stat().st_size / 1024 / 1024,
+            'int8': int8_path.stat().st_size / 1024 / 1024
+        },
+        'latency': {'fp32': latency_stats(fp32_latency), 'int8': latency_stats(int8_latency)},
+        'map50': {
+            'fp32': mean_ap('ap50_fp32'),
+            'int8': mean_ap('ap50_int8'),
+            'lights_fp32': mean_ap('ap50_fp32', light_only=True),
+            'lights_int8': mean_ap('ap50_int8', light_only=True)
+        },
+        'per_class': per_class
+    }
+
+
+def format_report(report: dict) -> str:
+    """Markdown report"""
+    def fmt(value):
+        return "n/a" if np.isnan(value) else f"{value:.3f}"
+
+    lat = report['latency']
+    speedup = lat['fp32']['mean_ms'] / lat['int8']['mean_ms'] if lat['int8']['mean_ms'] else 0
+    ref = ("nhãn ground truth" if report['reference'] == 'labels'
+           else "detections FP32 (pseudo ground truth)")
+
+    lines = [
+        "# YOLOv11 INT8 vs FP32 - Accuracy / Latency Report",
+        "",
+        f"- Thời gian: {report['created']}",
+        f"- Số frames đánh giá: {report['frames']}",
+        f"- Tham chiếu AP: {ref}",
+        f"- Kích thước: {report['size_mb']['fp32']:.2f} MB -> {report['size_mb']['int8']:.2f} MB",
+        "",
+        "## Latency (ms/frame, CPU)",
+        "",
+        "| Model | Mean | P50 | P95 |",
+        "|-------|------|-----|-----|",
+    ]
+    for name in ('fp32', 'int8'):
+        s = lat[name]
+        lines.append(f"| {name.upper()} | {s['mean_ms']:.1f} | {s['p50_ms']:.1f} | {s['p95_ms']:.1f} |")
+    lines += [
+        "",
+        f"Speedup: **{speedup:.2f}x**",
+        "",
+        "## AP@0.5 theo class",
+        "",
+        "| Class | Instances | FP32 | INT8 | Drift |",
+        "|-------|-----------|------|------|-------|",
+    ]
+    for class_name, c in report['per_class'].items():
+        if not c['is_light']:
+            lines.append(f"| {class_name} | {c['instances']} | {fmt(c['ap50_fp32'])} | "
+                         f"{fmt(c['ap50_int8'])} | {fmt(c['drift'])} |")
+    lines += [
+        "",
+        "## Traffic lights (small objects)",
+        "",
+        "| Class | Instances | FP32 | INT8 | Drift |",
+        "|-------|-----------|------|------|-------|",
+    ]
+    for class_name, c in report['per_class'].items():
+        if c['is_light']:
+            lines.append(f"| {class_name} | {c['instances']} | {fmt(c['ap50_fp32'])} | "
+                         f"{fmt(c['ap50_int8'])} | {fmt(c['drift'])} |")
+    m = report['map50']
+    lines += [
+        "",
+        f"- mAP@0.5 (all): {fmt(m['fp32'])} -> {fmt(m['int8'])}",
+        f"- mAP@0.5 (lights): {fmt(m['lights_fp32'])} -> {fmt(m['lights_int8'])}",
+        ""
+    ]
+    return "\n".join(lines)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='INT8 post-training quantization for YOLOv11')
+    parser.add_argument('--config', type=str, default='config.yaml',
+                       help='Path to config file (default: config.yaml)')
+    parser.add_argument('--fp32', type=str,
+                       help='FP32 ONNX model (default: model.onnx.weights)')
+    parser.add_argument('--output', type=str,
+                       help='INT8 ONNX output (default: model.yolov11_int8.weights)')
+    parser.add_argument('--videos', type=str,
+                       help='Thư mục video để calibrate (default: paths.videos)')
+    parser.add_argument('--calib-frames', type=int, default=200, help='Số frames calibrate')
+    parser.add_argument('--method', type=str, default='minmax',
+                       choices=['minmax', 'entropy', 'percentile'], help='Calibration method')
+    parser.add_argument('--exclude-nodes', type=str, nargs='*', default=None,
+                       help="Pattern tên node giữ FP32 (vd: '/model.23/')")
+    parser.add_argument('--skip-quantize', action='store_true',
+                       help='Không quantize, chỉ báo cáo cho model INT8 đã có')
+    parser.add_argument('--report', action='store_true',
+                       help='Tạo báo cáo accuracy vs latency')
+    parser.add_argument('--eval-images', type=str,
+                       help='Thư mục ảnh có nhãn YOLO (../labels) để tính AP')
+    parser.add_argument('--eval-frames', type=int, default=100, help='Số frames đánh giá')
+
+    args = parser.parse_args()
+    config = load_config(args.config)
+
+    fp32_path = resolve_weights_path(args.fp32 or config['model'].get('onnx', {}).get(
+        'weights', 'models/yolov11.onnx'))
+    int8_path = resolve_weights_path(args.output or config['model'].get('yolov11_int8', {}).get(
+        'weights', 'models/yolov11_int8.onnx'))
+    videos_dir = resolve_weights_path(args.videos or config.get('paths', {}).get(
+        'videos', 'data/videos'))
+    img_size = config['model'].get('onnx', {}).get('img_size', 640)
+
+    if not fp32_path.exists():
+        print(f"❌ FP32 ONNX model not found: {fp32_path}")
+        print("💡 Export trước: python scripts/export_onnx.py --format onnx")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("🔢 YOLOv11 INT8 POST-TRAINING QUANTIZATION")
+    print("=" * 60)
+
+    if not args.skip_quantize:
+        frames = sample_video_frames(videos_dir, args.calib_frames)
+        if not frames:
+            print(f"❌ Không có video để calibrate trong {videos_dir}")
+            sys.exit(1)
+        quantize_model(fp32_path, int8_path, frames, img_size, args.method, args.exclude_nodes)
+
+    if not args.report:
+        return
+
+    if not int8_path.exists():
+        print(f"❌ INT8 model not found: {int8_path}")
+        sys.exit(1)
+
+    print("\n📊 Evaluating FP32 vs INT8...")
+    if args.eval_images:
+        samples = load_labeled_images(Path(args.eval_images), args.eval_frames)
+        frames = [frame for frame, _ in samples]
+        ground_truths = [gts for _, gts in samples]
+        reference = 'labels'
+    else:
+        # Frames lệch nửa bước so với frames calibrate
+        frames = sample_video_frames(videos_dir, args.eval_frames, offset=1)
+        ground_truths = None
+        reference = 'fp32'
+
+    if not frames:
+        print("❌ Không có frames để đánh giá")
+        sys.exit(1)
+
+    report = build_report(config, fp32_path, int8_path, frames, ground_truths, reference)
+    markdown = format_report(report)
+    print("\n" + markdown)
+
+    report_md = int8_path.with_name(f"{int8_path.stem}_report.md")
+    report_json = int8_path.with_name(f"{int8_path.stem}_report.json")
+    report_md.write_text(markdown, encoding='utf-8')
+    with open(report_json, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Report saved: {report_md}, {report_json}")
+
+
+if __name__ == '__main__':
+    main()
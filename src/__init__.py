@@ -1,23 +1,40 @@
 """
 Package initializer for src module
+
+Các symbol public được import lazy (PEP 562): `import src` / `from src.utils import ...`
+không kéo theo torch, supervision, cv2 hay PySide6 cho tới khi thực sự dùng.
 """
 
+import importlib
+
 __version__ = "1.0.0"
 __author__ = "ITS Research Team"
 
-from .detector import Detection, BaseDetector, create_detector
-from .tracker import TrackedObject, ObjectTracker
-from .violation_logic import Violation, ViolationDetector
-from .utils import load_config, setup_logging
-
-__all__ = [
-    'Detection',
-    'BaseDetector',
-    'create_detector',
-    'TrackedObject',
-    'ObjectTracker',
-    'Violation',
-    'ViolationDetector',
-    'load_config',
-    'setup_logging',
-]
+# symbol -> submodule chứa nó
+_LAZY_IMPORTS = {
+    'Detection': 'detector',
+    'BaseDetector': 'detector',
+    'create_detector': 'detector',
+    'TrackedObject': 'tracker',
+    'ObjectTracker': 'tracker',
+    'Violation': 'violation_logic',
+    'ViolationDetector': 'violation_logic',
+    'load_config': 'utils',
+    'setup_logging': 'utils',
+}
+
+__all__ = list(_LAZY_IMPORTS)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value  # cache: lần sau không qua __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
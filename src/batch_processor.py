@@ -0,0 +1,190 @@
+"""
+Batch Video Processing
+Xử lý nhiều video song song trên process pool, mỗi worker load model một lần
+"""
+
+import os
+import sys
+import copy
+import glob
+import json
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from loguru import logger
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# State của mỗi worker process (khởi tạo trong _init_worker)
+_worker_config: Optional[dict] = None
+_worker_detector = None
+
+
+def find_videos(source: str) -> List[Path]:
+    """Danh sách video từ thư mục hoặc glob pattern (sorted)"""
+    path = Path(source)
+    if path.is_dir():
+        candidates = path.iterdir()
+    else:
+        candidates = (Path(p) for p in glob.glob(source, recursive=True))
+
+    return sorted(p for p in candidates if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS)
+
+
+def _worker_config_for(config: dict, workers: int) -> dict:
+    """
+    Config cho worker: chia đều CPU threads giữa các worker
+    (nếu performance.num_threads chưa đặt) để các process không tranh core
+    """
+    worker_config = copy.deepcopy(config)
+    perf_config = worker_config.setdefault('performance', {})
+    if not perf_config.get('num_threads'):
+        perf_config['num_threads'] = max(1, (os.cpu_count() or 1) // workers)
+    return worker_config
+
+
+def _init_worker(config: dict):
+    """Process pool initializer: logging + load model MỘT lần cho worker"""
+    global _worker_config, _worker_detector
+
+    logger.remove()
+    logger.configure(extra={'video': '-'})
+    logger.add(
+        sys.stderr,
+        format="<green>{time:HH:mm:ss}</green> | <level>{level: <8}</level> | "
+               "<cyan>{extra[video]}</cyan> | <level>{message}</level>",
+        level=config.get('logging', {}).get('level', 'INFO')
+    )
+
+    from .detector import create_detector
+
+    _worker_config = config
+    _worker_detector = create_detector(config)
+
+
+def _process_one(video_path: str, session_dir: str) -> dict:
+    """Xử lý 1 video trong worker (tracker + ViolationDetector mới cho mỗi video)"""
+    from .tracker import ObjectTracker
+    from .violation_logic import ViolationDetector
+    from .pipeline import process_video
+
+    with logger.contextualize(video=Path(video_path).name):
+        try:
+            tracker = ObjectTracker(_worker_config)
+            violation_detector = ViolationDetector(_worker_config)
+            summary = process_video(
+                video_path, _worker_detector, tracker, violation_detector,
+                _worker_config, output_dir=str(Path(session_dir).parent),
+                session_dir=session_dir, show_progress=False
+            )
+            summary['status'] = 'ok'
+        except Exception as e:
+            logger.error(f"Failed to process {video_path}: {e}")
+            summary = {
+                'video': video_path,
+                'session_dir': session_dir,
+                'status': 'error',
+                'error': str(e)
+            }
+
+    return summary
+
+
+def process_batch(source: str, config: dict, output_dir: str, workers: int = 1) -> dict:
+    """
+    Xử lý tất cả video trong source (thư mục hoặc glob) trên process pool
+
+    Output:
+        output_dir/batch_<timestamp>/<video>/   - session của từng video
+        output_dir/batch_<timestamp>/summary.json
+
+    Returns:
+        Consolidated summary dict
+    """
+    from tqdm import tqdm
+
+    videos = find_videos(source)
+    if not videos:
+        raise FileNotFoundError(f"No videos found: {source}")
+
+    workers = max(1, min(workers, len(videos)))
+    batch_dir = Path(output_dir) / f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    batch_dir.mkdir(parents=True, exist_ok=True)
+
+    # Session directory theo tên video (thêm hậu tố nếu trùng tên)
+    jobs = []
+    used_names = set()
+    for video in videos:
+        name, suffix = video.stem, 1
+        while name in used_names:
+            suffix += 1
+            name = f"{video.stem}_{suffix}"
+        used_names.add(name)
+        jobs.append((str(video), str(batch_dir / name)))
+
+    logger.info(f"Batch: {len(videos)} videos, {workers} workers -> {batch_dir}")
+
+    start = time.time()
+    results = {}
+    worker_config = _worker_config_for(config, workers)
+
+    # spawn: an toàn với CUDA / thư viện đa luồng trong worker
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'),
+                             initializer=_init_worker, initargs=(worker_config,)) as pool:
+        futures = {pool.submit(_process_one, video, session_dir): video
+                   for video, session_dir in jobs}
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Videos"):
+            video = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                # Worker chết (OOM, crash native code, ...)
+                logger.error(f"Worker failed on {video}: {e}")
+                summary = {'video': video, 'status': 'error', 'error': str(e)}
+
+            results[video] = summary
+            if summary['status'] == 'ok':
+                logger.info(f"✅ {Path(video).name}: {summary['violations']} violations, "
+                            f"{summary['frames']} frames @ {summary['processing_fps']:.1f} FPS")
+
+    videos_summary = [results[video] for video, _ in jobs]
+    succeeded = [s for s in videos_summary if s['status'] == 'ok']
+
+    by_vehicle_class = {}
+    for s in succeeded:
+        for cls, count in s['by_vehicle_class'].items():
+            by_vehicle_class[cls] = by_vehicle_class.get(cls, 0) + count
+
+    wall_time = time.time() - start
+    total_frames = sum(s['frames'] for s in succeeded)
+
+    summary = {
+        'created': datetime.now().isoformat(),
+        'source': source,
+        'model': config.get('model', {}).get('type'),
+        'workers': workers,
+        'videos': len(videos_summary),
+        'succeeded': len(succeeded),
+        'failed': len(videos_summary) - len(succeeded),
+        'total_frames': total_frames,
+        'total_violations': sum(s['violations'] for s in succeeded),
+        'by_vehicle_class': by_vehicle_class,
+        'wall_time_s': round(wall_time, 2),
+        'throughput_fps': round(total_frames / wall_time, 2) if wall_time > 0 else 0.0,
+        'results': videos_summary
+    }
+
+    summary_path = batch_dir / 'summary.json'
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"Batch complete: {summary['succeeded']}/{summary['videos']} videos, "
+                f"{summary['total_violations']} violations, {total_frames} frames "
+                f"in {wall_time:.1f}s ({summary['throughput_fps']:.1f} FPS)")
+    logger.info(f"Summary saved: {summary_path}")
+
+    return summary
@@ -0,0 +1,204 @@
+"""
+Violation Clip Extractor
+Cắt clip ngắn (vài giây) quanh mỗi vi phạm từ video nguồn bằng ffmpeg,
+chạy SAU khi xử lý xong (batch job trên violations.json)
+
+Hot path chỉ ghi lại vị trí vi phạm trong nguồn (source.video, frame_index,
+pts_seconds). Mặc định stream copy (không decode / encode, cắt theo keyframe);
+annotate=True thì encode lại clip ngắn đó, khung xe vi phạm chỉ vẽ trong đoạn
+quanh thời điểm vi phạm.
+"""
+
+import json
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+from loguru import logger
+
+
+class ClipExtractor:
+    """
+    Cắt clip [pts - pre_seconds, pts + post_seconds] cho từng violation record
+
+    Args:
+        pre_seconds / post_seconds: Độ dài clip trước / sau frame vi phạm
+        annotate: Encode lại clip + drawbox quanh xe vi phạm
+        highlight_seconds: Khung xe hiển thị trong ±highlight_seconds quanh vi phạm
+        ffmpeg: Đường dẫn / tên binary ffmpeg
+    """
+
+    def __init__(self, pre_seconds: float = 2.0, post_seconds: float = 3.0,
+                 annotate: bool = False, highlight_seconds: float = 1.0,
+                 crf: int = 23, ffmpeg: str = 'ffmpeg'):
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.annotate = annotate
+        self.highlight_seconds = highlight_seconds
+        self.crf = crf
+        self.ffmpeg = ffmpeg
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'ClipExtractor':
+        """Create extractor từ config['violation']['clips']"""
+        clip_config = config.get('violation', {}).get('clips', {})
+        return cls(
+            pre_seconds=clip_config.get('pre_seconds', 2.0),
+            post_seconds=clip_config.get('post_seconds', 3.0),
+            annotate=clip_config.get('annotate', False),
+            highlight_seconds=clip_config.get('highlight_seconds', 1.0),
+            crf=clip_config.get('crf', 23),
+            ffmpeg=clip_config.get('ffmpeg', 'ffmpeg')
+        )
+
+    def check_ffmpeg(self):
+        """Raise RuntimeError nếu không tìm thấy ffmpeg"""
+        if shutil.which(self.ffmpeg) is None:
+            raise RuntimeError(f"ffmpeg not found ('{self.ffmpeg}'). "
+                               "Install ffmpeg or set violation.clips.ffmpeg")
+
+    # ========================================================================
+    # COMMAND
+    # ========================================================================
+
+    def clip_window(self, record: dict, fps: Optional[float] = None) -> Optional[tuple]:
+        """
+        (start, duration, violation_time_in_clip) tính bằng giây, None nếu không
+        xác định được vị trí vi phạm trong nguồn
+        """
+        source = record.get('source', {})
+        pts = source.get('pts_seconds')
+        if pts is None and fps:
+            pts = source.get('frame_index', record['frame_number'] - 1) / fps
+        if pts is None:
+            return None
+
+        start = max(0.0, pts - self.pre_seconds)
+        duration = (pts - start) + self.post_seconds
+        return start, duration, pts - start
+
+    def build_command(self, record: dict, source_video: str, output_path: str,
+                      fps: Optional[float] = None, reencode: bool = False
+                      ) -> Optional[List[str]]:
+        """
+        ffmpeg command cho một violation record
+
+        reencode=True: encode lại thay vì stream copy (codec nguồn không
+        chứa được trong mp4)
+        """
+        window = self.clip_window(record, fps)
+        if window is None:
+            return None
+        start, duration, offset = window
+
+        # -ss trước -i: seek nhanh theo keyframe
+        cmd = [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+               '-ss', f"{start:.3f}", '-i', str(source_video), '-t', f"{duration:.3f}"]
+
+        if not (self.annotate or reencode):
+            cmd += ['-map', '0:v:0', '-c', 'copy', '-avoid_negative_ts', 'make_zero']
+            cmd += ['-movflags', '+faststart', str(output_path)]
+            return cmd
+
+        filters = []
+        if self.annotate:
+            x1, y1, x2, y2 = record['vehicle']['bbox']
+            t0 = max(0.0, offset - self.highlight_seconds)
+            t1 = offset + self.highlight_seconds
+            label = f"{record['vehicle']['class'].upper()} - Track {record['track_id']}"
+            drawbox = (f"drawbox=x={x1}:y={y1}:w={x2 - x1}:h={y2 - y1}:color=red:t=4:"
+                       f"enable='between(t,{t0:.3f},{t1:.3f})'")
+            drawtext = (f"drawtext=text='{label}':x={x1}:y={max(y1 - 28, 0)}:"
+                        f"fontsize=22:fontcolor=red:enable='between(t,{t0:.3f},{t1:.3f})'")
+            filters = ['-vf', f"{drawbox},{drawtext}"]
+
+        cmd += ['-map', '0:v:0', *filters, '-c:v', 'libx264', '-preset', 'veryfast',
+                '-crf', str(self.crf), '-pix_fmt', 'yuv420p',
+                '-movflags', '+faststart', str(output_path)]
+        return cmd
+
+    # ========================================================================
+    # EXTRACTION
+    # ========================================================================
+
+    def extract(self, record: dict, source_video: str, output_path: str,
+                fps: Optional[float] = None) -> Optional[str]:
+        """Cắt clip cho một violation, trả về đường dẫn clip (None nếu lỗi)"""
+        cmd = self.build_command(record, source_video, output_path, fps)
+        if cmd is None:
+            logger.warning(f"{record['violation_id']}: unknown position in source, skipped")
+            return None
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0 and not self.annotate:
+            # Stream copy không được (vd: codec AVI cũ trong mp4) -> encode lại
+            logger.debug(f"{record['violation_id']}: stream copy failed, re-encoding")
+            cmd = self.build_command(record, source_video, output_path, fps, reencode=True)
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.error(f"{record['violation_id']}: ffmpeg failed: {result.stderr.strip()}")
+            return None
+        return str(output_path)
+
+    def extract_session(self, session_dir: str, source_video: Optional[str] = None,
+                        workers: int = 4, store=None) -> List[Optional[str]]:
+        """
+        Cắt clip cho tất cả violations trong session_dir/violations.json
+
+        Clips ghi vào session_dir/clips/<violation_id>.mp4, violations.json
+        được cập nhật thêm trường 'clip_path'.
+
+        Args:
+            source_video: Video nguồn (mặc định: source.video trong record)
+            workers: Số ffmpeg process chạy song song
+            store: ViolationStore - cập nhật clip_path vào store
+        """
+        self.check_ffmpeg()
+
+        session_dir = Path(session_dir)
+        json_path = session_dir / 'violations.json'
+        with open(json_path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+
+        clips_dir = session_dir / 'clips'
+        clips_dir.mkdir(exist_ok=True)
+
+        fps_cache = {}
+
+        def job(record: dict) -> Optional[str]:
+            video = source_video or record.get('source', {}).get('video')
+            if not video or not Path(video).exists():
+                logger.warning(f"{record['violation_id']}: source video not found ({video})")
+                return None
+            if video not in fps_cache:
+                fps_cache[video] = _probe_fps(video)
+            output_path = clips_dir / f"{record['violation_id']}.mp4"
+            return self.extract(record, video, str(output_path), fps_cache[video])
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            clip_paths = list(pool.map(job, records))
+
+        for record, clip_path in zip(records, clip_paths):
+            record['clip_path'] = clip_path
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+
+        if store is not None:
+            store.add_many(records)
+            store.flush()
+
+        done = sum(1 for p in clip_paths if p)
+        logger.info(f"Clips: {done}/{len(records)} extracted to {clips_dir}")
+        return clip_paths
+
+
+def _probe_fps(video_path: str) -> Optional[float]:
+    """FPS của video (cho record không có pts_seconds)"""
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0.0
+    cap.release()
+    return fps if fps > 0 else None
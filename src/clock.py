@@ -0,0 +1,93 @@
+"""
+Frame Clock
+Timestamp cho từng frame: theo thời gian video (PTS / fps) hoặc wall clock
+
+Rule engine (grace period, flicker guard, red_light_duration) dùng timestamp
+này, nên với file video kết quả không phụ thuộc tốc độ xử lý của máy.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from loguru import logger
+
+CLOCK_MODES = ('auto', 'video', 'wall')
+DEFAULT_FPS = 30.0
+
+
+class VideoClock:
+    """
+    Thời gian theo video: origin + vị trí frame trong video
+
+    Vị trí lấy từ CAP_PROP_POS_MSEC (PTS của frame vừa đọc) khi hợp lệ,
+    ngược lại (backend không hỗ trợ, PTS lùi / trùng) suy ra từ frame_number / fps.
+    """
+
+    is_realtime = False
+
+    def __init__(self, fps: float, origin: Optional[datetime] = None):
+        self.fps = fps if fps and fps > 0 else DEFAULT_FPS
+        self.origin = origin or datetime.now()
+        self._last_msec = -1.0
+
+    def timestamp(self, frame_number: int, pos_msec: Optional[float] = None) -> datetime:
+        """
+        Args:
+            frame_number: Số thứ tự frame (bắt đầu từ 1)
+            pos_msec: cap.get(cv2.CAP_PROP_POS_MSEC) ngay sau cap.read()
+        """
+        msec = (frame_number - 1) * 1000.0 / self.fps
+        if pos_msec is not None and pos_msec > self._last_msec and (pos_msec > 0 or frame_number == 1):
+            msec = pos_msec
+        msec = max(msec, self._last_msec)
+        self._last_msec = msec
+        return self.origin + timedelta(milliseconds=msec)
+
+    def position(self, timestamp: datetime) -> Optional[float]:
+        """Vị trí trong video (giây) của timestamp do clock này tạo"""
+        return (timestamp - self.origin).total_seconds()
+
+
+class WallClock:
+    """Thời gian thực (live source: camera, RTSP)"""
+
+    is_realtime = True
+
+    def __init__(self, fps: float = DEFAULT_FPS):
+        self.fps = fps if fps and fps > 0 else DEFAULT_FPS
+
+    def timestamp(self, frame_number: int, pos_msec: Optional[float] = None) -> datetime:
+        return datetime.now()
+
+    def position(self, timestamp: datetime) -> Optional[float]:
+        """Live source: không có vị trí trong video"""
+        return None
+
+
+def is_live_source(source) -> bool:
+    """Camera index / URL stream (không phải file trên đĩa)"""
+    if isinstance(source, int):
+        return True
+    source = str(source)
+    return source.isdigit() or '://' in source or not Path(source).is_file()
+
+
+def create_clock(config: dict, source, fps: float):
+    """
+    Tạo clock theo config['video']['clock']
+
+    auto  - file video -> VideoClock, camera / stream -> WallClock
+    video - luôn dùng thời gian video
+    wall  - luôn dùng datetime.now() (hành vi cũ)
+    """
+    mode = config.get('video', {}).get('clock', 'auto')
+    if mode not in CLOCK_MODES:
+        logger.warning(f"Unknown video.clock '{mode}', using 'auto'")
+        mode = 'auto'
+
+    if mode == 'auto':
+        mode = 'wall' if is_live_source(source) else 'video'
+
+    clock = WallClock(fps) if mode == 'wall' else VideoClock(fps)
+    logger.info(f"Frame clock: {mode} ({clock.fps:.2f} FPS)")
+    return clock
@@ -1,20 +1,20 @@
 """
 Object Detection Module - Standardized Interface
-Supports YOLOv11, YOLO-NAS, RT-DETR
+Supports YOLOv11, YOLO-NAS, RT-DETR, YOLOv11 ONNX/OpenVINO/INT8, remote inference server
 """
 
 import cv2
+import time
+import threading
 import numpy as np
-try:
-    import torch
-except ImportError:
-    torch = None
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional, Any
 from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 from loguru import logger
 
+from .device_policy import DevicePolicy
+
 # Class mapping cho model đã train
 CLASS_NAMES = {
     0: 'car',
@@ -27,6 +27,87 @@ CLASS_NAMES = {
 
 CLASS_IDS = {v: k for k, v in CLASS_NAMES.items()}
 
+# Màu pad khi letterbox (giống Ultralytics)
+LETTERBOX_PAD_VALUE = 114
+
+# Offset theo class để NMS từng class trong 1 lần (class-aware NMS)
+NMS_CLASS_OFFSET = 7680
+
+
+def resolve_weights_path(weights_path: str) -> Path:
+    """Resolve weights path, relative paths tính từ project root"""
+    weights_path = Path(weights_path)
+    if not weights_path.is_absolute():
+        project_root = Path(__file__).parent.parent
+        weights_path = project_root / weights_path
+    return weights_path
+
+
+def letterbox_batch(frames: List[np.ndarray], img_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Letterbox preprocessing cho một batch frame
+    
+    Resize giữ tỉ lệ + pad về img_size x img_size, BGR -> RGB, HWC -> NCHW,
+    scale về [0, 1]. Chỉ resize chạy từng frame, phần còn lại vectorized.
+    
+    Returns:
+        blob: float32 (N, 3, img_size, img_size)
+        ratios: float32 (N,) tỉ lệ resize
+        pads: float32 (N, 2) padding (left, top)
+    """
+    n = len(frames)
+    canvas = np.full((n, img_size, img_size, 3), LETTERBOX_PAD_VALUE, dtype=np.uint8)
+    ratios = np.empty(n, dtype=np.float32)
+    pads = np.empty((n, 2), dtype=np.float32)
+    
+    for i, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        r = min(img_size / h, img_size / w)
+        new_w, new_h = int(round(w * r)), int(round(h * r))
+        left = (img_size - new_w) // 2
+        top = (img_size - new_h) // 2
+        
+        resized = frame if (new_w, new_h) == (w, h) else cv2.resize(
+            frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        canvas[i, top:top + new_h, left:left + new_w] = resized
+        ratios[i] = r
+        pads[i] = (left, top)
+    
+    # BGR -> RGB, NHWC -> NCHW, uint8 -> float32 [0, 1]
+    blob = np.ascontiguousarray(canvas[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32)
+    blob *= 1.0 / 255.0
+    return blob, ratios, pads
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy NMS, IoU tính vectorized với tất cả box còn lại
+    
+    Args:
+        boxes: (N, 4) xyxy
+        scores: (N,)
+    Returns:
+        Indices của box được giữ (theo thứ tự score giảm dần)
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        
+        inter_w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-7)
+        
+        order = rest[iou <= iou_threshold]
+    
+    return np.array(keep, dtype=np.int64)
+
 @dataclass
 class Detection:
     """Detection result container"""
@@ -45,18 +126,120 @@ class Detection:
             self.class_id = CLASS_IDS.get(self.class_name, -1)
 
 
+class DetectionBatch:
+    """
+    Detections của một frame dạng struct-of-arrays
+    
+    Arrays (N = số detection):
+        xyxy:       (N, 4) int32  - x1, y1, x2, y2
+        confidence: (N,)   float32
+        class_id:   (N,)   int64
+        centers:    (N, 2) int32  - center x, y
+    
+    Vẫn dùng được như List[Detection] (len / iter / index): Detection object
+    chỉ được tạo khi truy cập (lazy view, cache theo index) cho GUI / evidence.
+    Tracker và ViolationDetector đọc trực tiếp các arrays.
+    """
+    
+    __slots__ = ('xyxy', 'confidence', 'class_id', 'centers', 'class_names', '_views')
+    
+    def __init__(self, xyxy: np.ndarray, confidence: np.ndarray, class_id: np.ndarray,
+                 class_names: Dict[int, str] = CLASS_NAMES):
+        self.xyxy = np.asarray(xyxy).astype(np.int32, copy=False).reshape(-1, 4)
+        self.confidence = np.asarray(confidence).astype(np.float32, copy=False).reshape(-1)
+        self.class_id = np.asarray(class_id).astype(np.int64, copy=False).reshape(-1)
+        # Giống Detection.__post_init__: int((x1 + x2) / 2) (làm tròn về 0)
+        self.centers = ((self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2).astype(np.int32)
+        self.class_names = class_names
+        self._views: List[Optional[Detection]] = [None] * len(self.class_id)
+    
+    @classmethod
+    def empty(cls) -> 'DetectionBatch':
+        return cls(np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.float32),
+                   np.empty(0, dtype=np.int64))
+    
+    @classmethod
+    def from_detections(cls, detections: List[Detection]) -> 'DetectionBatch':
+        """
+        Wrap list Detection (hoặc object cùng interface) thành batch
+        
+        class_id lấy theo class_name (CLASS_IDS) khi class_name là class đã biết.
+        Các object gốc được giữ làm view.
+        """
+        if isinstance(detections, cls):
+            return detections
+        if not detections:
+            return cls.empty()
+        
+        batch = cls(
+            [d.bbox for d in detections],
+            [d.confidence for d in detections],
+            [CLASS_IDS.get(d.class_name, d.class_id) for d in detections]
+        )
+        batch._views = list(detections)
+        return batch
+    
+    def __len__(self) -> int:
+        return len(self.class_id)
+    
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+    
+    def __getitem__(self, index: int) -> Detection:
+        view = self._views[index]
+        if view is None:
+            class_id = int(self.class_id[index])
+            view = Detection(
+                class_id=class_id,
+                class_name=self.class_names.get(class_id, f"class_{class_id}"),
+                confidence=float(self.confidence[index]),
+                bbox=tuple(self.xyxy[index].tolist())
+            )
+            self._views[index] = view
+        return view
+    
+    def __repr__(self) -> str:
+        return f"DetectionBatch(n={len(self)})"
+    
+    def class_mask(self, class_names) -> np.ndarray:
+        """Boolean mask các detection thuộc class_names"""
+        # So sánh từng class (vài class) thay vì np.isin: isin chậm (~25 us)
+        # với mảng nhỏ vài chục detection / frame
+        mask = np.zeros(len(self.class_id), dtype=bool)
+        for name in class_names:
+            class_id = CLASS_IDS.get(name)
+            if class_id is not None:
+                mask |= self.class_id == class_id
+        return mask
+    
+    def best_index(self, mask: np.ndarray) -> Optional[int]:
+        """Index detection confidence cao nhất trong mask (None nếu mask rỗng)"""
+        indices = np.flatnonzero(mask)
+        if indices.size == 0:
+            return None
+        return int(indices[np.argmax(self.confidence[indices])])
+    
+    def select(self, mask: np.ndarray) -> 'DetectionBatch':
+        """Batch con theo boolean mask / index array"""
+        indices = np.arange(len(self))[mask]
+        batch = DetectionBatch(self.xyxy[indices], self.confidence[indices],
+                               self.class_id[indices], self.class_names)
+        batch._views = [self._views[i] for i in indices]
+        return batch
+
+
 class BaseDetector(ABC):
     """Abstract Base Class for all detectors"""
     
     def __init__(self, config: dict):
         self.config = config
-        if torch:
-            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        else:
-            self.device = 'cpu'
-            logger.warning("Torch not found, using CPU")
+        self.policy = DevicePolicy.from_config(config)
+        self.policy.apply()
+        self.device = self.policy.device
         self.class_names = CLASS_NAMES
-        logger.info(f"Initializing {self.__class__.__name__} on {self.device}")
+        self.batch_size = max(1, int(config.get('performance', {}).get('batch_size', 1)))
+        logger.info(f"Initializing {self.__class__.__name__} on {self.policy.describe()}")
 
     @abstractmethod
     def detect(self, frame: np.ndarray) -> List[Detection]:
@@ -65,10 +248,46 @@ class BaseDetector(ABC):
         Args:
             frame: BGR numpy array
         Returns:
-            List of Detection objects
+            List of Detection objects (các detector có sẵn trả về DetectionBatch)
         """
         pass
 
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        """
+        Detect objects in a batch of frames
+        Args:
+            frames: List of BGR numpy arrays
+        Returns:
+            One list of Detection objects per frame (same order)
+        """
+        return [self.detect(frame) for frame in frames]
+
+    def warmup(self):
+        """
+        Chạy inference giả (performance.warmup_runs lần) ngay sau khi load model
+        để cuDNN autotune / allocator / graph optimization xong trước frame thật
+        """
+        runs = self.policy.warmup_runs
+        if runs <= 0:
+            return
+        
+        img_size = getattr(self, 'img_size', 640)
+        frames = [np.zeros((img_size, img_size, 3), dtype=np.uint8)] * self.batch_size
+        
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.detect_batch(frames)
+        logger.info(f"Warm-up: {runs} runs x batch {self.batch_size} "
+                    f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def _parse_ultralytics_result(self, result) -> DetectionBatch:
+        """Convert one Ultralytics Results object to DetectionBatch"""
+        if result.boxes is None:
+            return DetectionBatch.empty()
+        
+        boxes = result.boxes.cpu().numpy()
+        return DetectionBatch(boxes.xyxy, boxes.conf, boxes.cls, self.class_names)
+
     def draw_detections(self, frame: np.ndarray, detections: List[Detection]) -> np.ndarray:
         """Draw bounding boxes on frame"""
         result = frame.copy()
@@ -113,6 +332,7 @@ class YOLOv11Detector(BaseDetector):
     def __init__(self, config: dict):
         super().__init__(config)
         self._load_model()
+        self.warmup()
     
     def _load_model(self):
         """Load YOLOv11 model"""
@@ -122,12 +342,8 @@ class YOLOv11Detector(BaseDetector):
             model_config = self.config['model']['yolov11']
             weights_path = model_config['weights']
             
-            # Convert to absolute path
-            weights_path = Path(weights_path)
-            if not weights_path.is_absolute():
-                # Try relative to project root
-                project_root = Path(__file__).parent.parent
-                weights_path = project_root / weights_path
+            # Convert to absolute path (relative to project root)
+            weights_path = resolve_weights_path(weights_path)
             
             if not weights_path.exists():
                 logger.error(f"Weights not found at {weights_path}")
@@ -146,41 +362,32 @@ class YOLOv11Detector(BaseDetector):
             logger.error(f"Failed to load YOLOv11: {e}")
             raise
     
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
         """Detect objects using YOLOv11"""
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        """Detect objects in a batch of frames với 1 lần gọi model"""
+        if not frames:
+            return []
+        
         try:
-            results = self.model(
-                frame,
-                imgsz=self.img_size,
-                conf=self.conf_threshold,
-                iou=self.iou_threshold,
-                verbose=False
-            )[0]
-            
-            detections = []
-            
-            if results.boxes is not None:
-                boxes = results.boxes.cpu().numpy()
-                
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    
-                    class_name = self.class_names.get(class_id, f"class_{class_id}")
-                    
-                    detections.append(Detection(
-                        class_id=class_id,
-                        class_name=class_name,
-                        confidence=confidence,
-                        bbox=(x1, y1, x2, y2)
-                    ))
-            
-            return detections
+            with self.policy.autocast(native_half=True):
+                results = self.model(
+                    list(frames),
+                    imgsz=self.img_size,
+                    conf=self.conf_threshold,
+                    iou=self.iou_threshold,
+                    device=self.device,
+                    half=self.policy.half,
+                    verbose=False
+                )
+            
+            return [self._parse_ultralytics_result(r) for r in results]
             
         except Exception as e:
             logger.error(f"Detection error: {e}")
-            return []
+            return [DetectionBatch.empty() for _ in frames]
 
 
 class YOLONASDetector(BaseDetector):
@@ -189,6 +396,7 @@ class YOLONASDetector(BaseDetector):
     def __init__(self, config: dict):
         super().__init__(config)
         self._load_model()
+        self.warmup()
     
     def _load_model(self):
         """Load YOLO-NAS model"""
@@ -217,38 +425,37 @@ class YOLONASDetector(BaseDetector):
             logger.error(f"Failed to load YOLO-NAS: {e}")
             raise
     
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
         """Detect objects using YOLO-NAS"""
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        """Detect objects in a batch of frames với 1 lần gọi model"""
+        if not frames:
+            return []
+        
         try:
-            predictions = self.model.predict(frame, conf=self.conf_threshold)
-            pred = predictions._images_prediction_lst[0]
-            
-            detections = []
-            
-            if pred.prediction.bboxes_xyxy is not None:
-                boxes = pred.prediction.bboxes_xyxy
-                labels = pred.prediction.labels
-                confidences = pred.prediction.confidence
-                
-                for box, label, conf in zip(boxes, labels, confidences):
-                    class_id = int(label)
-                    confidence = float(conf)
-                    x1, y1, x2, y2 = map(int, box)
-                    
-                    class_name = self.class_names.get(class_id, f"class_{class_id}")
-                    
-                    detections.append(Detection(
-                        class_id=class_id,
-                        class_name=class_name,
-                        confidence=confidence,
-                        bbox=(x1, y1, x2, y2)
-                    ))
+            with self.policy.autocast():
+                predictions = self.model.predict(list(frames), conf=self.conf_threshold)
             
-            return detections
+            return [self._parse_prediction(pred) 
+                    for pred in predictions._images_prediction_lst]
             
         except Exception as e:
             logger.error(f"Detection error: {e}")
-            return []
+            return [DetectionBatch.empty() for _ in frames]
+    
+    def _parse_prediction(self, pred) -> DetectionBatch:
+        """Convert one SuperGradients image prediction to DetectionBatch"""
+        if pred.prediction.bboxes_xyxy is None:
+            return DetectionBatch.empty()
+        
+        return DetectionBatch(
+            pred.prediction.bboxes_xyxy,
+            pred.prediction.confidence,
+            pred.prediction.labels,
+            self.class_names
+        )
 
 
 class RTDETRDetector(BaseDetector):
@@ -257,6 +464,7 @@ class RTDETRDetector(BaseDetector):
     def __init__(self, config: dict):
         super().__init__(config)
         self._load_model()
+        self.warmup()
     
     def _load_model(self):
         """Load RT-DETR model"""
@@ -283,40 +491,337 @@ class RTDETRDetector(BaseDetector):
             logger.error(f"Failed to load RT-DETR: {e}")
             raise
     
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
         """Detect objects using RT-DETR"""
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        """Detect objects in a batch of frames với 1 lần gọi model"""
+        if not frames:
+            return []
+        
         try:
-            results = self.model(
-                frame,
-                imgsz=self.img_size,
-                conf=self.conf_threshold,
-                verbose=False
-            )[0]
-            
-            detections = []
-            
-            if results.boxes is not None:
-                boxes = results.boxes.cpu().numpy()
-                
-                for box in boxes:
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    
-                    class_name = self.class_names.get(class_id, f"class_{class_id}")
-                    
-                    detections.append(Detection(
-                        class_id=class_id,
-                        class_name=class_name,
-                        confidence=confidence,
-                        bbox=(x1, y1, x2, y2)
-                    ))
+            with self.policy.autocast(native_half=True):
+                results = self.model(
+                    list(frames),
+                    imgsz=self.img_size,
+                    conf=self.conf_threshold,
+                    device=self.device,
+                    half=self.policy.half,
+                    verbose=False
+                )
+            
+            return [self._parse_ultralytics_result(r) for r in results]
             
-            return detections
+        except Exception as e:
+            logger.error(f"Detection error: {e}")
+            return [DetectionBatch.empty() for _ in frames]
+
+
+class ONNXDetector(BaseDetector):
+    """
+    YOLOv11 exported graph chạy trên ONNX Runtime hoặc OpenVINO (CPU)
+    
+    Preprocessing (letterbox) và post-processing (decode + NMS) tự làm
+    bằng numpy, không cần torch/ultralytics lúc chạy.
+    Export: python scripts/export_onnx.py --format onnx
+    """
+    
+    # Section trong config['model']
+    config_key = 'onnx'
+    
+    def __init__(self, config: dict):
+        super().__init__(config)
+        self._load_model()
+        self.warmup()
+    
+    def _load_model(self):
+        """Load ONNX / OpenVINO IR model"""
+        try:
+            model_config = self.config['model'][self.config_key]
+            weights_path = resolve_weights_path(model_config['weights'])
+            
+            if not weights_path.exists():
+                logger.error(f"Weights not found at {weights_path}")
+                raise FileNotFoundError(f"Model weights not found: {weights_path}")
+            
+            self.runtime = model_config.get('runtime', 'onnxruntime').lower()
+            self.img_size = model_config.get('img_size', 640)
+            self.conf_threshold = model_config.get('conf_threshold', 0.25)
+            self.iou_threshold = model_config.get('iou_threshold', 0.45)
+            self.max_detections = model_config.get('max_detections', 300)
+            
+            if self.runtime == 'openvino':
+                self._load_openvino(weights_path)
+            elif self.runtime == 'onnxruntime':
+                self._load_onnxruntime(weights_path)
+            else:
+                raise ValueError(f"Unknown runtime: {self.runtime}. "
+                                 f"Available: ['onnxruntime', 'openvino']")
+            
+            logger.info(f"{self.__class__.__name__} loaded ({self.runtime}): {weights_path} "
+                        f"[dynamic batch: {self.dynamic_batch}]")
+            
+        except Exception as e:
+            logger.error(f"Failed to load {self.__class__.__name__}: {e}")
+            raise
+    
+    def _load_onnxruntime(self, weights_path: Path):
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.policy.num_threads:
+            options.intra_op_num_threads = self.policy.num_threads
+        if self.policy.interop_threads:
+            options.inter_op_num_threads = self.policy.interop_threads
+        
+        providers = ['CPUExecutionProvider']
+        if self.device.startswith('cuda') and 'CUDAExecutionProvider' in ort.get_available_providers():
+            device_id = int(self.device.split(':')[1]) if ':' in self.device else 0
+            providers.insert(0, ('CUDAExecutionProvider', {'device_id': device_id}))
+        
+        self.session = ort.InferenceSession(str(weights_path), options, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        if isinstance(model_input.shape[2], int):
+            self.img_size = model_input.shape[2]
+    
+    def _load_openvino(self, weights_path: Path):
+        import openvino as ov
+        
+        # Chấp nhận cả thư mục export của Ultralytics (*_openvino_model/)
+        if weights_path.is_dir():
+            weights_path = next(weights_path.glob('*.xml'))
+        
+        core = ov.Core()
+        model = core.read_model(str(weights_path))
+        properties = {}
+        if self.policy.num_threads:
+            properties['INFERENCE_NUM_THREADS'] = self.policy.num_threads
+        if self.policy.precision == 'bf16':
+            properties['INFERENCE_PRECISION_HINT'] = 'bf16'
+        elif self.policy.precision == 'fp32':
+            properties['INFERENCE_PRECISION_HINT'] = 'f32'
+        self.compiled_model = core.compile_model(model, 'CPU', properties)
+        self.output_port = self.compiled_model.output(0)
+        
+        shape = model.input(0).get_partial_shape()
+        self.dynamic_batch = shape[0].is_dynamic
+        if shape[2].is_static:
+            self.img_size = shape[2].get_length()
+    
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        """Chạy graph, output shape (N, 4 + num_classes, num_anchors)"""
+        if self.runtime == 'openvino':
+            return self.compiled_model(blob)[self.output_port]
+        return self.session.run(None, {self.input_name: blob})[0]
+    
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
+        """Detect objects using ONNX Runtime / OpenVINO"""
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        """Detect objects in a batch of frames"""
+        if not frames:
+            return []
+        
+        try:
+            blob, ratios, pads = letterbox_batch(frames, self.img_size)
+            
+            if self.dynamic_batch:
+                outputs = self._infer(blob)
+            else:
+                # Graph export với batch cố định = 1
+                outputs = np.concatenate([self._infer(blob[i:i + 1]) for i in range(len(frames))])
+            
+            return [
+                self._postprocess(outputs[i], ratios[i], pads[i], frame.shape[:2])
+                for i, frame in enumerate(frames)
+            ]
             
         except Exception as e:
             logger.error(f"Detection error: {e}")
+            return [DetectionBatch.empty() for _ in frames]
+    
+    def _postprocess(self, output: np.ndarray, ratio: float, pad: np.ndarray,
+                     frame_shape: Tuple[int, int]) -> DetectionBatch:
+        """Decode YOLOv11 head output (4 + nc, anchors) -> DetectionBatch"""
+        predictions = output.T  # (anchors, 4 + nc)
+        class_scores = predictions[:, 4:]
+        
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+        
+        mask = confidences > self.conf_threshold
+        if not mask.any():
+            return DetectionBatch.empty()
+        
+        cxcywh = predictions[mask, :4]
+        confidences = confidences[mask]
+        class_ids = class_ids[mask]
+        
+        # cx, cy, w, h -> x1, y1, x2, y2
+        boxes = np.empty_like(cxcywh)
+        boxes[:, :2] = cxcywh[:, :2] - cxcywh[:, 2:] / 2
+        boxes[:, 2:] = cxcywh[:, :2] + cxcywh[:, 2:] / 2
+        
+        # Class-aware NMS: dịch box theo class để không suppress khác class
+        keep = non_max_suppression(boxes + (class_ids * NMS_CLASS_OFFSET)[:, None],
+                                   confidences, self.iou_threshold)
+        keep = keep[:self.max_detections]
+        
+        # Bỏ letterbox: trừ pad, chia ratio, clip vào frame
+        h, w = frame_shape
+        boxes = (boxes[keep] - np.tile(pad, 2)) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        
+        return DetectionBatch(boxes, confidences[keep], class_ids[keep], self.class_names)
+
+
+class YOLOv11INT8Detector(ONNXDetector):
+    """
+    YOLOv11 INT8 (post-training quantization) chạy trên ONNX Runtime
+    
+    Cùng pre/post-processing với ONNXDetector, chỉ khác graph đã lượng tử hóa.
+    Calibrate: python scripts/quantize_int8.py
+    """
+    
+    config_key = 'yolov11_int8'
+
+
+class RemoteDetector(BaseDetector):
+    """
+    Client của inference server (src/inference_server.py)
+    
+    Model chỉ được load MỘT lần trong server process; mỗi process camera chỉ
+    giữ connection + SharedFramePool (không load weights / torch). Frames đi
+    qua shared memory (gửi handle), detect_batch() block tới khi server trả
+    kết quả (server gom frame của nhiều client thành batch).
+    
+    Config (model.remote): address, authkey, shared_memory, slots, timeout
+    """
+    
+    def __init__(self, config: dict):
+        # Không gọi BaseDetector.__init__: device / threads thuộc về server,
+        # client không cần resolve device (import torch)
+        from .inference_server import remote_config
+        
+        self.config = config
+        self.policy = DevicePolicy()
+        self.device = 'remote'
+        self.class_names = CLASS_NAMES
+        self.batch_size = max(1, int(config.get('performance', {}).get('batch_size', 1)))
+        
+        remote = remote_config(config)
+        self.address = remote['address']
+        self.shared_memory = remote.get('shared_memory', True)
+        self.slots = int(remote.get('slots', 0) or 0) or 2 * self.batch_size
+        self.timeout = float(remote.get('timeout', 30.0))
+        
+        self._conn = None
+        self._pool = None
+        self._lock = threading.Lock()  # 1 request / connection tại một thời điểm
+        
+        logger.info(f"Initializing {self.__class__.__name__} -> {self.address}")
+        self._connect()
+    
+    def _connect(self):
+        from .inference_server import connect
+        
+        self._conn = connect(self.config)
+        self._conn.send(('ping',))
+        _, stats = self._conn.recv()
+        logger.info(f"Connected to inference server ({stats['clients']} clients)")
+    
+    def _frame_pool(self, frames: List[np.ndarray]):
+        """SharedFramePool đủ lớn cho frames (tạo lại khi frame lớn hơn slot)"""
+        from .shared_frames import SharedFramePool
+        
+        nbytes = max(frame.nbytes for frame in frames)
+        slots = max(self.slots, len(frames))
+        if self._pool is None or self._pool.slot_bytes < nbytes or self._pool.slots < slots:
+            if self._pool is not None:
+                self._pool.close()
+            self._pool = SharedFramePool(slots, nbytes)
+        return self._pool
+    
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        if not frames:
             return []
+        
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._connect()
+                try:
+                    results = self._request(frames)
+                except TimeoutError:
+                    raise
+                except (EOFError, OSError):
+                    # Server restart: đóng connection cũ, kết nối lại và gửi lại 1 lần
+                    logger.warning("Inference server connection lost, reconnecting...")
+                    self._close_connection()
+                    self._connect()
+                    results = self._request(frames)
+            except (EOFError, OSError, RuntimeError) as e:
+                # Timeout / server lỗi / không kết nối lại được: như các backend khác,
+                # frame không có detection (lần gọi sau thử kết nối lại)
+                logger.error(f"Detection error: {e}")
+                return [DetectionBatch.empty() for _ in frames]
+        
+        return [DetectionBatch(xyxy, conf, cls, self.class_names)
+                for xyxy, conf, cls in results]
+    
+    def _request(self, frames: List[np.ndarray]) -> list:
+        handles = []
+        pool = self._frame_pool(frames) if self.shared_memory else None
+        try:
+            if pool is not None:
+                handles = [pool.put(np.ascontiguousarray(frame), timeout=self.timeout)
+                           for frame in frames]
+                self._conn.send(('detect', handles))
+            else:
+                self._conn.send(('detect', frames))
+            
+            if not self._conn.poll(self.timeout):
+                # Reply đến muộn sẽ lệch request sau, server có thể vẫn đọc slot:
+                # bỏ connection + pool (server giữ mapping riêng tới khi xong)
+                self._conn.close()
+                self._conn = None
+                if pool is not None:
+                    pool.close()
+                    self._pool = None
+                handles = []
+                raise TimeoutError(f"Inference server did not reply in {self.timeout}s")
+            status, payload = self._conn.recv()
+        finally:
+            # Server đã đọc xong frame khi reply (hoặc request lỗi): trả slot
+            for handle in handles:
+                pool.release(handle)
+        
+        if status != 'ok':
+            raise RuntimeError(f"Inference server error: {payload}")
+        return payload
+    
+    def _close_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+    
+    def close(self):
+        self._close_connection()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
 
 
 def create_detector(config: dict) -> BaseDetector:
@@ -329,6 +834,10 @@ def create_detector(config: dict) -> BaseDetector:
         'yolonas': YOLONASDetector,
         'rt-detr': RTDETRDetector,
         'rtdetr': RTDETRDetector,
+        'yolov11-onnx': ONNXDetector,
+        'onnx': ONNXDetector,
+        'yolov11-int8': YOLOv11INT8Detector,
+        'remote': RemoteDetector,
     }
     
     detector_class = detectors.get(model_type)
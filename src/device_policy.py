@@ -0,0 +1,186 @@
+"""
+Device / Precision Policy
+Chọn device, precision, số thread và warm-up cho detectors từ config['performance']
+"""
+
+from contextlib import nullcontext
+from dataclasses import dataclass
+from loguru import logger
+
+DEVICES = ('auto', 'cuda', 'cpu', 'mps')
+PRECISIONS = ('fp32', 'fp16', 'bf16')
+
+_torch_module = False  # False = chưa import
+
+
+def _torch():
+    """
+    torch (import lazy, None nếu chưa cài): process chỉ dùng RemoteDetector
+    không phải load torch
+    """
+    global _torch_module
+    if _torch_module is False:
+        try:
+            import torch
+        except ImportError:
+            torch = None
+        _torch_module = torch
+    return _torch_module
+
+
+def resolve_device(requested: str = 'auto') -> str:
+    """
+    Chuẩn hóa device yêu cầu thành device có thật trên máy
+
+    'cuda' / 'cuda:N' / 'mps' không khả dụng -> fallback về 'cpu' (có warning)
+    'auto' -> cuda > mps > cpu
+    """
+    requested = str(requested or 'auto').lower()
+    base = requested.split(':')[0]
+
+    if base not in DEVICES:
+        raise ValueError(f"Unknown device: {requested}. Available: {list(DEVICES)}")
+
+    torch = _torch()
+    cuda_available = torch is not None and torch.cuda.is_available()
+    mps_available = (torch is not None and hasattr(torch.backends, 'mps')
+                     and torch.backends.mps.is_available())
+
+    if base == 'auto':
+        if cuda_available:
+            return 'cuda'
+        if mps_available:
+            return 'mps'
+        return 'cpu'
+
+    if base == 'cuda':
+        if not cuda_available:
+            logger.warning(f"Device '{requested}' not available, falling back to CPU")
+            return 'cpu'
+        if ':' in requested and int(requested.split(':')[1]) >= torch.cuda.device_count():
+            logger.warning(f"Device '{requested}' not found, using cuda:0")
+            return 'cuda:0'
+        return requested
+
+    if base == 'mps' and not mps_available:
+        logger.warning("Device 'mps' not available, falling back to CPU")
+        return 'cpu'
+
+    return base
+
+
+def resolve_precision(requested: str, device: str) -> str:
+    """
+    Precision thực tế cho device
+
+    fp16 chỉ dùng trên cuda/mps, bf16 trên cuda (nếu GPU hỗ trợ) hoặc cpu.
+    Không hỗ trợ -> fp32 (có warning)
+    """
+    requested = str(requested or 'fp32').lower()
+    if requested not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {requested}. Available: {list(PRECISIONS)}")
+
+    if requested == 'fp32':
+        return 'fp32'
+
+    base = device.split(':')[0]
+    torch = _torch()
+    if requested == 'fp16' and base in ('cuda', 'mps'):
+        return 'fp16'
+    if requested == 'bf16':
+        if base == 'cpu':
+            return 'bf16'
+        if base == 'cuda' and torch is not None and torch.cuda.is_bf16_supported():
+            return 'bf16'
+
+    logger.warning(f"Precision {requested} not supported on {device}, using fp32")
+    return 'fp32'
+
+
+def configure_threads(num_threads: int = 0, interop_threads: int = 0):
+    """
+    Giới hạn số thread của torch (0 = giữ mặc định của torch)
+
+    Khi nhiều process camera chạy chung 1 máy, đặt num_threads ~ số core / số process
+    để các process không tranh nhau core.
+    """
+    if num_threads <= 0 and interop_threads <= 0:
+        return
+    torch = _torch()
+    if torch is None:
+        return
+
+    if num_threads > 0:
+        torch.set_num_threads(num_threads)
+
+    if interop_threads > 0 and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Chỉ đặt được 1 lần, trước khi torch chạy parallel work đầu tiên
+            logger.warning(f"Cannot set interop threads to {interop_threads} "
+                           f"(already {torch.get_num_interop_threads()})")
+
+
+@dataclass
+class DevicePolicy:
+    """
+    Device / precision / threading cho một detector
+
+    Config (performance):
+        device: auto | cuda | cuda:N | cpu | mps
+        precision: fp32 | fp16 | bf16 (half_precision: true = fp16)
+        num_threads: torch intra-op threads (0 = mặc định)
+        interop_threads: torch inter-op threads (0 = mặc định)
+        warmup_runs: số lần chạy inference giả lúc load model
+    """
+    device: str = 'cpu'
+    precision: str = 'fp32'
+    num_threads: int = 0
+    interop_threads: int = 0
+    warmup_runs: int = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'DevicePolicy':
+        """Create policy từ config['performance']"""
+        perf_config = config.get('performance', {})
+
+        precision = perf_config.get('precision')
+        if precision is None:
+            precision = 'fp16' if perf_config.get('half_precision', False) else 'fp32'
+
+        device = resolve_device(perf_config.get('device', 'auto'))
+        return cls(
+            device=device,
+            precision=resolve_precision(precision, device),
+            num_threads=int(perf_config.get('num_threads', 0) or 0),
+            interop_threads=int(perf_config.get('interop_threads', 0) or 0),
+            warmup_runs=int(perf_config.get('warmup_runs', 0) or 0)
+        )
+
+    @property
+    def half(self) -> bool:
+        return self.precision == 'fp16'
+
+    def apply(self):
+        """Áp dụng thread settings (process-wide)"""
+        configure_threads(self.num_threads, self.interop_threads)
+
+    def autocast(self, native_half: bool = False):
+        """
+        Context manager autocast cho fp16/bf16 (fp32 -> no-op)
+
+        native_half=True: backend tự chạy fp16 (Ultralytics half=True),
+        chỉ autocast cho bf16
+        """
+        torch = _torch()
+        if self.precision == 'fp32' or torch is None:
+            return nullcontext()
+        if native_half and self.precision == 'fp16':
+            return nullcontext()
+        dtype = torch.float16 if self.precision == 'fp16' else torch.bfloat16
+        return torch.autocast(device_type=self.device.split(':')[0], dtype=dtype)
+
+    def describe(self) -> str:
+        threads = self.num_threads or 'default'
+        return f"{self.device}, {self.precision}, threads={threads}"
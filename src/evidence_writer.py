@@ -0,0 +1,132 @@
+"""
+Asynchronous Evidence Writer
+Annotate + ghi ảnh bằng chứng trên thread pool ngay khi vi phạm được xác nhận,
+stream violation JSON từng dòng (violations.jsonl) thay vì giữ hết trong RAM
+tới cuối video
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from loguru import logger
+
+
+class EvidenceWriter:
+    """
+    Background sink cho violations
+
+    submit() trả về ngay khi còn slot; khi đã có max_pending violation đang
+    chờ ghi thì submit() block (backpressure lên pipeline) thay vì để frames
+    bằng chứng dồn lại trong RAM. Sau khi ghi xong, evidence_frames của
+    violation được giải phóng, chỉ còn evidence_paths.
+
+    Output trong session_dir:
+        violations/<id>_<label>.jpg
+        violations.jsonl  - 1 dòng / violation ngay khi ghi xong (tạo mới mỗi lần chạy)
+        violations.json   - tạo lúc close() (sort theo frame, cùng format cũ)
+
+    Có store (ViolationStore): record cũng được thêm vào SQLite (ghi theo lô).
+    """
+
+    def __init__(self, violation_detector, session_dir, workers: int = 2,
+                 max_pending: int = 16, save_images: bool = True, store=None):
+        self.violation_detector = violation_detector
+        self.store = store  # ViolationStore (optional)
+        self.session_dir = Path(session_dir)
+        self.violations_dir = self.session_dir / 'violations'
+        self.jsonl_path = self.session_dir / 'violations.jsonl'
+        self.json_path = self.session_dir / 'violations.json'
+        self.save_images = save_images
+
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                            thread_name_prefix='evidence')
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._closed = False
+
+        # Statistics
+        self.written = 0
+        self.failed = 0
+
+    @classmethod
+    def from_config(cls, config: dict, violation_detector, session_dir,
+                    store=None) -> 'EvidenceWriter':
+        """Create writer từ config['violation']['evidence_writer']"""
+        violation_config = config.get('violation', {})
+        writer_config = violation_config.get('evidence_writer', {})
+        return cls(
+            violation_detector, session_dir,
+            workers=writer_config.get('workers', 2),
+            max_pending=writer_config.get('max_pending', 16),
+            save_images=violation_config.get('save_evidence', True),
+            store=store
+        )
+
+    def submit(self, violation):
+        """Đưa violation vào hàng đợi ghi (block nếu đã đủ max_pending)"""
+        if self._closed:
+            raise RuntimeError("EvidenceWriter is closed")
+
+        self._slots.acquire()
+        try:
+            self._executor.submit(self._write, violation)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _write(self, violation):
+        try:
+            if self.save_images and violation.evidence_frames:
+                self.violation_detector.save_violation_evidence(violation, self.violations_dir)
+            violation.evidence_frames = []  # Giải phóng frames trong RAM
+
+            record = violation.to_dict()
+            if self.store is not None:
+                self.store.add(record)
+
+            line = json.dumps(record, ensure_ascii=False)
+            with self._lock:
+                if self._jsonl is None:
+                    self.session_dir.mkdir(parents=True, exist_ok=True)
+                    # 'w': chạy lại vào session_dir cũ không nhân đôi records
+                    self._jsonl = open(self.jsonl_path, 'w', encoding='utf-8')
+                self._jsonl.write(line + '\n')
+                self._jsonl.flush()
+                self.written += 1
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Failed to write evidence for {violation.violation_id}: {e}")
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Chờ ghi xong tất cả violations, tạo violations.json"""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        if self.store is not None:
+            self.store.flush()
+
+        if self._jsonl is None:
+            return
+        self._jsonl.close()
+
+        with open(self.jsonl_path, 'r', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        records.sort(key=lambda r: (r['frame_number'], r['track_id']))
+
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"Violations saved to {self.json_path} "
+                    f"({self.written} written, {self.failed} failed)")
+
+    def __enter__(self) -> 'EvidenceWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
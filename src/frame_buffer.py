@@ -0,0 +1,217 @@
+"""
+Evidence Frame Ring Buffer
+Preallocated ring buffer giữ N frame gần nhất cho evidence collection
+"""
+
+import cv2
+import numpy as np
+from typing import Any, List, Optional
+from loguru import logger
+
+
+class FrameRingBuffer:
+    """
+    Ring buffer với slot cố định, index theo frame number
+
+    - Slot = frame_number % capacity, ghi đè TẠI CHỖ (không allocate mỗi frame)
+    - Đọc trực tiếp theo frame number, không cần scan
+
+    Modes:
+        raw       - Lưu nguyên frame trong 1 mảng (capacity, H, W, 3) preallocate
+        downscale - Như raw nhưng frame được thu nhỏ theo hệ số `downscale`
+        jpeg/png  - Lưu bytes đã encode, RAM tỉ lệ với độ phức tạp ảnh
+
+    memory_budget_mb (0 = không giới hạn):
+        raw/downscale - capacity bị giảm cho vừa budget khi biết kích thước frame
+        jpeg/png      - frame cũ nhất bị bỏ khi tổng bytes vượt budget
+    """
+
+    MODES = ('raw', 'downscale', 'jpeg', 'png')
+
+    def __init__(self, capacity: int = 150, mode: str = 'raw',
+                 memory_budget_mb: float = 0, jpeg_quality: int = 90,
+                 png_compression: int = 1, downscale: float = 0.5):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown evidence buffer mode: {mode}. Available: {list(self.MODES)}")
+
+        self.requested_capacity = max(1, int(capacity))
+        self.capacity = self.requested_capacity
+        self.mode = mode
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024) if memory_budget_mb else 0
+        self.jpeg_quality = int(jpeg_quality)
+        self.png_compression = int(png_compression)
+        self.downscale = float(downscale)
+
+        # Storage (allocate khi có frame đầu tiên vì cần biết shape)
+        self._frames: Optional[np.ndarray] = None
+        self._encoded: List[Optional[bytes]] = []
+        self._encoded_bytes = 0
+        self._frame_shape: Optional[tuple] = None
+
+        self._frame_numbers = np.full(self.capacity, -1, dtype=np.int64)
+        self._timestamps: List[Any] = [None] * self.capacity
+        self._detections: List[Any] = [None] * self.capacity
+        self._latest_frame_number = -1
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'FrameRingBuffer':
+        """Create buffer từ config['violation']['evidence_buffer']"""
+        buffer_config = config.get('violation', {}).get('evidence_buffer', {})
+        return cls(
+            capacity=buffer_config.get('size', 150),
+            mode=buffer_config.get('mode', 'raw'),
+            memory_budget_mb=buffer_config.get('memory_budget_mb', 0),
+            jpeg_quality=buffer_config.get('jpeg_quality', 90),
+            png_compression=buffer_config.get('png_compression', 1),
+            downscale=buffer_config.get('downscale', 0.5)
+        )
+
+    # ========================================================================
+    # WRITE
+    # ========================================================================
+
+    def put(self, frame_number: int, frame: np.ndarray, timestamp=None, detections=None):
+        """Ghi frame vào slot của frame_number (ghi đè frame cũ trong slot)"""
+        if frame.shape != self._frame_shape:
+            self._allocate(frame)
+
+        slot = frame_number % self.capacity
+
+        if self.mode == 'raw':
+            np.copyto(self._frames[slot], frame)
+        elif self.mode == 'downscale':
+            h, w = self._frames.shape[1:3]
+            cv2.resize(frame, (w, h), dst=self._frames[slot], interpolation=cv2.INTER_AREA)
+        else:
+            self._store_encoded(slot, frame)
+
+        self._frame_numbers[slot] = frame_number
+        self._timestamps[slot] = timestamp
+        self._detections[slot] = detections
+        self._latest_frame_number = max(self._latest_frame_number, frame_number)
+
+        if self.mode in ('jpeg', 'png') and self.memory_budget:
+            self._enforce_budget()
+
+    def _allocate(self, frame: np.ndarray):
+        """(Re)allocate storage theo shape của frame"""
+        self._frame_shape = frame.shape
+        capacity = self.requested_capacity
+
+        if self.mode in ('raw', 'downscale'):
+            if self.mode == 'downscale':
+                h = max(1, int(frame.shape[0] * self.downscale))
+                w = max(1, int(frame.shape[1] * self.downscale))
+                slot_shape = (h, w) + frame.shape[2:]
+            else:
+                slot_shape = frame.shape
+
+            slot_bytes = int(np.prod(slot_shape)) * frame.dtype.itemsize
+            if self.memory_budget:
+                capacity = max(1, min(capacity, self.memory_budget // slot_bytes))
+
+            self._frames = np.empty((capacity,) + slot_shape, dtype=frame.dtype)
+            logger.info(f"Evidence buffer: {capacity} slots x {slot_shape} "
+                        f"({capacity * slot_bytes / 1024 / 1024:.0f} MB, mode={self.mode})")
+        else:
+            self._encoded = [None] * capacity
+            self._encoded_bytes = 0
+            logger.info(f"Evidence buffer: {capacity} slots (mode={self.mode})")
+
+        self.capacity = capacity
+        self._frame_numbers = np.full(capacity, -1, dtype=np.int64)
+        self._timestamps = [None] * capacity
+        self._detections = [None] * capacity
+
+    def _store_encoded(self, slot: int, frame: np.ndarray):
+        if self.mode == 'jpeg':
+            ok, buf = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        else:
+            ok, buf = cv2.imencode('.png', frame, [cv2.IMWRITE_PNG_COMPRESSION, self.png_compression])
+        if not ok:
+            raise RuntimeError(f"Failed to encode evidence frame ({self.mode})")
+
+        old = self._encoded[slot]
+        if old is not None:
+            self._encoded_bytes -= len(old)
+        data = buf.tobytes()
+        self._encoded[slot] = data
+        self._encoded_bytes += len(data)
+
+    def _enforce_budget(self):
+        """Bỏ frame cũ nhất cho đến khi tổng bytes <= budget (giữ frame mới nhất)"""
+        oldest = self._latest_frame_number - self.capacity + 1
+        while self._encoded_bytes > self.memory_budget and oldest < self._latest_frame_number:
+            slot = oldest % self.capacity
+            if self._frame_numbers[slot] == oldest and self._encoded[slot] is not None:
+                self._encoded_bytes -= len(self._encoded[slot])
+                self._encoded[slot] = None
+                self._frame_numbers[slot] = -1
+                self._timestamps[slot] = None
+                self._detections[slot] = None
+            oldest += 1
+
+    # ========================================================================
+    # READ
+    # ========================================================================
+
+    def __contains__(self, frame_number: int) -> bool:
+        if frame_number < 0:
+            return False
+        return self._frame_numbers[frame_number % self.capacity] == frame_number
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._frame_numbers >= 0))
+
+    def get(self, frame_number: int, copy: bool = False) -> Optional[dict]:
+        """
+        Đọc frame theo frame number
+
+        Args:
+            frame_number: Số frame cần đọc
+            copy: raw mode trả về VIEW vào slot (sẽ bị ghi đè sau capacity
+                  frames) - đặt copy=True nếu cần giữ frame lâu dài
+
+        Returns:
+            {'frame', 'frame_number', 'timestamp', 'detections'} hoặc None
+            nếu frame không còn trong buffer
+        """
+        if frame_number not in self:
+            return None
+
+        slot = frame_number % self.capacity
+
+        if self.mode == 'raw':
+            frame = self._frames[slot]
+            if copy:
+                frame = frame.copy()
+        elif self.mode == 'downscale':
+            h, w = self._frame_shape[:2]
+            frame = cv2.resize(self._frames[slot], (w, h), interpolation=cv2.INTER_LINEAR)
+        else:
+            buf = np.frombuffer(self._encoded[slot], dtype=np.uint8)
+            frame = cv2.imdecode(buf, cv2.IMREAD_UNCHANGED)
+
+        return {
+            'frame': frame,
+            'frame_number': frame_number,
+            'timestamp': self._timestamps[slot],
+            'detections': self._detections[slot]
+        }
+
+    @property
+    def memory_bytes(self) -> int:
+        """RAM đang dùng cho pixel data"""
+        if self._frames is not None:
+            return self._frames.nbytes
+        return self._encoded_bytes
+
+    def clear(self):
+        """Đánh dấu tất cả slot trống (giữ nguyên storage đã allocate)"""
+        self._frame_numbers.fill(-1)
+        self._timestamps = [None] * self.capacity
+        self._detections = [None] * self.capacity
+        if self._encoded:
+            self._encoded = [None] * self.capacity
+            self._encoded_bytes = 0
+        self._latest_frame_number = -1
@@ -4,6 +4,8 @@ Main interface for Red Light Violation Detection System
 """
 
 import sys
+import time
+import threading
 import cv2
 import numpy as np
 from pathlib import Path
@@ -15,30 +17,80 @@ from PySide6.QtWidgets import (
     QTabWidget, QLabel, QPushButton, QFileDialog, QTableWidget,
     QTableWidgetItem, QSlider, QSpinBox, QComboBox, QTextEdit,
     QGroupBox, QFormLayout, QLineEdit, QProgressBar, QMessageBox,
-    QSplitter, QHeaderView
+    QSplitter, QHeaderView, QTableView, QAbstractItemView
 )
 from PySide6.QtCore import Qt, QTimer, QThread, Signal, Slot
 from PySide6.QtGui import QImage, QPixmap, QFont
 
 from loguru import logger
 
+from .scheduler import MotionGatedScheduler
+from .clock import create_clock
+from .evidence_writer import EvidenceWriter
+from .violation_store import ViolationStore
+from .violation_table import ViolationTableModel, ViolationFilterProxy
+
+
+class LatestFrameSlot:
+    """
+    Slot chỉ giữ frame MỚI NHẤT giữa processing thread và UI
+    
+    Processing thread put() mỗi frame, UI take() theo nhịp màn hình: frame
+    chưa kịp hiển thị bị ghi đè (drop) thay vì xếp hàng trong event queue.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item = None
+        self.put_count = 0
+        self.shown_count = 0
+    
+    def put(self, frame: np.ndarray, stats: dict):
+        with self._lock:
+            self._item = (frame, stats)
+            self.put_count += 1
+    
+    def take(self):
+        """(frame, stats) mới nhất chưa hiển thị, hoặc None"""
+        with self._lock:
+            item, self._item = self._item, None
+        if item is not None:
+            self.shown_count += 1
+        return item
+    
+    @property
+    def dropped(self) -> int:
+        return self.put_count - self.shown_count
+
 
 class VideoProcessor(QThread):
     """Thread for processing video"""
     
-    frame_processed = Signal(np.ndarray, dict)  # frame, stats
-    progress_updated = Signal(int, int)  # current, total
+    violations_detected = Signal(list)  # new violations (không bao giờ bị drop)
     finished = Signal()
     error = Signal(str)
     
-    def __init__(self, video_path: str, detector, tracker, violation_detector):
+    def __init__(self, video_path: str, detector, tracker, violation_detector,
+                 scheduler: MotionGatedScheduler = None, config: dict = None,
+                 writer: Optional[EvidenceWriter] = None):
         super().__init__()
         self.video_path = video_path
+        self.config = config or {}
         self.detector = detector
         self.tracker = tracker
         self.violation_detector = violation_detector
+        self.scheduler = scheduler or MotionGatedScheduler()
+        # Ghi ảnh bằng chứng + record (store) khi violation đủ evidence frames
+        self.writer = writer
         self.is_running = True
         self.is_paused = False
+        
+        # Display: frame mới nhất (đã resize về display_size) cho UI
+        self.display_slot = LatestFrameSlot()
+        self.display_size: Optional[tuple] = None  # (w, h) của video label, UI cập nhật
+        
+        # Pace theo video clock (False = xử lý nhanh nhất có thể)
+        self.realtime = self.config.get('gui', {}).get('realtime_playback', True)
     
     def run(self):
         """Process video"""
@@ -46,63 +98,109 @@ class VideoProcessor(QThread):
             cap = cv2.VideoCapture(self.video_path)
             total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
             fps = cap.get(cv2.CAP_PROP_FPS)
+            clock = create_clock(self.config, self.video_path, fps)
+            self.violation_detector.fps = clock.fps
             frame_number = 0
             
+            # Pacing: frame ở vị trí t (giây video) hiển thị lúc start_wall + t - start_pos
+            start_wall = start_pos = None
+            
             while self.is_running and cap.isOpened():
-                if not self.is_paused:
-                    ret, frame = cap.read()
-                    if not ret:
-                        break
-                    
-                    frame_number += 1
-                    timestamp = datetime.now()
-                    
-                    # Detect objects
+                if self.is_paused:
+                    self.msleep(20)
+                    start_wall = None  # resume: đặt lại mốc pacing
+                    continue
+                
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                frame_number += 1
+                timestamp = clock.timestamp(frame_number, cap.get(cv2.CAP_PROP_POS_MSEC))
+                
+                # Detect + track objects (motion gating: frame tĩnh thì ngoại suy tracks)
+                if self.scheduler.should_detect(frame, frame_number):
                     detections = self.detector.detect(frame)
-                    
-                    # Track objects
+                    self.scheduler.observe(frame_number, detections, frame.shape)
                     tracked_vehicles = self.tracker.update(detections)
-                    
-                    # Check violations
-                    new_violations = self.violation_detector.update(
-                        tracked_vehicles, detections, frame, frame_number, timestamp
-                    )
-                    
-                    # Draw on frame
-                    annotated = self.detector.draw_detections(frame, detections)
-                    
-                    # Draw tracking IDs
-                    for vehicle in tracked_vehicles:
-                        x1, y1, x2, y2 = vehicle.detection.bbox
-                        cv2.putText(annotated, f"ID:{vehicle.track_id}",
-                                   (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX,
-                                   0.5, (255, 255, 0), 2)
-                    
-                    # ========== REAL-TIME VIOLATION DISPLAY ==========
-                    # Draw all detected violations on frame
-                    annotated = self._draw_violations_realtime(annotated, tracked_vehicles)
-                    
-                    # Statistics
-                    stats = {
-                        'frame': frame_number,
-                        'total_frames': total_frames,
-                        'vehicles': len(tracked_vehicles),
-                        'violations': len(new_violations),
-                        'new_violations': new_violations,  # Pass new violations for alert
-                        'light_state': self.violation_detector.current_light_state
-                    }
-                    
-                    self.frame_processed.emit(annotated, stats)
-                    self.progress_updated.emit(frame_number, total_frames)
+                else:
+                    lights = self.scheduler.sample_lights(frame, frame_number)
+                    tracked_vehicles, detections = self.scheduler.extrapolate_tracks(
+                        self.tracker, lights)
+                
+                # Check violations
+                new_violations = self.violation_detector.update(
+                    tracked_vehicles, detections, frame, frame_number, timestamp
+                )
+                if new_violations:
+                    self.violations_detected.emit(new_violations)
+                # Violations đã đủ evidence frames -> ghi nền (ảnh, JSON, store)
+                self._submit(self.violation_detector.pop_finalized_violations())
+                
+                # Draw on frame
+                annotated = self.detector.draw_detections(frame, detections)
+                
+                # Draw tracking IDs
+                for vehicle in tracked_vehicles:
+                    x1, y1, x2, y2 = vehicle.detection.bbox
+                    cv2.putText(annotated, f"ID:{vehicle.track_id}",
+                               (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX,
+                               0.5, (255, 255, 0), 2)
+                
+                # ========== REAL-TIME VIOLATION DISPLAY ==========
+                # Draw all detected violations on frame
+                annotated = self._draw_violations_realtime(annotated, tracked_vehicles)
                 
-                self.msleep(int(1000 / fps))
+                # Statistics
+                stats = {
+                    'frame': frame_number,
+                    'total_frames': total_frames,
+                    'vehicles': len(tracked_vehicles),
+                    'light_state': self.violation_detector.current_light_state
+                }
+                
+                # Resize ở thread này (UI chỉ wrap QImage), UI lấy frame mới nhất
+                self.display_slot.put(self._fit_display(annotated), stats)
+                
+                # Pace theo video clock: chỉ chờ phần còn lại (đã trừ thời gian xử lý)
+                position = clock.position(timestamp)
+                if self.realtime and position is not None:
+                    now = time.perf_counter()
+                    if start_wall is None:
+                        start_wall, start_pos = now, position
+                    delay = (start_wall + position - start_pos) - now
+                    if delay > 0:
+                        self.msleep(int(delay * 1000))
             
             cap.release()
+            # Hết video / dừng: ghi cả violations còn chờ frame sau vi phạm
+            self._submit(self.violation_detector.pop_finalized_violations(flush=True))
+            logger.info(f"Display: {self.display_slot.shown_count}/{frame_number} frames shown "
+                        f"({self.display_slot.dropped} dropped)")
             self.finished.emit()
             
         except Exception as e:
             logger.error(f"Video processing error: {e}")
             self.error.emit(str(e))
+        finally:
+            if self.writer is not None:
+                self.writer.close()  # Chờ ghi xong, tạo violations.json
+    
+    def _submit(self, violations: list):
+        if self.writer is not None:
+            for violation in violations:
+                self.writer.submit(violation)
+    
+    def _fit_display(self, frame: np.ndarray) -> np.ndarray:
+        """Thu nhỏ frame về kích thước video label (giữ tỉ lệ)"""
+        if self.display_size is None:
+            return frame
+        h, w = frame.shape[:2]
+        scale = min(self.display_size[0] / w, self.display_size[1] / h)
+        if scale >= 1.0:
+            return frame
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
     
     def pause(self):
         self.is_paused = True
@@ -199,9 +297,24 @@ class MainWindow(QMainWindow):
         self.video_processor: Optional[VideoProcessor] = None
         self.current_frame: Optional[np.ndarray] = None
         
+        # Violations: SQLite store (lịch sử) + model cho bảng vi phạm
+        self.violation_store = ViolationStore.from_config(config)
+        self.violations_model = ViolationTableModel(self.violation_store, parent=self)
+        
         self.init_ui()
         self.setup_connections()
         
+        # Render theo nhịp màn hình (không theo số frame xử lý)
+        display_fps = self.config.get('gui', {}).get('display_fps', 0)
+        if not display_fps:
+            screen = QApplication.primaryScreen()
+            display_fps = screen.refreshRate() if screen else 60
+        self._alert_until = 0.0
+        self.display_timer = QTimer(self)
+        self.display_timer.setTimerType(Qt.PreciseTimer)
+        self.display_timer.setInterval(max(1, int(1000 / display_fps)))
+        self.display_timer.timeout.connect(self.render_latest_frame)
+        
         logger.info("GUI initialized")
     
     def init_ui(self):
@@ -318,12 +431,31 @@ class MainWindow(QMainWindow):
         widget = QWidget()
         layout = QVBoxLayout()
         
-        # Violations table
-        self.violations_table = QTableWidget()
-        self.violations_table.setColumnCount(7)
-        self.violations_table.setHorizontalHeaderLabels([
-            "ID", "Thời gian", "Frame", "Loại xe", "Trạng thái đèn", "Độ tin cậy", "Tình trạng"
-        ])
+        # Filters (proxy model - không query lại store)
+        filter_layout = QHBoxLayout()
+        
+        self.edit_violation_search = QLineEdit()
+        self.edit_violation_search.setPlaceholderText("🔍 Tìm theo ID...")
+        self.combo_violation_class = QComboBox()
+        self.combo_violation_class.addItems(["Tất cả loại xe", "car", "motobike", "truck"])
+        self.combo_violation_status = QComboBox()
+        self.combo_violation_status.addItems(["Tất cả tình trạng", "Chưa xử lý", "Đã xử lý", "Đã hủy"])
+        
+        filter_layout.addWidget(self.edit_violation_search)
+        filter_layout.addWidget(self.combo_violation_class)
+        filter_layout.addWidget(self.combo_violation_status)
+        layout.addLayout(filter_layout)
+        
+        # Violations table (model/view: chỉ thêm dòng mới, sort / filter lazy)
+        self.violations_proxy = ViolationFilterProxy(self)
+        self.violations_proxy.setSourceModel(self.violations_model)
+        
+        self.violations_table = QTableView()
+        self.violations_table.setModel(self.violations_proxy)
+        self.violations_table.setSortingEnabled(True)
+        self.violations_table.sortByColumn(1, Qt.DescendingOrder)
+        self.violations_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.violations_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.violations_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         
         layout.addWidget(self.violations_table)
@@ -449,7 +581,7 @@ class MainWindow(QMainWindow):
         
         # Model selection
         self.combo_model = QComboBox()
-        self.combo_model.addItems(['yolov11', 'yolo-nas', 'rt-detr'])
+        self.combo_model.addItems(['yolov11', 'yolo-nas', 'rt-detr', 'yolov11-onnx', 'yolov11-int8'])
         self.combo_model.setCurrentText(self.config['model']['type'])
         layout.addRow("Mô hình:", self.combo_model)
         
@@ -498,7 +630,16 @@ class MainWindow(QMainWindow):
             lambda v: self.lbl_conf.setText(f"{v/100:.2f}")
         )
         
-        # Violations tab buttons
+        # Violations tab
+        self.edit_violation_search.textChanged.connect(
+            self.violations_proxy.setFilterFixedString)
+        self.combo_violation_class.currentIndexChanged.connect(
+            lambda i: self.violations_proxy.set_vehicle_class(
+                self.combo_violation_class.currentText() if i > 0 else None))
+        self.combo_violation_status.currentIndexChanged.connect(
+            lambda i: self.violations_proxy.set_status(
+                self.combo_violation_status.currentText() if i > 0 else None))
+        
         self.btn_view_evidence.clicked.connect(self.view_evidence)
         self.btn_export_pdf.clicked.connect(self.export_pdf)
         self.btn_export_json.clicked.connect(self.export_json)
@@ -523,16 +664,27 @@ class MainWindow(QMainWindow):
         if not hasattr(self, 'video_path'):
             return
         
+        # Evidence + violations.json của lần phát này; record vào store sau
+        # khi ảnh bằng chứng đã ghi (có evidence_paths)
+        output_dir = self.config.get('gui', {}).get('output_dir', 'data/sessions')
+        session_dir = Path(output_dir) / datetime.now().strftime('%Y%m%d_%H%M%S')
+        writer = EvidenceWriter.from_config(self.config, self.violation_detector,
+                                            session_dir, self.violation_store)
+        
         self.video_processor = VideoProcessor(
-            self.video_path, self.detector, self.tracker, self.violation_detector
+            self.video_path, self.detector, self.tracker, self.violation_detector,
+            scheduler=MotionGatedScheduler.from_config(self.config),
+            config=self.config,
+            writer=writer
         )
         
-        self.video_processor.frame_processed.connect(self.on_frame_processed)
-        self.video_processor.progress_updated.connect(self.on_progress_updated)
+        self.video_processor.display_size = self._video_label_size()
+        self.video_processor.violations_detected.connect(self.on_violations_detected)
         self.video_processor.finished.connect(self.on_processing_finished)
         self.video_processor.error.connect(self.on_error)
         
         self.video_processor.start()
+        self.display_timer.start()
         
         self.btn_play.setEnabled(False)
         self.btn_pause.setEnabled(True)
@@ -559,25 +711,34 @@ class MainWindow(QMainWindow):
         
         self.reset_controls()
     
-    @Slot(np.ndarray, dict)
-    def on_frame_processed(self, frame: np.ndarray, stats: dict):
-        """Handle processed frame"""
-        # Convert to QPixmap
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb_frame.shape
-        bytes_per_line = ch * w
-        q_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        
-        # Scale to fit label
-        pixmap = QPixmap.fromImage(q_image)
-        scaled_pixmap = pixmap.scaled(
-            self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
-        )
-        self.video_label.setPixmap(scaled_pixmap)
+    def _video_label_size(self) -> tuple:
+        size = self.video_label.size()
+        return (size.width(), size.height())
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.video_processor:
+            self.video_processor.display_size = self._video_label_size()
+    
+    @Slot()
+    def render_latest_frame(self):
+        """Display timer: hiển thị frame mới nhất (frame cũ hơn đã bị drop)"""
+        if not self.video_processor:
+            return
+        item = self.video_processor.display_slot.take()
+        if item is None:
+            return
+        frame, stats = item
+        
+        # BGR -> QImage trực tiếp (không tạo bản RGB), frame đã được resize sẵn
+        h, w = frame.shape[:2]
+        q_image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_BGR888)
+        self.video_label.setPixmap(QPixmap.fromImage(q_image))
         
         # Update info labels
         self.lbl_frame.setText(f"Frame: {stats['frame']}/{stats['total_frames']}")
         self.lbl_vehicles.setText(f"Xe: {stats['vehicles']}")
+        self.on_progress_updated(stats['frame'], stats['total_frames'])
         
         # Color-code light state
         light_state = stats.get('light_state', '-')
@@ -594,20 +755,21 @@ class MainWindow(QMainWindow):
             self.lbl_violations.setStyleSheet("color: green;")
         self.lbl_violations.setText(f"Vi phạm: {total_violations}")
         
-        # Show alert for new violations
-        new_violations = stats.get('new_violations', [])
-        if new_violations:
-            for v in new_violations:
-                logger.warning(f"🚨 NEW VIOLATION: {v.violation_id} - {v.vehicle_class}")
-            # Update status bar with alert
-            self.status_label.setStyleSheet("color: red; font-weight: bold;")
-            self.status_label.setText(f"⚠️ PHÁT HIỆN VI PHẠM MỚI: {len(new_violations)} xe!")
-        else:
+        if time.monotonic() > self._alert_until:
             self.status_label.setStyleSheet("")
             self.status_label.setText("Đang xử lý video...")
-        
-        # Update violations table
-        self.update_violations_table()
+    
+    @Slot(list)
+    def on_violations_detected(self, new_violations: list):
+        """Show alert for new violations"""
+        for v in new_violations:
+            logger.warning(f"🚨 NEW VIOLATION: {v.violation_id} - {v.vehicle_class}")
+        # Chỉ thêm dòng mới vào bảng
+        self.violations_model.append_violations(new_violations)
+        # Update status bar with alert (giữ 2 giây)
+        self._alert_until = time.monotonic() + 2.0
+        self.status_label.setStyleSheet("color: red; font-weight: bold;")
+        self.status_label.setText(f"⚠️ PHÁT HIỆN VI PHẠM MỚI: {len(new_violations)} xe!")
     
     @Slot(int, int)
     def on_progress_updated(self, current: int, total: int):
@@ -618,8 +780,9 @@ class MainWindow(QMainWindow):
     @Slot()
     def on_processing_finished(self):
         """Handle processing finished"""
-        self.status_label.setText("Xử lý hoàn tất!")
+        self.render_latest_frame()  # frame cuối cùng
         self.reset_controls()
+        self.status_label.setText("Xử lý hoàn tất!")
         QMessageBox.information(self, "Hoàn tất", 
                                f"Đã phát hiện {len(self.violation_detector.violations)} vi phạm")
     
@@ -631,32 +794,13 @@ class MainWindow(QMainWindow):
     
     def reset_controls(self):
         """Reset control buttons"""
+        self.display_timer.stop()
         self.btn_play.setEnabled(True)
         self.btn_pause.setEnabled(False)
         self.btn_stop.setEnabled(False)
         self.btn_pause.setText("⏸️ Tạm dừng")
         self.status_label.setText("Sẵn sàng")
     
-    def update_violations_table(self):
-        """Update violations table"""
-        violations = list(self.violation_detector.violations.values())
-        self.violations_table.setRowCount(len(violations))
-        
-        for row, violation in enumerate(violations):
-            self.violations_table.setItem(row, 0, QTableWidgetItem(violation.violation_id))
-            self.violations_table.setItem(row, 1, 
-                QTableWidgetItem(violation.timestamp.strftime('%Y-%m-%d %H:%M:%S')))
-            self.violations_table.setItem(row, 2, 
-                QTableWidgetItem(str(violation.frame_number)))
-            self.violations_table.setItem(row, 3, 
-                QTableWidgetItem(violation.vehicle_class))
-            self.violations_table.setItem(row, 4, 
-                QTableWidgetItem(violation.light_state))
-            self.violations_table.setItem(row, 5, 
-                QTableWidgetItem(f"{violation.vehicle_confidence:.2f}"))
-            self.violations_table.setItem(row, 6, 
-                QTableWidgetItem(violation.status))
-    
     def update_statistics(self):
         """Update statistics display"""
         stats = self.violation_detector.get_statistics()
@@ -694,44 +838,52 @@ class MainWindow(QMainWindow):
     @Slot()
     def view_evidence(self):
         """View evidence for selected violation"""
-        selected = self.violations_table.currentRow()
-        if selected < 0:
+        index = self.violations_table.currentIndex()
+        if not index.isValid():
             QMessageBox.warning(self, "Cảnh báo", "Vui lòng chọn một vi phạm từ danh sách!")
             return
         
-        violations = list(self.violation_detector.violations.values())
-        if selected < len(violations):
-            violation = violations[selected]
-            if violation.evidence_frames:
-                # Show first evidence frame
-                evidence_data = violation.evidence_frames[0]
-                # Handle both dict (new format) and numpy array (old format)
-                if isinstance(evidence_data, dict):
-                    frame = evidence_data.get('frame')
-                else:
-                    frame = evidence_data
-                
-                if frame is None:
-                    QMessageBox.warning(self, "Lỗi", "Không thể đọc bằng chứng hình ảnh!")
-                    return
-                
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb.shape
-                q_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-                pixmap = QPixmap.fromImage(q_img)
-                
-                # Show in dialog
-                from PySide6.QtWidgets import QDialog, QLabel, QVBoxLayout
-                dialog = QDialog(self)
-                dialog.setWindowTitle(f"Bằng chứng - {violation.violation_id}")
-                layout = QVBoxLayout()
-                lbl = QLabel()
-                lbl.setPixmap(pixmap.scaled(800, 600, Qt.KeepAspectRatio))
-                layout.addWidget(lbl)
-                dialog.setLayout(layout)
-                dialog.exec()
+        row = self.violations_proxy.mapToSource(index).row()
+        record = self.violations_model.record(row)
+        violation = self.violations_model.violation(row)
+        
+        if violation is not None and violation.evidence_frames:
+            # Show first evidence frame (session hiện tại, còn trong RAM)
+            evidence_data = violation.evidence_frames[0]
+            # Handle both dict (new format) and numpy array (old format)
+            if isinstance(evidence_data, dict):
+                frame = evidence_data.get('frame')
             else:
-                QMessageBox.information(self, "Thông báo", "Chưa có bằng chứng hình ảnh cho vi phạm này.")
+                frame = evidence_data
+        elif violation is not None and violation.evidence_paths:
+            # Session hiện tại, ảnh đã ghi ra đĩa (EvidenceWriter giải phóng frames)
+            frame = cv2.imread(violation.evidence_paths[0])
+        elif record.get('evidence_paths'):
+            # Vi phạm cũ từ store: đọc ảnh đã lưu
+            frame = cv2.imread(record['evidence_paths'][0])
+        else:
+            QMessageBox.information(self, "Thông báo", "Chưa có bằng chứng hình ảnh cho vi phạm này.")
+            return
+        
+        if frame is None:
+            QMessageBox.warning(self, "Lỗi", "Không thể đọc bằng chứng hình ảnh!")
+            return
+        
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb.shape
+        q_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(q_img)
+        
+        # Show in dialog
+        from PySide6.QtWidgets import QDialog, QLabel, QVBoxLayout
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"Bằng chứng - {record['violation_id']}")
+        layout = QVBoxLayout()
+        lbl = QLabel()
+        lbl.setPixmap(pixmap.scaled(800, 600, Qt.KeepAspectRatio))
+        layout.addWidget(lbl)
+        dialog.setLayout(layout)
+        dialog.exec()
     
     @Slot()
     def export_pdf(self):
@@ -784,6 +936,16 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Lỗi", f"Không thể xuất JSON: {e}")
                 logger.error(f"JSON export failed: {e}")
 
+    
+    def closeEvent(self, event):
+        """Dừng xử lý + ghi nốt violations vào store khi đóng cửa sổ"""
+        if self.video_processor and self.video_processor.isRunning():
+            self.video_processor.stop()
+            self.video_processor.wait()
+        if self.violation_store is not None:
+            self.violation_store.close()
+        super().closeEvent(event)
+
 
 def run_gui(config: dict, detector, tracker, violation_detector):
     """Run GUI application"""
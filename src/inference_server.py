@@ -0,0 +1,275 @@
+"""
+Local Inference Server
+Một process giữ MỘT model, phục vụ nhiều process camera (RemoteDetector) qua
+Unix socket; request của các client được gom batch động (max_batch / max_wait_ms)
+
+Frame đi qua shared memory (SharedFramePool của client, chỉ gửi handle);
+client không bật shared memory thì frame được pickle qua socket.
+
+Chạy server:
+    python main.py --inference-server [--model rt-detr]
+Client:
+    model.type: "remote" (hoặc --model remote)
+"""
+
+import os
+import secrets
+import signal
+import threading
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Dict
+from loguru import logger
+
+DEFAULT_ADDRESS = '/tmp/rlvd_inference.sock'
+# Authkey sinh ngẫu nhiên cho mỗi host (Unix socket, không cấu hình authkey)
+HOST_AUTHKEY_FILE = Path.home() / '.config' / 'rlvd' / 'inference_authkey'
+
+
+def host_authkey(path: Path = HOST_AUTHKEY_FILE) -> bytes:
+    """
+    Secret của host: tạo lần đầu (file mode 0600, chỉ user đọc được), các lần sau đọc lại
+    nên server và client cùng user trên một máy dùng chung mà không cần cấu hình
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return path.read_bytes().strip()
+    key = secrets.token_hex(32).encode()
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    logger.info(f"Generated inference server authkey: {path}")
+    return key
+
+
+def remote_config(config: dict) -> dict:
+    """
+    config['model']['remote'] với address / authkey đã chuẩn hóa
+
+    Protocol pickle nên authkey phải bí mật: TCP bắt buộc cấu hình authkey
+    (client ở host khác), Unix socket không cấu hình thì dùng host_authkey()
+    """
+    remote = dict(config.get('model', {}).get('remote', {}))
+    address = remote.get('address', DEFAULT_ADDRESS)
+    # YAML list [host, port] -> TCP address
+    remote['address'] = tuple(address) if isinstance(address, list) else address
+    authkey = remote.get('authkey')
+    if authkey:
+        remote['authkey'] = str(authkey).encode()
+    elif isinstance(remote['address'], tuple):
+        raise ValueError("model.remote.authkey is required for a TCP inference server address "
+                         "(use a long random secret shared by server and clients)")
+    else:
+        remote['authkey'] = host_authkey()
+    return remote
+
+
+def connect(config: dict):
+    """Connection tới inference server (raise ConnectionError nếu không có server)"""
+    remote = remote_config(config)
+    try:
+        return Client(remote['address'], authkey=remote['authkey'])
+    except (OSError, EOFError) as e:
+        raise ConnectionError(f"Cannot connect to inference server at {remote['address']}: {e}. "
+                              "Start it with: python main.py --inference-server") from e
+
+
+def encode_detections(detections) -> tuple:
+    """Detections -> (xyxy, confidence, class_id) arrays (gửi qua socket)"""
+    from .detector import DetectionBatch
+
+    batch = DetectionBatch.from_detections(detections)
+    return batch.xyxy, batch.confidence, batch.class_id
+
+
+class InferenceServer:
+    """
+    Server: mỗi client connection một thread, inference trên InferenceBatcher
+    (thread duy nhất gọi model) nên frames của nhiều client nằm chung batch
+
+    Protocol (multiprocessing.connection, request / reply tuần tự trên mỗi connection):
+        ('detect', [FrameHandle | ndarray, ...]) -> ('ok', [(xyxy, conf, class_id), ...])
+                                                    ('error', message)
+        ('ping',)                               -> ('ok', stats dict)
+    """
+
+    def __init__(self, detector, authkey: bytes, address=DEFAULT_ADDRESS,
+                 max_batch: int = 16, max_wait_ms: float = 10.0, stats_interval: float = 60.0):
+        from .service import InferenceBatcher
+
+        self.detector = detector
+        self.address = address
+        self.authkey = authkey
+        self.stats_interval = stats_interval
+        self.batcher = InferenceBatcher(detector, max_batch, max_wait_ms)
+
+        self._listener = None
+        self._stop = threading.Event()
+        self._clients: Dict[int, threading.Thread] = {}
+        self._client_counter = 0
+        self.requests = 0
+
+    @classmethod
+    def from_config(cls, config: dict, detector) -> 'InferenceServer':
+        """Create server từ config['model']['remote']"""
+        remote = remote_config(config)
+        return cls(
+            detector,
+            address=remote['address'],
+            authkey=remote['authkey'],
+            max_batch=remote.get('max_batch', 16),
+            max_wait_ms=remote.get('max_wait_ms', 10.0),
+            stats_interval=remote.get('stats_interval', 60.0)
+        )
+
+    # ========================================================================
+    # RUN
+    # ========================================================================
+
+    def serve_forever(self):
+        """Nhận client tới khi SIGTERM / SIGINT"""
+        self._remove_stale_socket()
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self._install_signal_handlers()
+        self.batcher.start()
+
+        stats_thread = threading.Thread(target=self._stats_loop, name='inference-stats',
+                                        daemon=True)
+        stats_thread.start()
+
+        logger.info(f"Inference server listening on {self.address} "
+                    f"(batch <= {self.batcher.max_batch} / {self.batcher.max_wait * 1000:.0f} ms)")
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, EOFError):
+                    if self._stop.is_set():
+                        break
+                    continue  # Client lỗi handshake (sai authkey, ...)
+                self._client_counter += 1
+                client_id = self._client_counter
+                thread = threading.Thread(target=self._serve_client, args=(client_id, conn),
+                                          name=f"client-{client_id}", daemon=True)
+                self._clients[client_id] = thread
+                thread.start()
+        finally:
+            self.shutdown()
+
+    def stop(self):
+        """Dừng nhận client (an toàn gọi từ signal handler)"""
+        self._stop.set()
+        if self._listener is not None:
+            try:
+                self._listener.close()
+            except OSError:
+                pass
+
+    def shutdown(self):
+        self.stop()
+        self.batcher.stop()
+        if isinstance(self.address, str) and not self.address.startswith('\\\\'):
+            Path(self.address).unlink(missing_ok=True)
+        self.log_stats()
+        logger.info("Inference server stopped")
+
+    def _remove_stale_socket(self):
+        """Socket file của server cũ đã chết: xóa để bind lại"""
+        if not isinstance(self.address, str) or not os.path.exists(self.address):
+            return
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except (OSError, EOFError):
+            os.unlink(self.address)
+            return
+        raise RuntimeError(f"Inference server already running at {self.address}")
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def handle(signum, frame):
+            logger.info(f"Received {signal.Signals(signum).name}, stopping...")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, handle)
+
+    # ========================================================================
+    # CLIENT
+    # ========================================================================
+
+    def _serve_client(self, client_id: int, conn):
+        from .shared_frames import FrameHandle, attach_shared_memory, read_frame
+
+        logger.info(f"Client {client_id} connected")
+        segments = {}  # shared memory của client (attach lazy theo tên)
+        try:
+            while not self._stop.is_set():
+                if not conn.poll(0.5):
+                    continue
+                message = conn.recv()
+
+                if message[0] == 'ping':
+                    conn.send(('ok', self.get_stats()))
+                    continue
+                if message[0] != 'detect':
+                    conn.send(('error', f"Unknown request: {message[0]}"))
+                    continue
+
+                # Frame trong shared memory: client giữ slot tới khi nhận reply (zero-copy)
+                frames = []
+                for item in message[1]:
+                    if isinstance(item, FrameHandle):
+                        if item.pool not in segments:
+                            segments[item.pool] = attach_shared_memory(item.pool)
+                        item = read_frame(segments[item.pool], item)
+                    frames.append(item)
+
+                try:
+                    futures = [self.batcher.submit(frame) for frame in frames]
+                    results = [encode_detections(future.result()) for future in futures]
+                    reply = ('ok', results)
+                except Exception as e:
+                    reply = ('error', str(e))
+                frames = futures = None  # Bỏ view trước khi đóng segment
+                self.requests += 1
+                conn.send(reply)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            for shm in segments.values():
+                try:
+                    shm.close()
+                except BufferError:
+                    pass
+            self._clients.pop(client_id, None)
+            logger.info(f"Client {client_id} disconnected")
+
+    # ========================================================================
+    # STATISTICS
+    # ========================================================================
+
+    def get_stats(self) -> dict:
+        stats = self.batcher.get_stats()
+        stats.update({'clients': len(self._clients), 'requests': self.requests})
+        return stats
+
+    def _stats_loop(self):
+        while not self._stop.wait(self.stats_interval):
+            self.log_stats()
+
+    def log_stats(self):
+        stats = self.get_stats()
+        logger.info(f"Inference server: {stats['clients']} clients, {stats['requests']} requests, "
+                    f"{stats['frames']} frames | avg batch {stats['avg_batch']:.1f}, "
+                    f"{stats['throughput_fps']:.1f} FPS")
+
+
+def run_inference_server(config: dict, detector):
+    """Entry point cho main.py --inference-server"""
+    server = InferenceServer.from_config(config, detector)
+    server.serve_forever()
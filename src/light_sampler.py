@@ -0,0 +1,137 @@
+"""
+Traffic Light State Sampler
+Đọc màu đèn giao thông từ crop nhỏ quanh vị trí đèn đã biết (HSV),
+thay cho full inference trên các frame không chạy detector
+"""
+
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+from loguru import logger
+
+from .detector import Detection, DetectionBatch
+from .violation_logic import LIGHT_CLASSES
+
+
+# Khoảng Hue (OpenCV: 0-179) cho từng màu đèn
+HUE_RANGES = {
+    'red_light': [(0, 10), (160, 179)],
+    'yellow_light': [(15, 35)],
+    'green_light': [(40, 95)],
+}
+
+
+class LightStateSampler:
+    """
+    Nhớ vị trí đèn từ full detection, phân loại màu đèn mỗi frame bằng HSV
+
+    Pixel "sáng" = saturation >= min_saturation và value >= min_value.
+    Màu đèn = màu có nhiều pixel sáng nhất trong crop; confidence = tỉ lệ
+    pixel sáng thuộc màu đó. Không đủ pixel sáng / không rõ màu -> None
+    (frame đó không có vote, giống frame detector không thấy đèn).
+    """
+
+    def __init__(self, enabled: bool = False, detect_interval: int = 5,
+                 margin: float = 0.2, min_saturation: int = 100,
+                 min_value: int = 150, min_lit_ratio: float = 0.02,
+                 min_confidence: float = 0.6):
+        self.enabled = enabled
+        self.detect_interval = max(1, detect_interval)
+        self.margin = margin
+        self.min_saturation = min_saturation
+        self.min_value = min_value
+        self.min_lit_ratio = min_lit_ratio
+        self.min_confidence = min_confidence
+
+        # Vị trí đèn (bbox của detection đèn có confidence cao nhất)
+        self.light_bbox: Optional[Tuple[int, int, int, int]] = None
+
+        # Statistics
+        self.samples = 0
+        self.votes = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'LightStateSampler':
+        """Create sampler từ config['performance']['light_sampler']"""
+        sampler_config = config.get('performance', {}).get('light_sampler', {})
+        return cls(
+            enabled=sampler_config.get('enabled', False),
+            detect_interval=sampler_config.get('detect_interval', 5),
+            margin=sampler_config.get('margin', 0.2),
+            min_saturation=sampler_config.get('min_saturation', 100),
+            min_value=sampler_config.get('min_value', 150),
+            min_lit_ratio=sampler_config.get('min_lit_ratio', 0.02),
+            min_confidence=sampler_config.get('min_confidence', 0.6)
+        )
+
+    @property
+    def ready(self) -> bool:
+        """Đã biết vị trí đèn chưa"""
+        return self.enabled and self.light_bbox is not None
+
+    def observe(self, detections: List[Detection]):
+        """Cập nhật vị trí đèn từ full detection"""
+        if not self.enabled:
+            return
+
+        detections = DetectionBatch.from_detections(detections)
+        best_index = detections.best_index(detections.class_mask(LIGHT_CLASSES))
+        if best_index is not None:
+            self.light_bbox = detections[best_index].bbox
+
+    def sample(self, frame: np.ndarray) -> Optional[Detection]:
+        """
+        Phân loại màu đèn tại vị trí đã nhớ
+
+        Returns:
+            Detection đèn (bbox = vị trí đã nhớ) hoặc None
+        """
+        if not self.ready:
+            return None
+
+        self.samples += 1
+
+        x1, y1, x2, y2 = self.light_bbox
+        mx = int((x2 - x1) * self.margin)
+        my = int((y2 - y1) * self.margin)
+        h, w = frame.shape[:2]
+        crop = frame[max(0, y1 - my):min(h, y2 + my), max(0, x1 - mx):min(w, x2 + mx)]
+        if crop.size == 0:
+            return None
+
+        hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
+        hue = hsv[..., 0]
+        lit = (hsv[..., 1] >= self.min_saturation) & (hsv[..., 2] >= self.min_value)
+
+        total = int(np.count_nonzero(lit))
+        if total < max(1, self.min_lit_ratio * lit.size):
+            return None
+
+        counts = {}
+        for class_name, ranges in HUE_RANGES.items():
+            in_range = np.zeros_like(lit)
+            for low, high in ranges:
+                in_range |= (hue >= low) & (hue <= high)
+            counts[class_name] = int(np.count_nonzero(lit & in_range))
+
+        class_name = max(counts, key=counts.get)
+        confidence = counts[class_name] / total
+        if confidence < self.min_confidence:
+            return None
+
+        self.votes += 1
+        return Detection(
+            class_name=class_name,
+            confidence=confidence,
+            bbox=self.light_bbox
+        )
+
+    def log_stats(self):
+        if self.enabled and self.samples:
+            logger.info(f"Light sampler: {self.votes}/{self.samples} crops classified "
+                        f"({self.votes / self.samples:.0%})")
+
+    def reset(self):
+        self.light_bbox = None
+        self.samples = 0
+        self.votes = 0
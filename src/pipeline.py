@@ -0,0 +1,535 @@
+"""
+Pipelined Video Processing
+Chạy decode, inference, tracking/rules, annotation và encoding trên các
+worker riêng, nối với nhau bằng bounded queues
+"""
+
+import time
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, List, Optional
+from loguru import logger
+
+
+# Sentinel báo hết stream (đi xuyên qua tất cả các stage)
+_END_OF_STREAM = object()
+
+# Timeout khi put/get để kiểm tra cờ abort (giây)
+_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class FramePacket:
+    """Dữ liệu của một frame đi qua pipeline"""
+    frame_number: int
+    frame: Any
+    timestamp: Any = None
+    detections: list = field(default_factory=list)
+    detected: bool = True  # False = không chạy detector (motion gating)
+    tracks: list = field(default_factory=list)  # [(track_id, bbox)] snapshot cho annotate
+    violations: list = field(default_factory=list)
+    annotated: Any = None
+
+
+@dataclass
+class StageStats:
+    """Thống kê cho mỗi stage"""
+    name: str
+    processed: int = 0
+    busy_time: float = 0.0
+    calls: int = 0
+    queue_depth_sum: int = 0
+    max_queue_depth: int = 0
+
+    def record(self, elapsed: float, queue_depth: int, count: int = 1):
+        self.processed += count
+        self.calls += 1
+        self.busy_time += elapsed
+        self.queue_depth_sum += queue_depth
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    @property
+    def avg_queue_depth(self) -> float:
+        return self.queue_depth_sum / self.calls if self.calls else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Số frame/giây stage này xử lý được (khi không phải chờ)"""
+        return self.processed / self.busy_time if self.busy_time > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'stage': self.name,
+            'processed': self.processed,
+            'busy_time_s': round(self.busy_time, 3),
+            'throughput_fps': round(self.throughput, 2),
+            'avg_queue_depth': round(self.avg_queue_depth, 2),
+            'max_queue_depth': self.max_queue_depth
+        }
+
+
+class PipelineStage:
+    """
+    Một stage của pipeline = một worker thread
+
+    Mỗi stage chỉ có MỘT worker và queue là FIFO, nên thứ tự frame
+    được giữ nguyên từ đầu đến cuối pipeline.
+
+    Batch stage (batched=True) gom đúng batch_size packet (trừ batch
+    cuối) rồi gọi func(List[FramePacket]) -> List[FramePacket], kể cả khi
+    batch_size = 1. Kích thước batch cố định nên kết quả không phụ thuộc
+    tốc độ của stage khác.
+    """
+
+    def __init__(self, name: str, func: Callable, batch_size: int = 1,
+                 batched: bool = False):
+        self.name = name
+        self.func = func
+        self.batch_size = max(1, batch_size)
+        self.batched = batched or self.batch_size > 1
+        self.stats = StageStats(name)
+        self.input_queue: Optional[queue.Queue] = None
+        self.output_queue: Optional[queue.Queue] = None
+        self.thread: Optional[threading.Thread] = None
+
+
+class VideoPipeline:
+    """
+    Staged pipeline với bounded queues
+
+    Usage:
+        pipeline = VideoPipeline(queue_size=8)
+        pipeline.add_stage('inference', infer_fn)
+        pipeline.add_stage('encode', encode_fn)
+        pipeline.run(frame_source)
+
+    frame_source là iterable sinh FramePacket (stage decode). Mỗi stage
+    nhận packet, sửa tại chỗ và trả về packet (hoặc None để bỏ frame).
+    Stage batched (batched=True hoặc batch_size > 1) nhận và trả về list packet.
+    """
+
+    def __init__(self, queue_size: int = 8, threaded: bool = True):
+        self.queue_size = max(1, queue_size)
+        self.threaded = threaded
+        self.stages: List[PipelineStage] = []
+        self.source_stats = StageStats('decode')
+        self.wall_time = 0.0
+        self._abort = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'VideoPipeline':
+        """Create pipeline từ config['performance']['pipeline']"""
+        pipeline_config = config.get('performance', {}).get('pipeline', {})
+        return cls(
+            queue_size=pipeline_config.get('queue_size', 8),
+            threaded=pipeline_config.get('enabled', True)
+        )
+
+    def add_stage(self, name: str, func: Callable, batch_size: int = 1,
+                  batched: bool = False):
+        self.stages.append(PipelineStage(name, func, batch_size, batched))
+        return self
+
+    # ========================================================================
+    # RUN
+    # ========================================================================
+
+    def run(self, source: Iterable[FramePacket]) -> List[dict]:
+        """
+        Chạy pipeline đến khi source hết frame
+
+        Returns:
+            Per-stage statistics (list of dict)
+        """
+        start = time.perf_counter()
+
+        if self.threaded:
+            self._run_threaded(source)
+        else:
+            self._run_sequential(source)
+
+        self.wall_time = time.perf_counter() - start
+
+        if self._error is not None:
+            raise self._error
+
+        return self.get_stats()
+
+    def _run_sequential(self, source: Iterable[FramePacket]):
+        """Chạy tuần tự trên 1 thread (debug / so sánh kết quả)"""
+        pending = [[] for _ in self.stages]
+
+        def push(index: int, packets: List[FramePacket], flush: bool = False):
+            if index >= len(self.stages):
+                return
+            stage = self.stages[index]
+            pending[index].extend(packets)
+            while pending[index] and (flush or len(pending[index]) >= stage.batch_size):
+                batch = pending[index][:stage.batch_size]
+                del pending[index][:stage.batch_size]
+                t0 = time.perf_counter()
+                results = self._call_stage(stage, batch)
+                stage.stats.record(time.perf_counter() - t0, 0, len(batch))
+                push(index + 1, results)
+            if flush:
+                push(index + 1, [], flush=True)
+
+        iterator = iter(source)
+        while True:
+            t0 = time.perf_counter()
+            packet = next(iterator, None)
+            if packet is None:
+                break
+            self.source_stats.record(time.perf_counter() - t0, 0)
+            push(0, [packet])
+
+        push(0, [], flush=True)
+
+    def _run_threaded(self, source: Iterable[FramePacket]):
+        """Mỗi stage chạy trên 1 thread riêng"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+
+        for i, stage in enumerate(self.stages):
+            stage.input_queue = queues[i]
+            stage.output_queue = queues[i + 1] if i + 1 < len(queues) else None
+            stage.thread = threading.Thread(
+                target=self._stage_worker, args=(stage,),
+                name=f"pipeline-{stage.name}", daemon=True
+            )
+            stage.thread.start()
+
+        # Decode chạy trên thread gọi run()
+        first_queue = queues[0] if queues else None
+        try:
+            iterator = iter(source)
+            while not self._abort.is_set():
+                t0 = time.perf_counter()
+                packet = next(iterator, None)
+                if packet is None:
+                    break
+                depth = first_queue.qsize() if first_queue else 0
+                self.source_stats.record(time.perf_counter() - t0, depth)
+                if first_queue is not None:
+                    self._put(first_queue, packet)
+        except BaseException as e:
+            self._fail('decode', e)
+        finally:
+            if first_queue is not None:
+                self._put(first_queue, _END_OF_STREAM, force=True)
+
+        for stage in self.stages:
+            stage.thread.join()
+
+    def _stage_worker(self, stage: PipelineStage):
+        batch: List[FramePacket] = []
+        while True:
+            item = stage.input_queue.get()
+            end_of_stream = item is _END_OF_STREAM
+
+            if not end_of_stream:
+                batch.append(item)
+
+            # Sau khi abort: chỉ drain queue để upstream không bị block
+            if self._abort.is_set():
+                batch.clear()
+            elif batch and (end_of_stream or len(batch) >= stage.batch_size):
+                depth = stage.input_queue.qsize()
+                t0 = time.perf_counter()
+                try:
+                    results = self._call_stage(stage, batch)
+                except BaseException as e:
+                    self._fail(stage.name, e)
+                    results = []
+                stage.stats.record(time.perf_counter() - t0, depth, len(batch))
+                batch = []
+
+                if stage.output_queue is not None:
+                    for result in results:
+                        self._put(stage.output_queue, result)
+
+            if end_of_stream:
+                if stage.output_queue is not None:
+                    self._put(stage.output_queue, _END_OF_STREAM, force=True)
+                return
+
+    @staticmethod
+    def _call_stage(stage: PipelineStage, batch: List[FramePacket]) -> List[FramePacket]:
+        """Gọi func của stage, chuẩn hóa output thành list packet"""
+        if stage.batched:
+            results = stage.func(batch)
+        else:
+            results = [stage.func(batch[0])]
+        return [r for r in results if r is not None]
+
+    def _put(self, q: queue.Queue, item, force: bool = False):
+        """Blocking put nhưng vẫn thoát được khi pipeline bị abort"""
+        while True:
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                if self._abort.is_set() and not force:
+                    return
+
+    def _fail(self, stage_name: str, error: BaseException):
+        if self._error is None:
+            self._error = error
+            logger.error(f"Pipeline stage '{stage_name}' failed: {error}")
+        self._abort.set()
+
+    def stop(self):
+        """Yêu cầu dừng pipeline (frame đang xử lý sẽ bị bỏ)"""
+        self._abort.set()
+
+    # ========================================================================
+    # STATISTICS
+    # ========================================================================
+
+    def queue_depths(self) -> dict:
+        """Độ sâu hiện tại của input queue mỗi stage"""
+        return {
+            stage.name: stage.input_queue.qsize() if stage.input_queue else 0
+            for stage in self.stages
+        }
+
+    def get_stats(self) -> List[dict]:
+        stats = [self.source_stats.to_dict()]
+        stats.extend(stage.stats.to_dict() for stage in self.stages)
+        return stats
+
+    def log_stats(self):
+        """Log bảng thống kê per-stage"""
+        frames = self.source_stats.processed
+        overall_fps = frames / self.wall_time if self.wall_time > 0 else 0.0
+        mode = "threaded" if self.threaded else "sequential"
+
+        logger.info(f"Pipeline ({mode}): {frames} frames in {self.wall_time:.1f}s "
+                    f"({overall_fps:.1f} FPS)")
+        for s in self.get_stats():
+            logger.info(f"   - {s['stage']:<10} {s['throughput_fps']:>8.1f} FPS | "
+                        f"busy {s['busy_time_s']:>7.1f}s | "
+                        f"queue avg {s['avg_queue_depth']:.1f} / max {s['max_queue_depth']}")
+
+
+# ============================================================================
+# VIDEO PROCESSING
+# ============================================================================
+
+def process_video(video_path: str, detector, tracker, violation_detector,
+                  config: dict, output_dir: str, session_dir: Optional[str] = None,
+                  show_progress: bool = True) -> dict:
+    """
+    Xử lý một video: decode → inference → tracking/rules → annotate → encode,
+    sau đó lưu evidence, violations.json và report.pdf vào session directory
+
+    Args:
+        video_path: Video đầu vào
+        detector, tracker, violation_detector: Components (tracker và
+            violation_detector phải mới cho mỗi video)
+        config: Config dict
+        output_dir: Thư mục chứa sessions (session = output_dir/<timestamp>)
+        session_dir: Dùng thư mục này thay cho output_dir/<timestamp>
+        show_progress: Hiện tqdm progress bar
+
+    Returns:
+        Summary dict của video (frames, violations, thời gian xử lý, ...)
+
+    Raises:
+        IOError: Không mở được video
+    """
+    import cv2
+    from datetime import datetime
+    from pathlib import Path
+    from tqdm import tqdm
+    from .scheduler import MotionGatedScheduler
+    from .clock import create_clock
+    from .evidence_writer import EvidenceWriter
+    from .violation_store import ViolationStore
+
+    # Open video
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video: {video_path}")
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    logger.info(f"Video: {total_frames} frames, {fps} FPS, {width}x{height}")
+
+    # Timestamp theo thời gian video -> verdict không phụ thuộc tốc độ xử lý
+    clock = create_clock(config, video_path, fps)
+    violation_detector.fps = clock.fps
+
+    # Create session directory
+    if session_dir is None:
+        session_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        session_dir = Path(output_dir) / session_id
+    session_dir = Path(session_dir)
+    session_dir.mkdir(parents=True, exist_ok=True)
+
+    logger.info(f"Session directory: {session_dir}")
+
+    # Output video
+    output_video_path = session_dir / 'output.mp4'
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(str(output_video_path), fourcc, fps, (width, height))
+
+    # Process frames: decode → inference → tracking/rules → annotate → encode
+    pipeline = VideoPipeline.from_config(config)
+    scheduler = MotionGatedScheduler.from_config(config)
+
+    # Ảnh bằng chứng + JSON được ghi nền ngay khi có vi phạm
+    store = ViolationStore.from_config(config)
+    writer = EvidenceWriter.from_config(config, violation_detector, session_dir, store)
+
+    def decode_frames():
+        frame_number = 0
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_number += 1
+            timestamp = clock.timestamp(frame_number, cap.get(cv2.CAP_PROP_POS_MSEC))
+            yield FramePacket(frame_number=frame_number, frame=frame, timestamp=timestamp)
+
+    def detect(selected: List[FramePacket]):
+        # Batched inference (performance.batch_size frames / lần gọi model)
+        results = detector.detect_batch([p.frame for p in selected])
+        for packet, detections in zip(selected, results):
+            packet.detections = detections
+            scheduler.observe(packet.frame_number, detections, packet.frame.shape)
+
+    def infer(packets: List[FramePacket]) -> List[FramePacket]:
+        # Motion gating: chỉ detect frame có chuyển động / quanh lúc đèn đổi màu
+        # Frame bị skip: đọc màu đèn từ crop quanh vị trí đèn (light sampler)
+        selected = []
+        for packet in packets:
+            packet.detected = scheduler.should_detect(packet.frame, packet.frame_number)
+            if not packet.detected:
+                packet.detections = scheduler.sample_lights(packet.frame, packet.frame_number)
+                continue
+            selected.append(packet)
+            if scheduler.active:
+                # observe() (đèn đổi màu, vị trí đèn) quyết định gating của frame sau:
+                # detect + observe ngay, scheduler luôn thấy frame theo thứ tự
+                detect(selected)
+                selected = []
+        if selected:
+            detect(selected)
+        return packets
+
+    def track_and_check(packet: FramePacket) -> FramePacket:
+        # Track (frame bị skip: ngoại suy vị trí từ tracks hiện có)
+        if packet.detected:
+            tracked_vehicles = tracker.update(packet.detections)
+        else:
+            tracked_vehicles, packet.detections = scheduler.extrapolate_tracks(
+                tracker, packet.detections)
+
+        # Check violations
+        packet.violations = violation_detector.update(
+            tracked_vehicles, packet.detections, packet.frame,
+            packet.frame_number, packet.timestamp
+        )
+        for violation in packet.violations:
+            # Vị trí trong nguồn: clip bằng chứng được cắt sau (clip_extractor)
+            violation.source_video = str(video_path)
+            violation.source_pts = clock.position(violation.timestamp)
+        # Ghi khi đã đủ frame bằng chứng sau vi phạm (deferred capture)
+        for violation in violation_detector.pop_finalized_violations():
+            writer.submit(violation)
+
+        # Snapshot bbox: TrackedObject sẽ bị frame sau cập nhật
+        packet.tracks = [(v.track_id, v.detection.bbox) for v in tracked_vehicles]
+        return packet
+
+    def annotate(packet: FramePacket) -> FramePacket:
+        # Draw on frame
+        annotated = detector.draw_detections(packet.frame, packet.detections)
+
+        # Draw tracking IDs
+        for track_id, (x1, y1, x2, y2) in packet.tracks:
+            cv2.putText(annotated, f"ID:{track_id}",
+                       (x1, y2 + 20), cv2.FONT_HERSHEY_SIMPLEX,
+                       0.5, (255, 255, 0), 2)
+
+        packet.annotated = annotated
+        packet.frame = None  # Giải phóng frame gốc sớm
+        return packet
+
+    # Stage lỗi -> pipeline.run raise: vẫn giải phóng capture / VideoWriter /
+    # SQLite connection (batch mode chạy tiếp video sau)
+    try:
+        with writer, tqdm(total=total_frames, desc="Processing", disable=not show_progress) as pbar:
+            def encode(packet: FramePacket) -> None:
+                # Write frame
+                out.write(packet.annotated)
+
+                # Update progress
+                pbar.update(1)
+                if packet.frame_number % 30 == 0:
+                    postfix = {
+                        'vehicles': len(packet.tracks),
+                        'violations': len(violation_detector.violations)
+                    }
+                    postfix.update({f"q_{k}": v for k, v in pipeline.queue_depths().items()})
+                    pbar.set_postfix(postfix)
+                return None
+
+            pipeline.add_stage('inference', infer, batch_size=detector.batch_size, batched=True)
+            pipeline.add_stage('rules', track_and_check)
+            pipeline.add_stage('annotate', annotate)
+            pipeline.add_stage('encode', encode)
+            pipeline.run(decode_frames())
+
+            # Hết video: violations còn chờ frame sau vi phạm
+            for violation in violation_detector.pop_finalized_violations(flush=True):
+                writer.submit(violation)
+    finally:
+        if store is not None:
+            store.close()
+        cap.release()
+        out.release()
+
+    pipeline.log_stats()
+    scheduler.log_stats()
+
+    # Save violations
+    logger.info(f"Total violations detected: {len(violation_detector.violations)}")
+
+    if violation_detector.violations:
+        # Generate PDF report (evidence + JSON đã được EvidenceWriter ghi)
+        try:
+            from .report_generator import ViolationReportGenerator
+            report_gen = ViolationReportGenerator(config)
+            pdf_path = session_dir / 'report.pdf'
+            report_gen.generate_report(
+                list(violation_detector.violations.values()),
+                str(pdf_path)
+            )
+            logger.info(f"Report saved: {pdf_path}")
+        except Exception as e:
+            logger.warning(f"Failed to generate PDF: {e}")
+
+    logger.info(f"Output video: {output_video_path}")
+    logger.info(f"Session saved to: {session_dir}")
+    logger.info("Processing complete!")
+
+    frames = pipeline.source_stats.processed
+    statistics = violation_detector.get_statistics()
+    return {
+        'video': str(video_path),
+        'session_dir': str(session_dir),
+        'output_video': str(output_video_path),
+        'frames': frames,
+        'video_fps': fps,
+        'processing_time_s': round(pipeline.wall_time, 2),
+        'processing_fps': round(frames / pipeline.wall_time, 2) if pipeline.wall_time > 0 else 0.0,
+        'violations': statistics['total_violations'],
+        'by_vehicle_class': statistics['by_vehicle_class'],
+        'inference': scheduler.get_stats()
+    }
@@ -132,7 +132,7 @@ class ViolationReportGenerator:
                     ['Frame so:', str(violation.frame_number)],
                     ['Loai phuong tien:', violation.vehicle_class],
                     ['Trang thai den:', violation.light_state],
-                    ['Do tin cay:', f"{violation.confidence:.2%}"],
+                    ['Do tin cay:', f"{violation.vehicle_confidence:.2%}"],
                     ['Muc phat:', self.location_config.get('fine_amount', 'Theo quy dinh')]
                 ]
                 
@@ -188,3 +188,15 @@ class ViolationReportGenerator:
     def generate_single_violation_report(self, violation: Violation, output_path: str) -> str:
         """Generate report for a single violation"""
         return self.generate_report([violation], output_path)
+    
+    def generate_report_from_store(self, store, output_path: str, **filters) -> str:
+        """
+        Generate PDF report cho violations trong ViolationStore
+        
+        Args:
+            store: ViolationStore
+            output_path: Output PDF path
+            **filters: camera_id, vehicle_class, status, start, end (xem ViolationStore.query)
+        """
+        violations = list(store.iter_violations(**filters))
+        return self.generate_report(violations, output_path)
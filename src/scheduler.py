@@ -0,0 +1,292 @@
+"""
+Motion-Gated Inference Scheduler
+Bỏ qua full inference trên các frame gần như đứng yên (vd: pha đèn đỏ dài),
+tracker ngoại suy vị trí xe và light sampler đọc màu đèn trên các frame bị bỏ qua
+"""
+
+import cv2
+import numpy as np
+from collections import Counter
+from typing import List, Optional, Tuple
+from loguru import logger
+
+from .detector import Detection, DetectionBatch
+from .violation_logic import LIGHT_CLASSES
+from .light_sampler import LightStateSampler
+
+
+class MotionGatedScheduler:
+    """
+    Quyết định frame nào cần chạy detector
+
+    Một frame được detect khi (theo thứ tự ưu tiên):
+        first      - chưa có frame tham chiếu
+        transition - trong transition_frames frame sau khi đèn đổi màu
+        (light sampler đã biết vị trí đèn: skip nếu chưa đủ detect_interval frame)
+        interval   - chỉ bật light sampler: detect mỗi detect_interval frame
+        cadence    - đã bỏ qua max_skip frame liên tiếp
+        light      - vùng đèn giao thông thay đổi (đèn sắp/đang đổi màu)
+        motion     - tỉ lệ pixel thay đổi so với frame detect gần nhất > motion_ratio
+
+    Ngược lại frame bị bỏ qua (skip). So sánh với frame DETECT gần nhất
+    (không phải frame liền trước) nên chuyển động chậm vẫn được cộng dồn.
+    Trên frame bị skip, sample_lights() cho vote màu đèn từ light sampler.
+
+    Quyết định chỉ phụ thuộc vào frames và detections đã observe() theo
+    đúng thứ tự, nên kết quả giống nhau giữa các lần chạy.
+    """
+
+    def __init__(self, enabled: bool = False, analysis_width: int = 160,
+                 pixel_threshold: int = 15, motion_ratio: float = 0.003,
+                 max_skip: int = 5, light_threshold: float = 12.0,
+                 light_margin: float = 0.5, transition_frames: int = 15,
+                 light_sampler: Optional[LightStateSampler] = None):
+        self.enabled = enabled
+        self.analysis_width = analysis_width
+        self.pixel_threshold = pixel_threshold
+        self.motion_ratio = motion_ratio
+        self.max_skip = max(1, max_skip)
+        self.light_threshold = light_threshold
+        self.light_margin = light_margin
+        self.transition_frames = transition_frames
+        self.light_sampler = light_sampler or LightStateSampler()
+
+        # Frame tham chiếu = frame detect gần nhất (gray, đã thu nhỏ)
+        self._reference: Optional[np.ndarray] = None
+        self._last_detect_frame = -1
+
+        # Vùng đèn giao thông (full resolution) + crop tham chiếu
+        self._light_region: Optional[Tuple[int, int, int, int]] = None
+        self._light_reference: Optional[np.ndarray] = None
+        self._light_class: Optional[str] = None
+        self._force_until = -1
+
+        # Statistics
+        self.detected = 0
+        self.skipped = 0
+        self.reasons = Counter()
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'MotionGatedScheduler':
+        """Create scheduler từ config['performance']['motion_gating']"""
+        gating_config = config.get('performance', {}).get('motion_gating', {})
+        return cls(
+            enabled=gating_config.get('enabled', False),
+            analysis_width=gating_config.get('analysis_width', 160),
+            pixel_threshold=gating_config.get('pixel_threshold', 15),
+            motion_ratio=gating_config.get('motion_ratio', 0.003),
+            max_skip=gating_config.get('max_skip', 5),
+            light_threshold=gating_config.get('light_threshold', 12.0),
+            light_margin=gating_config.get('light_margin', 0.5),
+            transition_frames=gating_config.get('transition_frames', 15),
+            light_sampler=LightStateSampler.from_config(config)
+        )
+
+    @property
+    def active(self) -> bool:
+        """Có bỏ qua frame nào không (motion gating hoặc light sampler)"""
+        return self.enabled or self.light_sampler.enabled
+
+    # ========================================================================
+    # DECISION
+    # ========================================================================
+
+    def should_detect(self, frame: np.ndarray, frame_number: int) -> bool:
+        """
+        Frame này có cần chạy detector không
+
+        Gọi theo đúng thứ tự frame. Frame được chọn trở thành frame tham chiếu.
+        """
+        if not self.active:
+            self.detected += 1
+            return True
+
+        small = self._downscale(frame) if self.enabled else None
+        reason = self._detect_reason(frame, small, frame_number)
+
+        if reason is None:
+            self.skipped += 1
+            return False
+
+        self.reasons[reason] += 1
+        self.detected += 1
+        self._reference = small
+        self._last_detect_frame = frame_number
+        self._light_reference = self._crop_light(frame)
+        return True
+
+    def _detect_reason(self, frame: np.ndarray, small: np.ndarray,
+                       frame_number: int) -> Optional[str]:
+        if self._last_detect_frame < 0:
+            return 'first'
+        if small is not None and (self._reference is None or self._reference.shape != small.shape):
+            return 'first'
+
+        if frame_number <= self._force_until:
+            return 'transition'
+
+        since_detect = frame_number - self._last_detect_frame
+        if self.light_sampler.ready and since_detect < self.light_sampler.detect_interval:
+            return None
+
+        if not self.enabled:
+            return 'interval'
+
+        if since_detect >= self.max_skip:
+            return 'cadence'
+
+        if self._light_changed(frame):
+            return 'light'
+
+        diff = cv2.absdiff(small, self._reference)
+        changed = np.count_nonzero(diff > self.pixel_threshold)
+        if changed > self.motion_ratio * diff.size:
+            return 'motion'
+
+        return None
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        width = min(self.analysis_width, w)
+        height = max(1, int(h * width / w))
+        small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def _crop_light(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        if self._light_region is None:
+            return None
+        x1, y1, x2, y2 = self._light_region
+        crop = frame[y1:y2, x1:x2]
+        if crop.size == 0:
+            return None
+        return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop.copy()
+
+    def _light_changed(self, frame: np.ndarray) -> bool:
+        """Đèn là object nhỏ - so sánh riêng vùng đèn ở full resolution"""
+        if self._light_region is None:
+            return False
+
+        crop = self._crop_light(frame)
+        if crop is None:
+            return False
+        if self._light_reference is None or self._light_reference.shape != crop.shape:
+            self._light_reference = crop
+            return False
+
+        return float(cv2.absdiff(crop, self._light_reference).mean()) > self.light_threshold
+
+    # ========================================================================
+    # FEEDBACK
+    # ========================================================================
+
+    def observe(self, frame_number: int, detections: List[Detection],
+                frame_shape: Tuple[int, ...]):
+        """
+        Cập nhật trạng thái đèn từ detections của một frame đã detect
+
+        Gọi theo thứ tự frame, sau khi detector trả kết quả.
+        """
+        if not self.active:
+            return
+
+        detections = DetectionBatch.from_detections(detections)
+        self.light_sampler.observe(detections)
+
+        best_index = detections.best_index(detections.class_mask(LIGHT_CLASSES))
+        if best_index is None:
+            return
+
+        best = detections[best_index]
+        self._update_light_class(frame_number, best.class_name)
+
+        # Chỉ đổi vùng đèn khi đèn ra khỏi vùng cũ (bỏ qua bbox jitter)
+        cx, cy = best.center
+        region = self._light_region
+        if region is None or not (region[0] <= cx < region[2] and region[1] <= cy < region[3]):
+            self._light_region = self._expand(best.bbox, frame_shape)
+            self._light_reference = None
+
+    def sample_lights(self, frame: np.ndarray, frame_number: int) -> List[Detection]:
+        """
+        Vote màu đèn cho frame bị skip (light sampler)
+
+        Gọi theo thứ tự frame, ngay sau should_detect() trả về False.
+        Màu đèn đổi -> các frame tiếp theo được full detect (transition).
+        """
+        light = self.light_sampler.sample(frame)
+        if light is None:
+            return []
+        self._update_light_class(frame_number, light.class_name)
+        return [light]
+
+    def _update_light_class(self, frame_number: int, class_name: str):
+        if self._light_class is not None and class_name != self._light_class:
+            # Đèn đổi màu: detect liên tục một đoạn để voting ổn định
+            self._force_until = max(self._force_until, frame_number + self.transition_frames)
+            logger.debug(f"Scheduler: light {self._light_class} → {class_name}, "
+                         f"full detect until frame {self._force_until}")
+        self._light_class = class_name
+
+    def extrapolate_tracks(self, tracker, sampled_lights: Optional[List[Detection]] = None
+                           ) -> Tuple[list, List[Detection]]:
+        """
+        Tracks + detections cho frame bị skip
+
+        Vị trí xe được ngoại suy bởi tracker. Đèn giao thông KHÔNG được lặp lại
+        từ tracks (không tạo vote giả), chỉ dùng vote từ sample_lights().
+        """
+        tracked_objects = tracker.extrapolate()
+        detections = [obj.detection for obj in tracked_objects
+                      if obj.detection.class_name not in LIGHT_CLASSES]
+        return tracked_objects, detections + list(sampled_lights or [])
+
+    def _expand(self, bbox: Tuple[int, int, int, int],
+                frame_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+        x1, y1, x2, y2 = bbox
+        mx = int((x2 - x1) * self.light_margin)
+        my = int((y2 - y1) * self.light_margin)
+        h, w = frame_shape[:2]
+        return (max(0, x1 - mx), max(0, y1 - my), min(w, x2 + mx), min(h, y2 + my))
+
+    # ========================================================================
+    # STATISTICS
+    # ========================================================================
+
+    @property
+    def skip_ratio(self) -> float:
+        total = self.detected + self.skipped
+        return self.skipped / total if total else 0.0
+
+    def get_stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'detected': self.detected,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skip_ratio, 3),
+            'reasons': dict(self.reasons),
+            'light_votes': self.light_sampler.votes
+        }
+
+    def log_stats(self):
+        if not self.active:
+            return
+        total = self.detected + self.skipped
+        reduction = total / self.detected if self.detected else 0.0
+        reasons = ", ".join(f"{k}={v}" for k, v in self.reasons.most_common())
+        logger.info(f"Inference scheduler: {self.detected}/{total} frames detected "
+                    f"({reduction:.1f}x fewer inference calls) [{reasons}]")
+        self.light_sampler.log_stats()
+
+    def reset(self):
+        self._reference = None
+        self._last_detect_frame = -1
+        self._light_region = None
+        self._light_reference = None
+        self._light_class = None
+        self._force_until = -1
+        self.light_sampler.reset()
+        self.detected = 0
+        self.skipped = 0
+        self.reasons.clear()
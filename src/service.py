@@ -0,0 +1,533 @@
+"""
+Headless Multi-Camera Service
+Chạy liên tục (daemon) trên N camera khai báo trong config['service']['cameras'],
+mỗi camera có tracker / ViolationDetector riêng, inference dùng chung một model
+(gom frame của nhiều camera thành batch), violations được ghi liên tục
+"""
+
+import copy
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional
+from loguru import logger
+
+from .batch_processor import VIDEO_EXTENSIONS
+
+
+def _merge(base: dict, overrides: dict) -> dict:
+    """Deep merge overrides vào bản copy của base"""
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+# ============================================================================
+# SHARED INFERENCE
+# ============================================================================
+
+class InferenceBatcher:
+    """
+    Inference dùng chung cho tất cả camera
+
+    Mỗi camera gọi detect() (block tới khi có kết quả); thread inference gom
+    request của các camera thành batch: tối đa max_batch frame hoặc chờ tối
+    đa max_wait_ms kể từ request đầu tiên, rồi gọi detector.detect_batch().
+    Mỗi camera chỉ có tối đa 1 frame đang chờ nên camera nhanh không chiếm
+    hết batch của camera chậm.
+    """
+
+    def __init__(self, detector, max_batch: int = 8, max_wait_ms: float = 20.0):
+        self.detector = detector
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._requests: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.batches = 0
+        self.frames = 0
+        self.busy_time = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='inference', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame) -> Future:
+        """Đưa frame vào hàng đợi inference, Future trả về detections"""
+        future = Future()
+        self._requests.put((frame, future))
+        return future
+
+    def detect(self, frame):
+        """Detect trên 1 frame (gọi từ camera thread)"""
+        return self.submit(frame).result()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._requests.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            t0 = time.perf_counter()
+            try:
+                results = self.detector.detect_batch([frame for frame, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.busy_time += time.perf_counter() - t0
+            self.batches += 1
+            self.frames += len(batch)
+
+            for (_, future), detections in zip(batch, results):
+                future.set_result(detections)
+
+        # Dừng: request còn lại nhận lỗi thay vì chờ mãi
+        while True:
+            try:
+                _, future = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("Inference stopped"))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'frames': self.frames,
+            'avg_batch': round(self.frames / self.batches, 2) if self.batches else 0.0,
+            'throughput_fps': round(self.frames / self.busy_time, 2) if self.busy_time > 0 else 0.0
+        }
+
+
+# ============================================================================
+# CAMERA SOURCE
+# ============================================================================
+
+class CameraSource:
+    """
+    Nguồn frame của một camera
+
+    source:
+        - file video: đọc 1 lần (loop=True: đọc lại từ đầu)
+        - thư mục segment: đọc lần lượt các file (sorted), chờ segment mới
+          (segment cuối chỉ được đọc khi đã ghi xong)
+        - rtsp://, http://, số (webcam): stream live, tự kết nối lại khi mất
+
+    realtime=True: phát file / segment theo FPS của video (giả lập camera
+    live khi test với file).
+    """
+
+    def __init__(self, source: str, loop: bool = False, realtime: bool = False,
+                 reconnect_seconds: float = 5.0, poll_seconds: float = 2.0):
+        self.source = str(source)
+        self.loop = loop
+        self.realtime = realtime
+        self.reconnect_seconds = reconnect_seconds
+        self.poll_seconds = poll_seconds
+
+    @property
+    def kind(self) -> str:
+        path = Path(self.source)
+        if path.is_dir():
+            return 'segments'
+        if path.is_file():
+            return 'file'
+        return 'stream'
+
+    def segments(self, stop: threading.Event) -> Iterator[str]:
+        """Danh sách video cần đọc (theo thứ tự), kết thúc khi hết / stop"""
+        kind = self.kind
+        if kind == 'file':
+            while not stop.is_set():
+                yield self.source
+                if not self.loop:
+                    return
+        elif kind == 'segments':
+            done = set()
+            while not stop.is_set():
+                pending = sorted(p for p in Path(self.source).iterdir()
+                                 if p.suffix.lower() in VIDEO_EXTENSIONS and p not in done)
+                # Segment mới nhất có thể đang được ghi: đọc khi đã có segment sau nó
+                # hoặc file không còn thay đổi
+                for segment in pending[:-1]:
+                    done.add(segment)
+                    yield str(segment)
+                if pending and _is_stable(pending[-1], self.poll_seconds * 2):
+                    done.add(pending[-1])
+                    yield str(pending[-1])
+                stop.wait(self.poll_seconds)
+        else:
+            source = int(self.source) if self.source.isdigit() else self.source
+            while not stop.is_set():
+                yield source
+
+    def open(self, segment):
+        """VideoCapture của segment / stream, None nếu không mở được"""
+        import cv2
+
+        cap = cv2.VideoCapture(segment)
+        if cap.isOpened():
+            return cap
+        cap.release()
+        return None
+
+
+def _is_stable(path: Path, seconds: float) -> bool:
+    """File không đổi trong `seconds` giây gần nhất (đã ghi xong)"""
+    try:
+        return time.time() - path.stat().st_mtime > seconds
+    except OSError:
+        return False
+
+
+# ============================================================================
+# CAMERA WORKER
+# ============================================================================
+
+class CameraWorker:
+    """
+    Một camera = một thread: decode → shared inference → tracking / rules →
+    EvidenceWriter. Tracker, ViolationDetector, motion scheduler riêng cho
+    camera; session directory output_dir/<camera_id>/<start time>.
+    """
+
+    def __init__(self, camera_id: str, source: CameraSource, config: dict,
+                 batcher: InferenceBatcher, output_dir: Path, store=None):
+        from .tracker import ObjectTracker
+        from .violation_logic import ViolationDetector
+        from .scheduler import MotionGatedScheduler
+
+        self.camera_id = camera_id
+        self.source = source
+        self.config = config
+        self.batcher = batcher
+        self.store = store
+
+        self.tracker = ObjectTracker(config)
+        self.violation_detector = ViolationDetector(config)
+        self.scheduler = MotionGatedScheduler.from_config(config)
+
+        self.session_dir = Path(output_dir) / camera_id / datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Frame number của camera chỉ tăng qua các segment / reconnect:
+        # scheduler, frame buffer, evidence đang chờ của ViolationDetector giữ
+        # frame number của segment trước
+        self._frame_base = 0
+
+        # Statistics
+        self.frames = 0
+        self.segments = 0
+        self.errors = 0
+        self.started_at = 0.0
+        self.last_frame_at = 0.0
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{self.camera_id}",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        from .evidence_writer import EvidenceWriter
+
+        with logger.contextualize(camera=self.camera_id):
+            logger.info(f"Camera {self.camera_id}: {self.source.kind} source {self.source.source} "
+                        f"-> {self.session_dir}")
+            writer = EvidenceWriter.from_config(self.config, self.violation_detector,
+                                                self.session_dir, self.store)
+            with writer:
+                for segment in self.source.segments(self._stop):
+                    try:
+                        self._process_segment(segment, writer)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Camera {self.camera_id}: {e}")
+
+                    if self.source.kind == 'stream' and not self._stop.is_set():
+                        logger.warning(f"Camera {self.camera_id}: stream lost, reconnecting in "
+                                       f"{self.source.reconnect_seconds:.0f}s")
+                        self._stop.wait(self.source.reconnect_seconds)
+
+                # Dừng / hết nguồn: violations còn chờ frame sau vi phạm
+                for violation in self.violation_detector.pop_finalized_violations(flush=True):
+                    writer.submit(violation)
+
+            logger.info(f"Camera {self.camera_id} stopped: {self.frames} frames, "
+                        f"{len(self.violation_detector.violations)} violations")
+
+    def _process_segment(self, segment, writer):
+        import cv2
+        from .clock import create_clock
+
+        cap = self.source.open(segment)
+        if cap is None:
+            raise IOError(f"Cannot open source: {segment}")
+
+        clock = create_clock(self.config, segment, cap.get(cv2.CAP_PROP_FPS))
+        self.violation_detector.fps = clock.fps
+        self.segments += 1
+
+        segment_frame = 0  # Frame trong segment (clock, source.frame_index)
+        start_wall = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                segment_frame += 1
+                timestamp = clock.timestamp(segment_frame, cap.get(cv2.CAP_PROP_POS_MSEC))
+
+                self._process_frame(frame, self._frame_base + segment_frame, timestamp,
+                                    clock, segment, writer)
+                self.frames += 1
+                self.last_frame_at = time.time()
+
+                # Giả lập camera live: không đọc file nhanh hơn FPS của video
+                position = clock.position(timestamp)
+                if self.source.realtime and position is not None:
+                    delay = start_wall + position - time.perf_counter()
+                    if delay > 0:
+                        self._stop.wait(delay)
+        finally:
+            cap.release()
+            self._frame_base += segment_frame
+            # Frame sau vi phạm không lấy từ segment kế tiếp (nội dung khác):
+            # finalize violations còn chờ với các frame đã có
+            for violation in self.violation_detector.pop_finalized_violations(flush=True):
+                writer.submit(violation)
+
+    def _process_frame(self, frame, frame_number: int, timestamp, clock, segment, writer):
+        # Motion gating: frame tĩnh thì ngoại suy tracks, không gửi inference
+        if self.scheduler.should_detect(frame, frame_number):
+            detections = self.batcher.detect(frame)
+            self.scheduler.observe(frame_number, detections, frame.shape)
+            tracked_vehicles = self.tracker.update(detections)
+        else:
+            lights = self.scheduler.sample_lights(frame, frame_number)
+            tracked_vehicles, detections = self.scheduler.extrapolate_tracks(self.tracker, lights)
+
+        new_violations = self.violation_detector.update(
+            tracked_vehicles, detections, frame, frame_number, timestamp
+        )
+        for violation in new_violations:
+            violation.source_video = str(segment)
+            violation.source_pts = clock.position(violation.timestamp)
+            violation.source_frame_index = violation.frame_number - self._frame_base - 1
+        for violation in self.violation_detector.pop_finalized_violations():
+            writer.submit(violation)
+
+    def get_stats(self) -> dict:
+        elapsed = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            'camera_id': self.camera_id,
+            'source': self.source.source,
+            'session_dir': str(self.session_dir),
+            'alive': self.is_alive(),
+            'frames': self.frames,
+            'segments': self.segments,
+            'errors': self.errors,
+            'fps': round(self.frames / elapsed, 2) if elapsed > 0 else 0.0,
+            'violations': len(self.violation_detector.violations)
+        }
+
+
+# ============================================================================
+# SERVICE
+# ============================================================================
+
+class ViolationService:
+    """
+    Daemon xử lý nhiều camera
+
+    Usage:
+        service = ViolationService.from_config(config, detector)
+        service.run()   # block tới SIGTERM / SIGINT hoặc tất cả nguồn kết thúc
+
+    Dừng an toàn: camera threads dừng đọc frame, violations đang chờ frame
+    sau vi phạm được ghi nốt, EvidenceWriter và ViolationStore được flush.
+    """
+
+    def __init__(self, config: dict, detector, cameras: List[dict],
+                 output_dir: str = 'data/service', max_batch: int = 8,
+                 max_wait_ms: float = 20.0, stats_interval: float = 60.0):
+        from .violation_store import ViolationStore
+
+        if not cameras:
+            raise ValueError("No cameras configured (service.cameras)")
+
+        self.config = config
+        self.output_dir = Path(output_dir)
+        self.stats_interval = stats_interval
+        self.store = ViolationStore.from_config(config)
+        self.batcher = InferenceBatcher(detector, max_batch, max_wait_ms)
+
+        self.workers: List[CameraWorker] = []
+        seen = set()
+        for index, camera in enumerate(cameras):
+            camera_id = str(camera.get('id') or f"CAM-{index + 1:03d}")
+            if camera_id in seen:
+                raise ValueError(f"Duplicate camera id: {camera_id}")
+            seen.add(camera_id)
+
+            source = CameraSource(
+                camera['source'],
+                loop=camera.get('loop', False),
+                realtime=camera.get('realtime', False),
+                reconnect_seconds=camera.get('reconnect_seconds', 5.0)
+            )
+            self.workers.append(CameraWorker(
+                camera_id, source, self._camera_config(camera, camera_id),
+                self.batcher, self.output_dir, self.store
+            ))
+
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_config(cls, config: dict, detector) -> 'ViolationService':
+        """Create service từ config['service']"""
+        service_config = config.get('service', {})
+        return cls(
+            config, detector,
+            cameras=service_config.get('cameras', []),
+            output_dir=service_config.get('output_dir', 'data/service'),
+            max_batch=service_config.get('max_batch', 8),
+            max_wait_ms=service_config.get('max_wait_ms', 20.0),
+            stats_interval=service_config.get('stats_interval', 60.0)
+        )
+
+    def _camera_config(self, camera: dict, camera_id: str) -> dict:
+        """Config riêng của camera: location + overrides (vd: violation.roi)"""
+        overrides = copy.deepcopy(camera.get('overrides', {}))
+        location = overrides.setdefault('location', {})
+        location['camera_id'] = camera_id
+        if camera.get('intersection'):
+            location['intersection'] = camera['intersection']
+        return _merge(self.config, overrides)
+
+    # ========================================================================
+    # RUN
+    # ========================================================================
+
+    def run(self) -> dict:
+        """Chạy tới khi nhận SIGTERM / SIGINT (hoặc mọi nguồn đã hết frame)"""
+        self._install_signal_handlers()
+
+        logger.info(f"Service: {len(self.workers)} cameras, batch <= {self.batcher.max_batch} "
+                    f"frames / {self.batcher.max_wait * 1000:.0f} ms")
+        self.batcher.start()
+        for worker in self.workers:
+            worker.start()
+
+        last_stats = time.time()
+        while not self._stop.wait(1.0):
+            if not any(worker.is_alive() for worker in self.workers):
+                logger.info("All camera sources finished")
+                break
+            if time.time() - last_stats >= self.stats_interval:
+                self.log_stats()
+                last_stats = time.time()
+
+        return self.shutdown()
+
+    def stop(self):
+        """Yêu cầu dừng (an toàn gọi từ signal handler / thread khác)"""
+        self._stop.set()
+
+    def shutdown(self) -> dict:
+        logger.info("Service shutting down...")
+        for worker in self.workers:
+            worker.stop()
+        # Camera đang chờ inference cần batcher còn chạy để thoát vòng lặp
+        for worker in self.workers:
+            worker.join()
+        self.batcher.stop()
+
+        if self.store is not None:
+            self.store.close()
+
+        self.log_stats()
+        logger.info("Service stopped")
+        return self.get_stats()
+
+    def _install_signal_handlers(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def handle(signum, frame):
+            logger.info(f"Received {signal.Signals(signum).name}, stopping...")
+            self.stop()
+
+        signal.signal(signal.SIGINT, handle)
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, handle)
+
+    # ========================================================================
+    # STATISTICS
+    # ========================================================================
+
+    def get_stats(self) -> dict:
+        cameras = [worker.get_stats() for worker in self.workers]
+        return {
+            'cameras': cameras,
+            'total_frames': sum(c['frames'] for c in cameras),
+            'total_violations': sum(c['violations'] for c in cameras),
+            'inference': self.batcher.get_stats()
+        }
+
+    def log_stats(self):
+        stats = self.get_stats()
+        inference = stats['inference']
+        logger.info(f"Service: {stats['total_frames']} frames, {stats['total_violations']} violations | "
+                    f"inference {inference['throughput_fps']:.1f} FPS, "
+                    f"avg batch {inference['avg_batch']:.1f}")
+        for camera in stats['cameras']:
+            state = 'running' if camera['alive'] else 'stopped'
+            logger.info(f"   - {camera['camera_id']:<10} {state:<8} {camera['fps']:>6.1f} FPS | "
+                        f"{camera['frames']} frames | {camera['violations']} violations | "
+                        f"{camera['errors']} errors")
+
+
+def run_service(config: dict, detector) -> dict:
+    """Entry point cho main.py --service"""
+    service = ViolationService.from_config(config, detector)
+    return service.run()
@@ -0,0 +1,193 @@
+"""
+Shared-Memory Frame Pool
+Truyền frame giữa các process bằng handle (tên shared memory + slot) thay vì
+pickle cả frame (1080p BGR ~6 MB) qua pipe / socket
+"""
+
+import sys
+import multiprocessing as mp
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+import numpy as np
+from loguru import logger
+
+# Căn đầu mỗi slot (cache line)
+_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class FrameHandle:
+    """Tham chiếu tới frame trong SharedFramePool (nhỏ, pickle được)"""
+    pool: str
+    slot: int
+    offset: int
+    shape: Tuple[int, ...]
+    dtype: str = 'uint8'
+
+
+def _align(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Mở shared memory do process KHÔNG phải cha tạo (vd: inference server)
+
+    Process attach không được unlink khi thoát (Python < 3.13 resource
+    tracker sẽ xóa segment của owner nếu không unregister).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+
+def read_frame(shm: shared_memory.SharedMemory, handle: FrameHandle) -> np.ndarray:
+    """Frame (zero-copy view) của handle trong shared memory đã mở"""
+    return np.ndarray(handle.shape, dtype=handle.dtype, buffer=shm.buf, offset=handle.offset)
+
+
+class SharedFramePool:
+    """
+    Pool N slot frame trên một segment multiprocessing.shared_memory
+
+    Layout: [refcount int32 x slots][slot 0][slot 1]...
+
+    Mỗi slot có reference count: put() lấy slot trống (refcount = 1, block
+    khi hết slot -> backpressure lên producer), retain() khi chuyển handle
+    cho thêm một consumer, release() khi consumer dùng xong; refcount về 0
+    thì slot được dùng lại.
+
+    Owner tạo pool rồi truyền cho process con qua args của Process (lock /
+    semaphore đi kèm). Process không phải con của owner (vd: inference
+    server) chỉ đọc frame qua attach_shared_memory() + read_frame(), owner
+    giữ reference cho tới khi nhận kết quả.
+    """
+
+    def __init__(self, slots: int, slot_bytes: int, name: Optional[str] = None,
+                 context: str = 'spawn', _state: Optional[tuple] = None):
+        self.slots = max(1, slots)
+        self.slot_bytes = _align(slot_bytes)
+        self._header = _align(4 * self.slots)
+
+        if _state is None:
+            self.owner = True
+            # Lock / semaphore phải cùng start method với process con
+            ctx = mp.get_context(context)
+            self._lock = ctx.Lock()
+            self._free = ctx.Semaphore(self.slots)
+            self._shm = shared_memory.SharedMemory(
+                name=name, create=True, size=self._header + self.slots * self.slot_bytes)
+        else:
+            self.owner = False
+            self._lock, self._free = _state
+            # Process con dùng chung resource tracker với owner: attach bình thường
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        self.name = self._shm.name
+        self._refcounts = np.ndarray((self.slots,), dtype=np.int32, buffer=self._shm.buf)
+        if self.owner:
+            self._refcounts[:] = 0
+
+    @classmethod
+    def for_frames(cls, slots: int, frame_shape: Tuple[int, ...], dtype='uint8',
+                   context: str = 'spawn') -> 'SharedFramePool':
+        """Pool với slot vừa frame_shape (vd: (1080, 1920, 3))"""
+        slot_bytes = int(np.prod(frame_shape)) * np.dtype(dtype).itemsize
+        return cls(slots, slot_bytes, context=context)
+
+    # Pickle: chỉ khi spawn process con (mp.Lock / Semaphore không pickle được ngoài lúc spawn)
+    def __getstate__(self):
+        return {'slots': self.slots, 'slot_bytes': self.slot_bytes, 'name': self.name,
+                'state': (self._lock, self._free)}
+
+    def __setstate__(self, state):
+        self.__init__(state['slots'], state['slot_bytes'], state['name'],
+                      _state=state['state'])
+
+    # ========================================================================
+    # SLOTS
+    # ========================================================================
+
+    def put(self, frame: np.ndarray, timeout: Optional[float] = None) -> FrameHandle:
+        """
+        Copy frame vào slot trống (refcount = 1)
+
+        Raises:
+            ValueError: Frame lớn hơn slot
+            TimeoutError: Hết slot sau timeout giây
+        """
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {frame.shape} ({frame.nbytes} bytes) exceeds "
+                             f"slot size ({self.slot_bytes} bytes)")
+        if not self._free.acquire(timeout=timeout):
+            raise TimeoutError(f"No free frame slot in {self.name} after {timeout}s")
+
+        with self._lock:
+            slot = int(np.flatnonzero(self._refcounts == 0)[0])
+            self._refcounts[slot] = 1
+
+        handle = FrameHandle(self.name, slot, self._header + slot * self.slot_bytes,
+                             tuple(frame.shape), frame.dtype.str)
+        np.copyto(self.get(handle), frame)
+        return handle
+
+    def get(self, handle: FrameHandle) -> np.ndarray:
+        """Frame của handle (zero-copy view, hợp lệ tới khi release)"""
+        return read_frame(self._shm, handle)
+
+    def retain(self, handle: FrameHandle, count: int = 1):
+        """Thêm reference (handle được gửi cho thêm consumer)"""
+        with self._lock:
+            if self._refcounts[handle.slot] <= 0:
+                raise RuntimeError(f"Slot {handle.slot} already released")
+            self._refcounts[handle.slot] += count
+
+    def release(self, handle: FrameHandle):
+        """Bỏ một reference, slot được dùng lại khi refcount về 0"""
+        with self._lock:
+            refcount = int(self._refcounts[handle.slot]) - 1
+            if refcount < 0:
+                raise RuntimeError(f"Slot {handle.slot} released too many times")
+            self._refcounts[handle.slot] = refcount
+        if refcount == 0:
+            self._free.release()
+
+    def in_use(self) -> int:
+        """Số slot đang có reference"""
+        with self._lock:
+            return int(np.count_nonzero(self._refcounts))
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def close(self):
+        """Đóng mapping (owner: xóa segment)"""
+        if self._shm is None:
+            return
+        self._refcounts = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Còn view numpy trỏ vào segment: mapping đóng khi view bị giải phóng
+            logger.debug(f"SharedFramePool {self.name}: frames still referenced on close")
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = None
+
+    def __enter__(self) -> 'SharedFramePool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,563 @@
+"""
+Synthetic Intersection Scenes
+Sinh video ngã tư deterministic (cùng tham số + seed -> cùng video, cùng ground
+truth) để benchmark / kiểm tra độ chính xác mà không cần footage thật hay model
+
+Scene:
+    - Các lane đi về phía camera (y tăng) nằm trong ROI + 1 lane ngược chiều
+      ngoài ROI (bên trái)
+    - Vạch dừng, đèn giao thông chạy chu kỳ GREEN -> YELLOW -> RED
+    - Xe (car / motobike) dừng trước vạch khi đèn vàng / đỏ; xe "vi phạm"
+      chạy qua vạch khi đèn đỏ (sau grace period) -> ground truth violation
+
+MockDetector trả về Detection ground truth của frame: frame index được vẽ vào
+góc trái trên (dải bit) nên vẫn đúng khi pipeline bỏ frame / batch frame.
+
+Usage:
+    scene = SyntheticScene.from_config(config, duration=30, seed=1)
+    scene.write_video('data/videos/synthetic.mp4')  # + synthetic.gt.json
+    detector = MockDetector(scene, config)
+    ...
+    print(evaluate(violation_detector.violations.values(), scene))
+"""
+
+import json
+import cv2
+import numpy as np
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+
+from .detector import BaseDetector, CLASS_IDS, CLASS_NAMES, DetectionBatch
+from .device_policy import DevicePolicy
+
+# Chu kỳ đèn mặc định (giây)
+DEFAULT_CYCLE = {'green': 6.0, 'yellow': 3.0, 'red': 8.0}
+
+# Kích thước xe theo chiều cao frame (w, h)
+VEHICLE_SIZES = {'car': (0.13, 0.11), 'motobike': (0.05, 0.09)}
+
+# Tốc độ xe (chiều cao frame / giây): xe qua vạch khi hết xanh phải ra khỏi ROI
+# trước khi hết vàng + grace period (0.8 h / 0.3 h/s < 3 s)
+SPEED_RANGE = (0.30, 0.45)
+
+# Frame index: FRAME_INDEX_BITS ô đen / trắng ở góc trái trên
+FRAME_INDEX_BITS = 24
+
+# Khoảng cách tối thiểu giữa 2 xe cùng lane (chiều cao frame)
+VEHICLE_GAP = 0.02
+
+
+@dataclass
+class GroundTruthViolation:
+    """Xe vượt vạch khi đèn đỏ (frame_number đếm từ 1 như pipeline)"""
+    vehicle_id: int
+    vehicle_class: str
+    frame_number: int
+    bbox: Tuple[int, int, int, int]
+    red_duration: float
+
+
+# ============================================================================
+# FRAME INDEX
+# ============================================================================
+
+def _index_block(height: int) -> int:
+    return max(8, height // 60)
+
+
+def encode_frame_index(frame: np.ndarray, index: int):
+    """Vẽ index vào dải bit góc trái trên (ô đủ lớn để qua được nén video)"""
+    block = _index_block(frame.shape[0])
+    for bit in range(FRAME_INDEX_BITS):
+        value = 255 if (index >> bit) & 1 else 0
+        frame[:block, bit * block:(bit + 1) * block] = value
+
+
+def decode_frame_index(frame: np.ndarray) -> int:
+    """Đọc index từ dải bit (lấy mẫu giữa mỗi ô)"""
+    block = _index_block(frame.shape[0])
+    row = frame[block // 2, block // 2:FRAME_INDEX_BITS * block:block]
+    bits = row.mean(axis=1) > 127
+    return int(np.dot(bits, 1 << np.arange(FRAME_INDEX_BITS)))
+
+
+# ============================================================================
+# SCENE
+# ============================================================================
+
+class SyntheticScene:
+    """
+    Scene ngã tư deterministic: toàn bộ chuyển động được mô phỏng trước khi
+    render (nhẹ: vài box / frame), render() vẽ frame bất kỳ theo index
+
+    Args:
+        width, height: Độ phân giải
+        fps: Frame rate
+        duration: Độ dài (giây)
+        density: Xe mới / giây / lane (khi lối vào lane trống)
+        lanes: Số lane đi về phía camera
+        violation_rate: Tỉ lệ xe sẽ vượt đèn đỏ khi đứng đầu hàng chờ
+        seed: Seed cho random (cùng seed -> cùng scene)
+        cycle: Thời gian mỗi pha đèn {'green', 'yellow', 'red'} (giây)
+        roi: (x_min, x_max, y_min, y_max) tương đối - lane và vạch dừng đặt
+            theo ROI của ViolationDetector để xe chờ sau vạch nằm ngoài ROI
+        grace_period: Xe vi phạm chỉ chạy khi đèn đỏ đã quá grace period
+    """
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = 30.0,
+                 duration: float = 60.0, density: float = 0.4, lanes: int = 3,
+                 violation_rate: float = 0.3, seed: int = 0,
+                 cycle: Optional[Dict[str, float]] = None,
+                 roi: Tuple[float, float, float, float] = (0.25, 0.85, 0.2, 0.95),
+                 grace_period: float = 0.5):
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = float(fps)
+        self.duration = float(duration)
+        self.density = float(density)
+        self.lanes = max(1, int(lanes))
+        self.violation_rate = float(violation_rate)
+        self.seed = int(seed)
+        self.cycle = {**DEFAULT_CYCLE, **(cycle or {})}
+        self.roi = tuple(float(v) for v in roi)
+        self.grace_period = float(grace_period)
+
+        self.frame_count = max(1, int(round(self.duration * self.fps)))
+        if self.frame_count >= 1 << FRAME_INDEX_BITS:
+            raise ValueError(f"Scene too long: {self.frame_count} frames "
+                             f"(max {(1 << FRAME_INDEX_BITS) - 1})")
+
+        self._layout()
+        self._simulate()
+        self._background = self._render_background()
+
+    @classmethod
+    def from_config(cls, config: dict, **overrides) -> 'SyntheticScene':
+        """
+        Scene từ config['synthetic'] (ROI / grace period lấy từ config['violation'])
+        overrides: ghi đè tham số (vd: duration=10, seed=3)
+        """
+        synthetic = config.get('synthetic', {})
+        violation = config.get('violation', {})
+        roi = violation.get('roi', {})
+
+        width, height = synthetic.get('resolution', [1280, 720])
+        params = {
+            'width': width,
+            'height': height,
+            'fps': synthetic.get('fps', 30.0),
+            'duration': synthetic.get('duration', 60.0),
+            'density': synthetic.get('density', 0.4),
+            'lanes': synthetic.get('lanes', 3),
+            'violation_rate': synthetic.get('violation_rate', 0.3),
+            'seed': synthetic.get('seed', 0),
+            'cycle': synthetic.get('cycle'),
+            'grace_period': violation.get('grace_period', 0.5)
+        }
+        if roi.get('enabled', False):
+            params['roi'] = (roi.get('x_min', 0.0), roi.get('x_max', 1.0),
+                             roi.get('y_min', 0.0), roi.get('y_max', 1.0))
+        params.update(overrides)
+        return cls(**params)
+
+    @classmethod
+    def load(cls, path) -> 'SyntheticScene':
+        """Tạo lại scene từ file ground truth (write_video / save_ground_truth)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(**data['scene'])
+
+    def params(self) -> dict:
+        """Tham số tạo scene (đủ để tạo lại y hệt)"""
+        return {
+            'width': self.width, 'height': self.height, 'fps': self.fps,
+            'duration': self.duration, 'density': self.density, 'lanes': self.lanes,
+            'violation_rate': self.violation_rate, 'seed': self.seed,
+            'cycle': dict(self.cycle), 'roi': list(self.roi),
+            'grace_period': self.grace_period
+        }
+
+    # ========================================================================
+    # LAYOUT
+    # ========================================================================
+
+    def _layout(self):
+        w, h = self.width, self.height
+        x_min, x_max, y_min, _ = self.roi
+
+        # Lane đi về phía camera chia đều trong ROI (chừa lề 5%)
+        left, right = (x_min + 0.05) * w, (x_max - 0.05) * w
+        lane_width = (right - left) / self.lanes
+        self.lane_x = [int(left + lane_width * (i + 0.5)) for i in range(self.lanes)]
+        self.road = (int(left), int(right))
+
+        # Lane ngược chiều (đi lên) ngoài ROI bên trái
+        self.oncoming_x = int(max(x_min - 0.1, 0.05) * w)
+
+        # Vạch dừng: xe nhỏ nhất dừng sát vạch có tâm nằm trên ROI (không bị xét)
+        min_height = min(size[1] for size in VEHICLE_SIZES.values()) * 0.9 * h
+        self.stop_line_y = int(y_min * h + min_height / 2) - 2
+
+        # Đèn ở góc phải trên (ngoài lane)
+        size = max(8, h // 40)
+        x = int(0.92 * w)
+        self.light_boxes = {
+            state: (x - size, int(0.03 * h) + i * 2 * size,
+                    x + size, int(0.03 * h) + i * 2 * size + 2 * size)
+            for i, state in enumerate(('RED', 'YELLOW', 'GREEN'))
+        }
+
+    def light_state(self, index: int) -> str:
+        """Trạng thái đèn tại frame index (0-based)"""
+        return self._light_at(index / self.fps)[0]
+
+    def _light_at(self, t: float) -> Tuple[str, float]:
+        """(state, giây kể từ đầu pha) tại thời điểm t"""
+        green, yellow, red = self.cycle['green'], self.cycle['yellow'], self.cycle['red']
+        t %= green + yellow + red
+        if t < green:
+            return 'GREEN', t
+        if t < green + yellow:
+            return 'YELLOW', t - green
+        return 'RED', t - green - yellow
+
+    # ========================================================================
+    # SIMULATION
+    # ========================================================================
+
+    def _simulate(self):
+        """
+        Mô phỏng toàn bộ scene, lưu box mỗi frame
+
+        Xe theo xe trước cùng lane (giữ khoảng cách), dừng ở vạch khi vàng / đỏ.
+        Xe vi phạm đứng đầu hàng chờ chạy khi đèn đỏ đã quá grace period + 0.5s
+        (và còn >= 1s đỏ để ViolationDetector kịp xác nhận).
+        """
+        rng = np.random.default_rng(self.seed)
+        h = self.height
+        gap = VEHICLE_GAP * h
+        spawn_p = self.density / self.fps
+        run_after = self.grace_period + 0.5
+        run_before = self.cycle['red'] - 1.0
+
+        # Xe: dict id, x (tâm), w, h, bottom, speed (px / frame), violator, crossed
+        lanes: List[List[dict]] = [[] for _ in range(self.lanes)]
+        oncoming: List[dict] = []
+        next_id = 1
+
+        self.vehicle_classes: Dict[int, str] = {}
+        self.vehicle_colors: Dict[int, Tuple[int, int, int]] = {}
+        self.violators = set()
+        self.ground_truth: List[GroundTruthViolation] = []
+        self._boxes: List[np.ndarray] = []
+        self._ids: List[np.ndarray] = []
+
+        def new_vehicle(x, top_down):
+            nonlocal next_id
+            vehicle_class = 'car' if rng.random() < 0.7 else 'motobike'
+            scale = rng.uniform(0.9, 1.1)
+            bw, bh = (s * h * scale for s in VEHICLE_SIZES[vehicle_class])
+            vehicle = {
+                'id': next_id, 'x': x, 'w': bw, 'h': bh,
+                'bottom': 0.0 if top_down else h + bh,
+                'speed': rng.uniform(*SPEED_RANGE) * h / self.fps,
+                'violator': rng.random() < self.violation_rate,
+                'crossed': False
+            }
+            self.vehicle_classes[next_id] = vehicle_class
+            self.vehicle_colors[next_id] = tuple(int(c) for c in rng.integers(40, 230, 3))
+            next_id += 1
+            return vehicle
+
+        for index in range(self.frame_count):
+            state, elapsed = self._light_at(index / self.fps)
+            boxes, ids = [], []
+
+            for lane, vehicles in enumerate(lanes):
+                limit = np.inf  # bottom tối đa (top của xe trước - gap)
+                for vehicle in vehicles:  # Xe đầu lane trước
+                    target = vehicle['bottom'] + vehicle['speed']
+                    if not vehicle['crossed'] and state != 'GREEN':
+                        runs = (vehicle['violator'] and state == 'RED'
+                                and run_after <= elapsed <= run_before)
+                        if not runs:
+                            target = min(target, self.stop_line_y)
+                    target = min(target, limit)
+                    vehicle['bottom'] = max(vehicle['bottom'], target)
+                    limit = vehicle['bottom'] - vehicle['h'] - gap
+
+                    if not vehicle['crossed'] and vehicle['bottom'] > self.stop_line_y:
+                        vehicle['crossed'] = True
+                        if state == 'RED':
+                            self.violators.add(vehicle['id'])
+                            self.ground_truth.append(GroundTruthViolation(
+                                vehicle_id=vehicle['id'],
+                                vehicle_class=self.vehicle_classes[vehicle['id']],
+                                frame_number=index + 1,
+                                bbox=self._box(vehicle),
+                                red_duration=round(elapsed, 3)))
+
+                vehicles[:] = [v for v in vehicles if v['bottom'] - v['h'] < h]
+                entry_clear = not vehicles or vehicles[-1]['bottom'] - vehicles[-1]['h'] > gap
+                if entry_clear and rng.random() < spawn_p:
+                    vehicles.append(new_vehicle(self.lane_x[lane], top_down=True))
+
+            # Lane ngược chiều: đi lên, không theo đèn (ngoài ROI)
+            for vehicle in oncoming:
+                vehicle['bottom'] -= vehicle['speed']
+            oncoming[:] = [v for v in oncoming if v['bottom'] > 0]
+            if (not oncoming or oncoming[-1]['bottom'] < h - gap) and rng.random() < spawn_p:
+                oncoming.append(new_vehicle(self.oncoming_x, top_down=False))
+
+            for vehicle in [v for vehicles in lanes for v in vehicles] + oncoming:
+                box = self._box(vehicle)
+                if box[3] - box[1] >= 4:  # Còn thấy trong frame
+                    boxes.append(box)
+                    ids.append(vehicle['id'])
+
+            self._boxes.append(np.array(boxes, dtype=np.int32).reshape(-1, 4))
+            self._ids.append(np.array(ids, dtype=np.int64))
+
+        logger.debug(f"Synthetic scene: {self.frame_count} frames, {next_id - 1} vehicles, "
+                     f"{len(self.ground_truth)} violations")
+
+    def _box(self, vehicle: dict) -> Tuple[int, int, int, int]:
+        """Box (x1, y1, x2, y2) đã cắt theo frame"""
+        x1 = int(vehicle['x'] - vehicle['w'] / 2)
+        x2 = int(vehicle['x'] + vehicle['w'] / 2)
+        y1 = int(max(vehicle['bottom'] - vehicle['h'], 0))
+        y2 = int(min(vehicle['bottom'], self.height))
+        return x1, y1, x2, y2
+
+    # ========================================================================
+    # GROUND TRUTH
+    # ========================================================================
+
+    def vehicles(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(boxes (N, 4) int32, vehicle ids (N,)) tại frame index (0-based)"""
+        return self._boxes[index], self._ids[index]
+
+    def detections(self, index: int) -> DetectionBatch:
+        """Detections ground truth tại frame index: xe + đèn đang sáng + vạch dừng"""
+        boxes, ids = self.vehicles(index)
+        light = self.light_state(index)
+        road_left, road_right = self.road
+
+        xyxy = np.concatenate([
+            boxes,
+            np.array([self.light_boxes[light],
+                      (road_left, self.stop_line_y - 3, road_right, self.stop_line_y + 3)],
+                     dtype=np.int32)
+        ])
+        class_id = np.array([CLASS_IDS[self.vehicle_classes[i]] for i in ids.tolist()]
+                            + [CLASS_IDS[f"{light.lower()}_light"], CLASS_IDS['stop_line']],
+                            dtype=np.int64)
+        confidence = np.full(len(class_id), 0.9, dtype=np.float32)
+        return DetectionBatch(xyxy, confidence, class_id, CLASS_NAMES)
+
+    def save_ground_truth(self, path):
+        """JSON: tham số scene + danh sách vi phạm ground truth"""
+        data = {
+            'scene': self.params(),
+            'frames': self.frame_count,
+            'violations': [asdict(v) for v in self.ground_truth]
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+    # ========================================================================
+    # RENDER
+    # ========================================================================
+
+    def _render_background(self) -> np.ndarray:
+        w, h = self.width, self.height
+        frame = np.full((h, w, 3), (60, 90, 60), dtype=np.uint8)
+
+        # Mặt đường (gồm lane ngược chiều)
+        road_left, road_right = self.road
+        oncoming_left = self.oncoming_x - int(0.06 * h)
+        cv2.rectangle(frame, (oncoming_left, 0), (road_right, h), (85, 85, 85), -1)
+        cv2.line(frame, (road_left - 4, 0), (road_left - 4, h), (0, 200, 230), 3)
+
+        # Vạch chia lane (nét đứt)
+        dash = max(10, h // 24)
+        for i in range(1, self.lanes):
+            x = (self.lane_x[i - 1] + self.lane_x[i]) // 2
+            for y in range(self.stop_line_y, h, 2 * dash):
+                cv2.line(frame, (x, y), (x, y + dash), (230, 230, 230), 2)
+
+        cv2.line(frame, (road_left, self.stop_line_y), (road_right, self.stop_line_y),
+                 (255, 255, 255), max(4, h // 120))
+
+        # Vỏ đèn
+        x1 = self.light_boxes['RED'][0] - 4
+        y1 = self.light_boxes['RED'][1] - 4
+        x2 = self.light_boxes['GREEN'][2] + 4
+        y2 = self.light_boxes['GREEN'][3] + 4
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (30, 30, 30), -1)
+        return frame
+
+    def render(self, index: int) -> np.ndarray:
+        """Frame BGR tại index (0-based)"""
+        frame = self._background.copy()
+
+        colors = {'RED': (0, 0, 255), 'YELLOW': (0, 220, 255), 'GREEN': (0, 220, 0)}
+        light = self.light_state(index)
+        for state, (x1, y1, x2, y2) in self.light_boxes.items():
+            color = colors[state] if state == light else (60, 60, 60)
+            cv2.circle(frame, ((x1 + x2) // 2, (y1 + y2) // 2), (x2 - x1) // 2 - 1, color, -1)
+
+        boxes, ids = self.vehicles(index)
+        for (x1, y1, x2, y2), vehicle_id in zip(boxes.tolist(), ids.tolist()):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), self.vehicle_colors[vehicle_id], -1)
+            # Kính lái (giúp phân biệt xe liền nhau)
+            inset = (x2 - x1) // 5
+            cv2.rectangle(frame, (x1 + inset, y1 + (y2 - y1) // 4),
+                          (x2 - inset, y1 + (y2 - y1) // 2), (40, 40, 40), -1)
+
+        encode_frame_index(frame, index)
+        return frame
+
+    def frames(self):
+        """Iterator frame theo thứ tự"""
+        for index in range(self.frame_count):
+            yield self.render(index)
+
+    def write_video(self, path, fourcc: str = 'mp4v', ground_truth: bool = True) -> Path:
+        """
+        Ghi video (+ <tên>.gt.json cạnh video nếu ground_truth)
+
+        Returns:
+            Path video
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), self.fps,
+                              (self.width, self.height))
+        if not out.isOpened():
+            raise IOError(f"Cannot open video writer: {path} ({fourcc})")
+        for frame in self.frames():
+            out.write(frame)
+        out.release()
+
+        if ground_truth:
+            self.save_ground_truth(ground_truth_path(path))
+        return path
+
+
+def ground_truth_path(video_path) -> Path:
+    """File ground truth đi kèm video synthetic"""
+    video_path = Path(video_path)
+    return video_path.with_name(f"{video_path.stem}.gt.json")
+
+
+# ============================================================================
+# MOCK DETECTOR
+# ============================================================================
+
+class MockDetector(BaseDetector):
+    """
+    Detector trả về detections ground truth của SyntheticScene (không model)
+
+    Thay được detector thật trong pipeline, benchmark, service. Frame index
+    đọc từ dải bit trong frame -> đúng cả khi frame bị bỏ / batch.
+    """
+
+    def __init__(self, scene: SyntheticScene, config: Optional[dict] = None):
+        # Không gọi BaseDetector.__init__: không có model / device
+        config = config or {}
+        self.scene = scene
+        self.config = config
+        self.policy = DevicePolicy()
+        self.device = 'mock'
+        self.class_names = CLASS_NAMES
+        self.batch_size = max(1, int(config.get('performance', {}).get('batch_size', 1)))
+
+    @classmethod
+    def for_video(cls, video_path, config: Optional[dict] = None) -> 'MockDetector':
+        """MockDetector cho video synthetic đã ghi (đọc <tên>.gt.json)"""
+        return cls(SyntheticScene.load(ground_truth_path(video_path)), config)
+
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
+        index = decode_frame_index(frame)
+        if index >= self.scene.frame_count:
+            return DetectionBatch.empty()
+        return self.scene.detections(index)
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[DetectionBatch]:
+        return [self.detect(frame) for frame in frames]
+
+    def warmup(self):
+        pass
+
+
+# ============================================================================
+# ACCURACY
+# ============================================================================
+
+def _iou(a, b) -> float:
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def evaluate(violations, scene: SyntheticScene, max_delay: float = 2.0) -> dict:
+    """
+    So sánh violations (Violation object hoặc to_dict()) với ground truth
+
+    Violation khớp ground truth khi box xe tại frame vi phạm trùng (IoU lớn
+    nhất, >= 0.5) với một xe vi phạm thật và frame vi phạm nằm trong
+    [frame vượt vạch, frame vượt vạch + max_delay giây]. Mỗi xe chỉ khớp 1 lần.
+
+    Returns:
+        dict: ground_truth, detected, true_positives, false_positives, missed,
+              precision, recall, mean_delay_frames
+    """
+    truth = {gt.vehicle_id: gt for gt in scene.ground_truth}
+    max_delay_frames = int(max_delay * scene.fps)
+    matched: Dict[int, int] = {}  # vehicle_id -> delay (frames)
+    false_positives = []
+
+    for violation in violations:
+        if isinstance(violation, dict):
+            frame_number = violation['frame_number']
+            bbox = violation['vehicle']['bbox']
+            violation_id = violation['violation_id']
+        else:
+            frame_number, bbox = violation.frame_number, violation.vehicle_bbox
+            violation_id = violation.violation_id
+
+        vehicle_id, best = None, 0.0
+        index = frame_number - 1
+        if 0 <= index < scene.frame_count:
+            boxes, ids = scene.vehicles(index)
+            for box, candidate in zip(boxes.tolist(), ids.tolist()):
+                iou = _iou(bbox, box)
+                if iou > best:
+                    vehicle_id, best = candidate, iou
+
+        gt = truth.get(vehicle_id) if best >= 0.5 else None
+        delay = frame_number - gt.frame_number if gt else -1
+        if gt is None or vehicle_id in matched or not 0 <= delay <= max_delay_frames:
+            false_positives.append(violation_id)
+            continue
+        matched[vehicle_id] = delay
+
+    tp = len(matched)
+    detected = tp + len(false_positives)
+    return {
+        'ground_truth': len(truth),
+        'detected': detected,
+        'true_positives': tp,
+        'false_positives': len(false_positives),
+        'missed': len(truth) - tp,
+        'precision': round(tp / detected, 4) if detected else 1.0,
+        'recall': round(tp / len(truth), 4) if truth else 1.0,
+        'mean_delay_frames': round(float(np.mean(list(matched.values()))), 2) if matched else None,
+        'false_positive_ids': false_positives,
+        'missed_vehicle_ids': sorted(set(truth) - set(matched))
+    }
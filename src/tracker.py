@@ -4,44 +4,189 @@ Uses ByteTrack from Supervision library
 """
 
 import numpy as np
-from typing import List, Optional
-from dataclasses import dataclass, field
+from typing import List, Optional, Union
 from loguru import logger
 import supervision as sv
-from .detector import Detection
+from .detector import Detection, DetectionBatch
+
+
+# Số center positions lưu cho mỗi track
+TRAJECTORY_LENGTH = 30
+
+# Số frame gần nhất dùng tính vận tốc (smoothing)
+VELOCITY_WINDOW = 5
+
+
+class TrajectoryStore:
+    """
+    Trajectory (center x, y) của nhiều track dạng ring array dùng chung
+    
+    points: (capacity, TRAJECTORY_LENGTH, 2) int32, mỗi track một slot (hàng);
+    heads = vị trí ghi kế tiếp, lengths = số vị trí đã có. Không cấp phát /
+    pop(0) mỗi frame; tracker append và tính vận tốc cho mọi track một lượt.
+    Slot của track đã mất được dùng lại (release).
+    """
+    
+    def __init__(self, capacity: int = 64, length: int = TRAJECTORY_LENGTH):
+        self.length = length
+        self.points = np.zeros((capacity, length, 2), dtype=np.int32)
+        self.heads = np.zeros(capacity, dtype=np.int64)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+        self._free: List[int] = []
+    
+    @property
+    def capacity(self) -> int:
+        return len(self.heads)
+    
+    def allocate(self) -> int:
+        """Cấp slot (trajectory rỗng), tăng gấp đôi arrays khi đầy"""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow(max(1, 2 * self.capacity))
+            slot = self.size
+            self.size += 1
+        self.heads[slot] = 0
+        self.lengths[slot] = 0
+        return slot
+    
+    def release(self, slot: int):
+        self._free.append(slot)
+    
+    def _grow(self, capacity: int):
+        for name in ('points', 'heads', 'lengths'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+    
+    def append(self, slots: np.ndarray, points: np.ndarray):
+        """Thêm một center (N, 2) cho mỗi slot (slots không trùng nhau)"""
+        heads = self.heads[slots]
+        self.points[slots, heads] = points
+        self.heads[slots] = (heads + 1) % self.length
+        self.lengths[slots] = np.minimum(self.lengths[slots] + 1, self.length)
+    
+    def append_one(self, slot: int, point: tuple):
+        head = int(self.heads[slot])
+        self.points[slot, head, 0] = point[0]
+        self.points[slot, head, 1] = point[1]
+        self.heads[slot] = (head + 1) % self.length
+        if self.lengths[slot] < self.length:
+            self.lengths[slot] += 1
+    
+    def window(self, slot: int) -> np.ndarray:
+        """Trajectory (N, 2) của một slot, cũ -> mới (bản sao)"""
+        n = int(self.lengths[slot])
+        indices = (int(self.heads[slot]) - n + np.arange(n)) % self.length
+        return self.points[slot, indices]
+    
+    def velocities(self, slots: np.ndarray, window: int = VELOCITY_WINDOW) -> np.ndarray:
+        """
+        Vận tốc (vx, vy) pixels/frame của mỗi slot, shape (N, 2) float64
+        
+        Giống TrackedObject.get_velocity: (cuối - vị trí thứ n từ cuối) / n với
+        n = min(window, length); NaN khi trajectory < 2 vị trí.
+        """
+        heads = self.heads[slots]
+        n = np.minimum(window, self.lengths[slots])
+        last = self.points[slots, (heads - 1) % self.length].astype(np.int64)
+        first = self.points[slots, (heads - n) % self.length].astype(np.int64)
+        velocity = (last - first) / np.maximum(n, 1)[:, None]
+        velocity[n < 2] = np.nan
+        return velocity
+    
+    def crosses_line(self, slots: np.ndarray, line_y: int, direction: str = 'down') -> np.ndarray:
+        """TrajectoryAnalyzer.crosses_line cho mỗi slot, shape (N,) bool"""
+        offsets = np.arange(self.length)
+        heads = self.heads[slots, None]
+        n = self.lengths[slots, None]
+        ys = self.points[slots[:, None], (heads - n + offsets) % self.length, 1]
+        y1, y2 = ys[:, :-1], ys[:, 1:]
+        if direction == 'down':
+            crossed = (y1 < line_y) & (line_y <= y2)
+        else:
+            crossed = (y1 > line_y) & (line_y >= y2)
+        # Chỉ các cặp liên tiếp trong trajectory thật (bỏ phần chưa ghi)
+        return (crossed & (offsets[:-1] < n - 1)).any(axis=1)
 
 
-@dataclass
 class TrackedObject:
-    """Container for tracked object"""
-    track_id: int
-    detection: Detection
-    trajectory: List[tuple] = field(default_factory=list)  # History of center positions
-    frame_count: int = 0
-    is_lost: bool = False
-    metadata: dict = field(default_factory=dict)
+    """
+    Container for tracked object
+    
+    Trajectory (history of center positions, tối đa TRAJECTORY_LENGTH) nằm ở
+    slot của track trong TrajectoryStore (store chung của ObjectTracker; không
+    truyền thì tạo store riêng). __slots__: không có __dict__ mỗi track.
+    """
+    
+    __slots__ = ('track_id', 'detection', 'frame_count', 'is_lost', 'metadata',
+                 '_store', '_slot')
+    
+    def __init__(self, track_id: int, detection: Detection,
+                 trajectory: Optional[Union[List[tuple], np.ndarray]] = None, frame_count: int = 0,
+                 is_lost: bool = False, metadata: Optional[dict] = None,
+                 store: Optional[TrajectoryStore] = None):
+        self.track_id = track_id
+        self.detection = detection
+        self.frame_count = frame_count
+        self.is_lost = is_lost
+        self.metadata = metadata if metadata is not None else {}
+        
+        self._store = store if store is not None else TrajectoryStore(capacity=1)
+        self._slot = self._store.allocate()
+        if trajectory is not None and len(trajectory):  # list hoặc ndarray (N, 2)
+            self.trajectory = trajectory
+    
+    def __repr__(self) -> str:
+        return (f"TrackedObject(track_id={self.track_id}, detection={self.detection}, "
+                f"frame_count={self.frame_count}, is_lost={self.is_lost})")
+    
+    @property
+    def trajectory(self) -> List[tuple]:
+        """History of center positions (cũ -> mới), list (x, y)"""
+        return [tuple(point) for point in self.trajectory_array().tolist()]
+    
+    @trajectory.setter
+    def trajectory(self, positions: Union[List[tuple], np.ndarray]):
+        self._store.heads[self._slot] = 0
+        self._store.lengths[self._slot] = 0
+        for point in positions[-self._store.length:]:
+            self._store.append_one(self._slot, point)
+    
+    def trajectory_array(self) -> np.ndarray:
+        """Trajectory (N, 2) int32, cũ -> mới"""
+        return self._store.window(self._slot)
+    
+    def _detach(self):
+        """Chuyển trajectory sang store riêng (trước khi slot trong store chung bị dùng lại)"""
+        positions = self.trajectory
+        self._store = TrajectoryStore(capacity=1)
+        self._slot = self._store.allocate()
+        self.trajectory = positions
     
     def update_position(self, detection: Detection):
         """Update object position"""
         self.detection = detection
-        self.trajectory.append(detection.center)
+        self._store.append_one(self._slot, detection.center)
         self.frame_count += 1
-        
-        # Keep only last 30 positions
-        if len(self.trajectory) > 30:
-            self.trajectory.pop(0)
     
     def get_velocity(self) -> Optional[tuple]:
         """Calculate velocity vector (vx, vy) in pixels/frame"""
-        if len(self.trajectory) < 2:
+        store, slot = self._store, self._slot
+        length = int(store.lengths[slot])
+        if length < 2:
             return None
         
         # Use last 5 frames for smoothing
-        n = min(5, len(self.trajectory))
-        dx = self.trajectory[-1][0] - self.trajectory[-n][0]
-        dy = self.trajectory[-1][1] - self.trajectory[-n][1]
+        n = min(VELOCITY_WINDOW, length)
+        head = int(store.heads[slot])
+        x2, y2 = store.points[slot, (head - 1) % store.length].tolist()
+        x1, y1 = store.points[slot, (head - n) % store.length].tolist()
         
-        return (dx / n, dy / n)
+        return ((x2 - x1) / n, (y2 - y1) / n)
     
     def predict_position(self, n_frames: int = 1) -> tuple:
         """Predict future position based on velocity"""
@@ -76,6 +221,8 @@ class ObjectTracker:
         
         # Store tracked objects
         self.tracked_objects: dict[int, TrackedObject] = {}
+        # Trajectory của mọi track (slot theo track)
+        self.trajectories = TrajectoryStore()
         self.next_id = 0
         
         logger.info("Object tracker initialized")
@@ -85,23 +232,22 @@ class ObjectTracker:
         Update tracker with new detections
         
         Args:
-            detections: List of Detection objects
+            detections: DetectionBatch hoặc List of Detection objects
             
         Returns:
             List of TrackedObject with tracking IDs
         """
-        if not detections:
+        if not len(detections):
             return []
         
-        # Convert detections to supervision format
-        xyxy = np.array([det.bbox for det in detections])
-        confidence = np.array([det.confidence for det in detections])
-        class_id = np.array([det.class_id for det in detections])
+        # Detectors trả về DetectionBatch (arrays sẵn), list Detection thì wrap lại
+        batch = DetectionBatch.from_detections(detections)
         
         sv_detections = sv.Detections(
-            xyxy=xyxy,
-            confidence=confidence,
-            class_id=class_id
+            xyxy=batch.xyxy,
+            confidence=batch.confidence,
+            class_id=batch.class_id,
+            data={'index': np.arange(len(batch))}
         )
         
         # Update tracker
@@ -109,36 +255,86 @@ class ObjectTracker:
         
         # Create/update TrackedObject instances
         tracked_objects = []
+        indices = []
+        slots = []
         
-        for i, track_id in enumerate(sv_detections.tracker_id):
+        for track_id, index in zip(sv_detections.tracker_id.tolist(),
+                                   sv_detections.data['index'].tolist()):
             if track_id is None:
                 continue
             
             track_id = int(track_id)
             
-            # Get corresponding detection
-            det = detections[i]
+            # Detection view của box đã match (ByteTrack bỏ box chưa match
+            # nên phải dùng index gốc, không dùng vị trí trong output)
+            det = batch[index]
             
             # Update or create tracked object
-            if track_id in self.tracked_objects:
-                tracked_obj = self.tracked_objects[track_id]
-                tracked_obj.update_position(det)
-            else:
+            tracked_obj = self.tracked_objects.get(track_id)
+            if tracked_obj is None:
                 tracked_obj = TrackedObject(
                     track_id=track_id,
-                    detection=det
+                    detection=det,
+                    store=self.trajectories
                 )
-                tracked_obj.trajectory.append(det.center)
-                tracked_obj.frame_count = 1
                 self.tracked_objects[track_id] = tracked_obj
             
+            tracked_obj.detection = det
+            tracked_obj.frame_count += 1
             tracked_objects.append(tracked_obj)
+            indices.append(index)
+            slots.append(tracked_obj._slot)
+        
+        # Trajectory: append center của mọi track một lượt
+        if tracked_objects:
+            self.trajectories.append(np.array(slots, dtype=np.intp), batch.centers[indices])
         
         # Clean up lost tracks
         self._cleanup_lost_tracks(tracked_objects)
         
         return tracked_objects
     
+    def extrapolate(self, n_frames: int = 1) -> List[TrackedObject]:
+        """
+        Ngoại suy tracks cho frame KHÔNG chạy detector (motion gating)
+        
+        Dịch bbox của mỗi track theo predict_position (vận tốc trung bình
+        các frame gần nhất), track giữ nguyên ID.
+        
+        Returns:
+            List of TrackedObject với detection đã ngoại suy
+        """
+        # ByteTrack vẫn đếm frame: Kalman predict tiếp, track tạm thành "lost"
+        # và được match lại (giữ ID) ở frame detect kế tiếp
+        self.tracker.update_with_detections(sv.Detections.empty())
+        
+        tracked_objects = list(self.tracked_objects.values())
+        if not tracked_objects:
+            return tracked_objects
+        
+        # Vận tốc mọi track một lượt (giống predict_position; NaN = chưa đủ
+        # trajectory -> giữ nguyên vị trí)
+        slots = np.array([obj._slot for obj in tracked_objects], dtype=np.intp)
+        centers = np.array([obj.detection.center for obj in tracked_objects], dtype=np.int64)
+        predicted = np.trunc(centers + self.trajectories.velocities(slots) * n_frames)
+        shifts = np.where(np.isnan(predicted), 0, predicted - centers).astype(np.int64)
+        
+        for tracked_obj, (dx, dy) in zip(tracked_objects, shifts.tolist()):
+            det = tracked_obj.detection
+            x1, y1, x2, y2 = det.bbox
+            tracked_obj.detection = Detection(
+                class_id=det.class_id,
+                class_name=det.class_name,
+                confidence=det.confidence,
+                bbox=(x1 + dx, y1 + dy, x2 + dx, y2 + dy)
+            )
+            tracked_obj.frame_count += 1
+        
+        self.trajectories.append(
+            slots, np.array([obj.detection.center for obj in tracked_objects], dtype=np.int32))
+        
+        return tracked_objects
+    
     def _cleanup_lost_tracks(self, active_tracks: List[TrackedObject]):
         """Remove tracks that are no longer active"""
         active_ids = {obj.track_id for obj in active_tracks}
@@ -146,7 +342,12 @@ class ObjectTracker:
         
         for track_id in lost_ids:
             if track_id in self.tracked_objects:
-                del self.tracked_objects[track_id]
+                tracked_obj = self.tracked_objects.pop(track_id)
+                # Object có thể vẫn được giữ ở nơi khác: trajectory chuyển sang
+                # store riêng rồi mới trả slot
+                slot = tracked_obj._slot
+                tracked_obj._detach()
+                self.trajectories.release(slot)
     
     def get_track_by_id(self, track_id: int) -> Optional[TrackedObject]:
         """Get tracked object by ID"""
@@ -162,11 +363,17 @@ class ObjectTracker:
             minimum_consecutive_frames=1
         )
         self.tracked_objects.clear()
+        self.trajectories = TrajectoryStore()
         logger.info("Tracker reset")
 
 
 class TrajectoryAnalyzer:
-    """Analyze object trajectories for violation detection"""
+    """
+    Analyze object trajectories for violation detection
+    
+    trajectory: list (x, y) hoặc array (N, 2) (TrackedObject.trajectory_array);
+    tính bằng numpy trên toàn trajectory. Nhiều track một lượt: TrajectoryStore.
+    """
     
     @staticmethod
     def crosses_line(trajectory: List[tuple], line_y: int, 
@@ -185,20 +392,14 @@ class TrajectoryAnalyzer:
         if len(trajectory) < 2:
             return False
         
-        for i in range(len(trajectory) - 1):
-            y1 = trajectory[i][1]
-            y2 = trajectory[i + 1][1]
-            
-            if direction == 'down':
-                # Moving down (y increasing)
-                if y1 < line_y <= y2:
-                    return True
-            else:
-                # Moving up (y decreasing)
-                if y1 > line_y >= y2:
-                    return True
+        ys = np.asarray(trajectory)[:, 1]
+        y1, y2 = ys[:-1], ys[1:]
         
-        return False
+        if direction == 'down':
+            # Moving down (y increasing)
+            return bool(np.any((y1 < line_y) & (line_y <= y2)))
+        # Moving up (y decreasing)
+        return bool(np.any((y1 > line_y) & (line_y >= y2)))
     
     @staticmethod
     def is_stopped(trajectory: List[tuple], threshold: int = 5) -> bool:
@@ -216,13 +417,8 @@ class TrajectoryAnalyzer:
             return False
         
         # Check last 5 positions
-        recent = trajectory[-5:]
-        
-        xs = [p[0] for p in recent]
-        ys = [p[1] for p in recent]
-        
-        x_range = max(xs) - min(xs)
-        y_range = max(ys) - min(ys)
+        recent = np.asarray(trajectory)[-5:]
+        x_range, y_range = np.ptp(recent, axis=0).tolist()
         
         return x_range < threshold and y_range < threshold
     
@@ -23,6 +23,7 @@ CORE LOGIC VI PHẠM VƯỢT ĐÈN ĐỎ - CẢI TIẾN
 """
 
 import cv2
+import uuid
 import numpy as np
 from typing import List, Optional, Dict, Tuple, Deque
 from collections import deque, Counter
@@ -32,7 +33,8 @@ from pathlib import Path
 from loguru import logger
 
 from .tracker import TrackedObject, TrajectoryAnalyzer
-from .detector import Detection
+from .detector import Detection, DetectionBatch
+from .frame_buffer import FrameRingBuffer
 
 
 # ============================================================================
@@ -56,12 +58,114 @@ DEFAULT_MIN_FRAMES = 3
 # Xe phải qua vạch ít nhất X pixels mới tính là vi phạm
 DEFAULT_STOP_LINE_THRESHOLD = 10
 
+# Frame bằng chứng sau vi phạm (số frame sau frame vi phạm)
+DEFAULT_POST_VIOLATION_OFFSETS = [15, 30]
+
 # Độ dài trajectory tối thiểu để detect crossing motion
 TRAJECTORY_MIN_LENGTH = 5
 
 # Số frame lưu history cho voting traffic light
 LIGHT_STATE_HISTORY_SIZE = 5
 
+# Số vị trí (Y, X) lưu cho mỗi xe để detect chuyển động
+VEHICLE_HISTORY_LENGTH = 10
+
+
+# ============================================================================
+# TRACK HISTORY STORE - History vị trí của mọi xe dạng arrays
+# ============================================================================
+
+class TrackHistoryStore:
+    """
+    History vị trí (Y = bottom bbox, X = center bbox) của các xe dạng ring arrays
+    
+    Mỗi xe một slot (hàng): y / x shape (capacity, length), heads = vị trí ghi
+    kế tiếp, lengths = số vị trí đã có (tối đa length). Counter xác nhận vi phạm
+    cũng theo slot -> ViolationDetector check mọi xe trong một lượt vectorized
+    mỗi frame thay vì từng xe qua deque.
+    
+    int32 giống DetectionBatch.xyxy: y_change / x_change / tỷ lệ X/Y tính ra
+    giống hệt bản list Python.
+    """
+    
+    def __init__(self, length: int = VEHICLE_HISTORY_LENGTH, capacity: int = 64):
+        self.length = length
+        self.size = 0
+        self.y = np.zeros((capacity, length), dtype=np.int32)
+        self.x = np.zeros((capacity, length), dtype=np.int32)
+        self.heads = np.zeros(capacity, dtype=np.int64)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros(capacity, dtype=np.int64)  # Số frame vi phạm liên tiếp
+        self.confirmed = np.zeros(capacity, dtype=bool)
+    
+    @property
+    def capacity(self) -> int:
+        return len(self.heads)
+    
+    def allocate(self) -> int:
+        """Cấp slot mới (history rỗng, counter = 0), tăng gấp đôi arrays khi đầy"""
+        if self.size == self.capacity:
+            self._grow(max(1, 2 * self.capacity))
+        
+        slot = self.size
+        self.size += 1
+        self.heads[slot] = 0
+        self.lengths[slot] = 0
+        self.counts[slot] = 0
+        self.confirmed[slot] = False
+        return slot
+    
+    def _grow(self, capacity: int):
+        for name in ('y', 'x', 'heads', 'lengths', 'counts', 'confirmed'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+    
+    def clear(self):
+        """Bỏ mọi slot (arrays giữ nguyên để dùng lại)"""
+        self.size = 0
+    
+    def append(self, slots: np.ndarray, ys: np.ndarray, xs: np.ndarray):
+        """Thêm một vị trí cho mỗi slot (slots không trùng nhau)"""
+        heads = self.heads[slots]
+        self.y[slots, heads] = ys
+        self.x[slots, heads] = xs
+        self.heads[slots] = (heads + 1) % self.length
+        self.lengths[slots] = np.minimum(self.lengths[slots] + 1, self.length)
+    
+    def window(self, values: np.ndarray, slot: int) -> List[int]:
+        """History của một slot (self.y hoặc self.x), cũ -> mới"""
+        n = int(self.lengths[slot])
+        indices = (int(self.heads[slot]) - n + np.arange(n)) % self.length
+        return values[slot, indices].tolist()
+    
+    def motion(self, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (forward, sideways) cho mỗi slot
+        
+        forward: |Y| thay đổi > 5px trong 8 vị trí gần nhất (cần >= 3 vị trí)
+        sideways: X thay đổi > 80px trong 10 vị trí gần nhất và Y gần như không
+                  đổi (< 10px) hoặc tỷ lệ X/Y > 5 (cần >= 5 vị trí)
+        """
+        heads = self.heads[slots]
+        lengths = self.lengths[slots]
+        last = (heads - 1) % self.length
+        y_last = self.y[slots, last]
+        x_last = self.x[slots, last]
+        
+        first = (heads - np.minimum(lengths, 8)) % self.length
+        forward = (lengths >= 3) & (np.abs(y_last - self.y[slots, first]) > 5)
+        
+        first = (heads - np.minimum(lengths, 10)) % self.length
+        x_change = np.abs(x_last - self.x[slots, first])
+        y_change = np.abs(y_last - self.y[slots, first])
+        ratio = np.divide(x_change, y_change, out=np.zeros(len(slots)), where=y_change > 0)
+        sideways = ((lengths >= 5) & (x_change > 80)
+                    & ((y_change < 10) | ((y_change > 0) & (ratio > 5.0))))
+        
+        return forward, sideways
+
 
 # ============================================================================
 # DATA CLASSES - Cấu trúc dữ liệu
@@ -119,6 +223,9 @@ class VehicleState:
     - was_before_line_when_red: Xe có ở TRƯỚC vạch khi đèn đỏ không?
     - Chỉ những xe ở TRƯỚC vạch mới có thể vi phạm
     - Xe đã qua vạch khi đèn đỏ = đang đi hợp lệ, KHÔNG PHẠT
+    
+    History vị trí và counter xác nhận nằm ở slot của xe trong TrackHistoryStore
+    (store chung của ViolationDetector; không truyền thì tạo store riêng).
     """
     track_id: int
     
@@ -132,24 +239,49 @@ class VehicleState:
     crossing_frame: Optional[int] = None
     crossing_time: Optional[datetime] = None
     
-    # ========== VIOLATION CONFIRMATION ==========
-    violation_confirmed: bool = False
-    violation_frames_count: int = 0  # Đếm số frame vi phạm liên tiếp
-    
     # ========== EXEMPTIONS ==========
     yellow_exempt: bool = False  # Miễn vì quá gần khi đèn vàng
     
-    # ========== TRAJECTORY ==========
-    # Lưu history Y positions để detect crossing motion
-    y_positions: Deque = field(default_factory=lambda: deque(maxlen=10))
-    # Lưu history X positions để detect xe đi ngang
-    x_positions: Deque = field(default_factory=lambda: deque(maxlen=10))
+    # ========== TRAJECTORY & CONFIRMATION ==========
+    history: Optional[TrackHistoryStore] = field(default=None, repr=False)
+    slot: int = -1
+    
+    def __post_init__(self):
+        if self.history is None:
+            self.history = TrackHistoryStore(capacity=1)
+            self.slot = self.history.allocate()
+    
+    @property
+    def y_positions(self) -> List[int]:
+        """History Y positions (bottom bbox) để detect crossing motion"""
+        return self.history.window(self.history.y, self.slot)
+    
+    @property
+    def x_positions(self) -> List[int]:
+        """History X positions (center bbox) để detect xe đi ngang"""
+        return self.history.window(self.history.x, self.slot)
+    
+    @property
+    def violation_frames_count(self) -> int:
+        """Đếm số frame vi phạm liên tiếp"""
+        return int(self.history.counts[self.slot])
+    
+    @violation_frames_count.setter
+    def violation_frames_count(self, value: int):
+        self.history.counts[self.slot] = value
     
-    def update_position(self, y: int, x: int = None):
+    @property
+    def violation_confirmed(self) -> bool:
+        return bool(self.history.confirmed[self.slot])
+    
+    @violation_confirmed.setter
+    def violation_confirmed(self, value: bool):
+        self.history.confirmed[self.slot] = value
+    
+    def update_position(self, y: int, x: int):
         """Update position history"""
-        self.y_positions.append(y)
-        if x is not None:
-            self.x_positions.append(x)
+        slots = np.array([self.slot])
+        self.history.append(slots, y, x)
 
 
 @dataclass
@@ -187,6 +319,13 @@ class Violation:
     license_plate: Optional[str] = None
     officer_note: str = ""
     
+    # Nguồn video (để cắt clip bằng chứng sau, xem clip_extractor)
+    source_video: str = ""
+    source_pts: Optional[float] = None  # Vị trí frame vi phạm trong video (giây)
+    # Index frame trong nguồn; None = frame_number - 1 (frame_number đếm từ đầu
+    # nguồn). Service đếm frame liên tục qua nhiều segment nên set riêng.
+    source_frame_index: Optional[int] = None
+    
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON export"""
         return {
@@ -213,8 +352,45 @@ class Violation:
             'model_used': self.model_used,
             'status': self.status,
             'license_plate': self.license_plate,
-            'officer_note': self.officer_note
+            'officer_note': self.officer_note,
+            'source': {
+                'video': self.source_video,
+                'frame_index': (self.source_frame_index if self.source_frame_index is not None
+                                else self.frame_number - 1),
+                'pts_seconds': self.source_pts
+            }
         }
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Violation':
+        """Tạo lại Violation từ to_dict() (violations.json, ViolationStore)"""
+        vehicle = data.get('vehicle', {})
+        light = data.get('traffic_light', {})
+        stop_line = data.get('stop_line', {})
+        source = data.get('source', {})
+        return cls(
+            violation_id=data['violation_id'],
+            track_id=data['track_id'],
+            timestamp=datetime.fromisoformat(data['timestamp']),
+            frame_number=data['frame_number'],
+            vehicle_class=vehicle.get('class', ''),
+            vehicle_bbox=tuple(vehicle.get('bbox', (0, 0, 0, 0))),
+            vehicle_confidence=vehicle.get('confidence', 0.0),
+            light_state=light.get('state', ''),
+            red_light_duration=light.get('red_duration_seconds', 0.0),
+            stop_line_y=stop_line.get('y_position', 0),
+            crossing_distance=stop_line.get('crossing_distance_pixels', 0.0),
+            evidence_paths=list(data.get('evidence_paths', [])),
+            location=data.get('location', ''),
+            camera_id=data.get('camera_id', ''),
+            model_used=data.get('model_used', 'YOLOv11'),
+            status=data.get('status', 'Chưa xử lý'),
+            license_plate=data.get('license_plate'),
+            officer_note=data.get('officer_note', ''),
+            source_video=source.get('video', ''),
+            source_pts=source.get('pts_seconds'),
+            source_frame_index=source.get('frame_index')
+        )
 
 
 # ============================================================================
@@ -279,10 +455,17 @@ class ViolationDetector:
         # Minimum vehicle confidence để tính vi phạm
         self.min_vehicle_confidence = violation_config.get('min_vehicle_confidence', 0.5)
         
+        # FPS của nguồn video (set theo frame clock khi bắt đầu xử lý)
+        self.fps = 30.0
+        
         # Location info
         self.location = location_config.get('intersection', 'Unknown')
         self.camera_id = location_config.get('camera_id', 'CAM_001')
         
+        # Token phiên trong violation_id: track ID bắt đầu lại ở mỗi video /
+        # detector mới (batch, service) -> cùng camera + cùng giây không trùng ID
+        self.session_token = uuid.uuid4().hex[:6]
+        
         # ========== STATE ==========
         # Traffic light state với voting
         self.traffic_light = TrafficLightState()
@@ -293,15 +476,27 @@ class ViolationDetector:
         # Vehicle states: track_id -> VehicleState
         self.vehicle_states: Dict[int, VehicleState] = {}
         
+        # History vị trí + counter xác nhận của mọi VehicleState (slot theo xe)
+        self._history = TrackHistoryStore()
+        
         # Recorded violations: track_id -> Violation
         self.violations: Dict[int, Violation] = {}
         
         # Frame buffer cho evidence collection (~5 giây at 30fps)
-        self.frame_buffer: Deque = deque(maxlen=150)
+        # Preallocated ring buffer, index theo frame number
+        self.frame_buffer = FrameRingBuffer.from_config(config)
         
         # Store current detections for evidence
         self.current_detections: List[Detection] = []
         
+        # Deferred capture: frame bằng chứng SAU vi phạm (chưa có trong buffer
+        # lúc tạo violation) -> đăng ký frame number, update() lấy khi frame tới
+        self.post_violation_offsets = sorted(
+            violation_config.get('post_violation_offsets', DEFAULT_POST_VIOLATION_OFFSETS))
+        self._pending_evidence: Dict[int, List[Tuple[Violation, str]]] = {}
+        self._pending_counts: Dict[str, int] = {}
+        self._finalized_violations: List[Violation] = []
+        
         # ========== STATISTICS ==========
         self.total_frames_processed = 0
         self.total_vehicles_tracked = 0
@@ -323,8 +518,14 @@ class ViolationDetector:
         return self.traffic_light.current_state
     
     def _is_in_roi(self, vehicle: 'TrackedObject', frame_shape: tuple) -> bool:
+        """Check một xe có trong ROI không (xem _roi_mask)"""
+        boxes = np.array([vehicle.detection.bbox], dtype=np.int32)
+        return bool(self._roi_mask(boxes, frame_shape)[0])
+    
+    def _roi_mask(self, boxes: np.ndarray, frame_shape: tuple) -> np.ndarray:
         """
-        Check if vehicle is in the lane controlled by the detected red light
+        Check vehicles (boxes (N, 4) x1, y1, x2, y2) có trong lane controlled by
+        the detected red light không
         
         Logic:
         - Nếu đèn đỏ ở bên PHẢI (x > 0.5): chỉ bắt xe ở lane GIỮA và PHẢI
@@ -332,36 +533,30 @@ class ViolationDetector:
         - Xe ở lane đối diện (ngược lại) = KHÔNG bắt
         """
         if not self.roi_enabled:
-            return True
+            return np.ones(len(boxes), dtype=bool)
         
-        x1, y1, x2, y2 = vehicle.detection.bbox
         h, w = frame_shape[:2]
         self._frame_width = w  # Lưu để tính red_light_center_x
         
         # Get center of vehicle (normalized 0-1)
-        vehicle_cx = (x1 + x2) / 2 / w
-        vehicle_cy = (y1 + y2) / 2 / h
+        vehicle_cx = (boxes[:, 0] + boxes[:, 2]) / 2 / w
+        vehicle_cy = (boxes[:, 1] + boxes[:, 3]) / 2 / h
         
         # Check Y trong range
-        if not (self.roi_y_min <= vehicle_cy <= self.roi_y_max):
-            return False
+        mask = (self.roi_y_min <= vehicle_cy) & (vehicle_cy <= self.roi_y_max)
         
         # Nếu có vị trí đèn đỏ, dùng nó để xác định lane
         if self.red_light_center_x is not None:
-            # Đèn đỏ ở bên phải (> 0.5) -> chỉ bắt xe ở phần giữa-phải của frame
-            # Đèn đỏ ở bên trái (< 0.5) -> chỉ bắt xe ở phần giữa-trái của frame
             if self.red_light_center_x > 0.5:
-                # Đèn ở phải -> xe phải ở vùng center đến phải (0.3 - 0.85)
-                # Không bắt xe ở mép trái (lane ngược chiều)
-                if vehicle_cx < 0.25:
-                    return False  # Xe ở lane bên trái (ngược chiều)
+                # Đèn ở phải -> không bắt xe ở mép trái (lane ngược chiều)
+                mask &= ~(vehicle_cx < 0.25)
             else:
-                # Đèn ở trái -> xe phải ở vùng center đến trái (0.15 - 0.7)
-                if vehicle_cx > 0.75:
-                    return False  # Xe ở lane bên phải (ngược chiều)
+                # Đèn ở trái -> không bắt xe ở mép phải (lane ngược chiều)
+                mask &= ~(vehicle_cx > 0.75)
         
         # Fallback: dùng ROI config
-        return (self.roi_x_min <= vehicle_cx <= self.roi_x_max)
+        mask &= (self.roi_x_min <= vehicle_cx) & (vehicle_cx <= self.roi_x_max)
+        return mask
     
     # ========================================================================
     # PUBLIC API - Interface chính
@@ -378,7 +573,7 @@ class ViolationDetector:
         
         Args:
             tracked_vehicles: List tracked vehicles từ ByteTrack
-            detections: Tất cả detections từ model
+            detections: Tất cả detections từ model (DetectionBatch hoặc list)
             frame: Frame image hiện tại
             frame_number: Số frame
             timestamp: Thời gian hiện tại
@@ -389,16 +584,17 @@ class ViolationDetector:
         self.total_frames_processed += 1
         new_violations = []
         
+        # Struct-of-arrays cho các bước lọc theo class (list Detection thì wrap lại)
+        detections = DetectionBatch.from_detections(detections)
+        
         # Lưu detections hiện tại để vẽ lên evidence
         self.current_detections = detections
         
-        # Store frame vào buffer cho evidence (kèm detections)
-        self.frame_buffer.append({
-            'frame': frame.copy(),
-            'frame_number': frame_number,
-            'timestamp': timestamp,
-            'detections': detections  # Lưu detections để annotate evidence
-        })
+        # Store frame vào buffer cho evidence (kèm detections để annotate)
+        if frame is not None:
+            self.frame_buffer.put(frame_number, frame, timestamp, detections)
+            if self._pending_evidence:
+                self._fulfill_pending_evidence(frame_number)
         
         # 1. Update traffic light state (với voting)
         self._update_traffic_light_state(detections, timestamp, frame_number)
@@ -428,51 +624,11 @@ class ViolationDetector:
         # 4. Handle light state changes (QUAN TRỌNG)
         self._handle_light_state_change(tracked_vehicles, stop_line_y, timestamp, frame_number)
         
-        # 5. Check từng xe cho violations
-        for vehicle in tracked_vehicles:
-            # Filter: chỉ check vehicle classes
-            if vehicle.detection.class_name not in VEHICLE_CLASSES:
-                continue
-            
-            # Filter: chỉ check xe có confidence đủ cao
-            if vehicle.detection.confidence < self.min_vehicle_confidence:
-                continue
-            
-            # Filter: chỉ check xe trong ROI (vùng giám sát của đèn đỏ)
-            in_roi = self._is_in_roi(vehicle, frame.shape)
-            if not in_roi:
-                if frame_number % 30 == 0:
-                    x1, y1, x2, y2 = vehicle.detection.bbox
-                    h, w = frame.shape[:2]
-                    cx = (x1 + x2) / 2 / w
-                    cy = (y1 + y2) / 2 / h
-                    logger.debug(f"Track {vehicle.track_id} OUTSIDE ROI: cx={cx:.2f}, cy={cy:.2f}")
-                continue
-            
-            self.total_vehicles_tracked += 1
-            
-            # Get hoặc create vehicle state
-            state = self._get_or_create_vehicle_state(vehicle, stop_line_y)
-            
-            # Update vehicle position (cả X và Y)
-            x1, y1, x2, y2 = vehicle.detection.bbox
-            vehicle_y = y2  # Bottom of bbox
-            vehicle_x = (x1 + x2) // 2  # Center X
-            state.update_position(vehicle_y, vehicle_x)
-            
-            # Check violation
-            violation = self._check_vehicle_violation(
-                vehicle=vehicle,
-                state=state,
-                stop_line_y=stop_line_y,
-                frame=frame,
-                frame_number=frame_number,
-                timestamp=timestamp
-            )
-            
-            if violation:
-                new_violations.append(violation)
-                logger.warning(f"🚨 VIOLATION DETECTED: Track {vehicle.track_id}")
+        # 5. Check violations cho mọi xe (một lượt vectorized)
+        new_violations = self._check_vehicles(tracked_vehicles, stop_line_y, frame,
+                                              frame_number, timestamp)
+        for violation in new_violations:
+            logger.warning(f"🚨 VIOLATION DETECTED: Track {violation.track_id}")
         
         return new_violations
     
@@ -510,7 +666,7 @@ class ViolationDetector:
     # TRAFFIC LIGHT HANDLING - Xử lý trạng thái đèn
     # ========================================================================
     
-    def _update_traffic_light_state(self, detections: List[Detection], 
+    def _update_traffic_light_state(self, detections: DetectionBatch, 
                                      timestamp: datetime, frame_number: int):
         """
         Update traffic light state với VOTING MECHANISM
@@ -520,15 +676,14 @@ class ViolationDetector:
         - Smoothing state transitions
         - Ưu tiên safety (đèn đỏ) khi không rõ ràng
         """
-        # Find all traffic light detections
-        light_detections = [d for d in detections if d.class_name in LIGHT_CLASSES]
+        # Lấy traffic light detection có confidence cao nhất (vectorized)
+        best_index = detections.best_index(detections.class_mask(LIGHT_CLASSES))
         
-        if not light_detections:
+        if best_index is None:
             # Không có detection - giữ state trước
             return
         
-        # Lấy detection có confidence cao nhất
-        best_light = max(light_detections, key=lambda x: x.confidence)
+        best_light = detections[best_index]
         detected_state = best_light.class_name.replace('_light', '').upper()
         
         # LƯU VỊ TRÍ ĐÈN ĐỎ để xác định lane
@@ -619,28 +774,26 @@ class ViolationDetector:
                 # QUAN TRỌNG: Đánh dấu xe ở TRƯỚC hay SAU vạch
                 state.was_before_line_when_red = (vehicle_y <= stop_line_y)
                 
-                logger.debug(f"  Track {vehicle.track_id}: y={vehicle_y}, "
-                           f"before_line={state.was_before_line_when_red}")
+                logger.debug("  Track {}: y={}, before_line={}", vehicle.track_id, vehicle_y,
+                             state.was_before_line_when_red)
         
         # ========== KHI ĐÈN CHUYỂN XANH ==========
         elif current_state == "GREEN":
             if self.vehicle_states:
                 logger.debug("🟢 Green light - resetting vehicle states")
                 self.vehicle_states.clear()
+                self._history.clear()
     
     # ========================================================================
     # STOP LINE HANDLING - Xử lý vạch dừng
     # ========================================================================
     
-    def _update_stop_line(self, detections: List[Detection]):
-        """Update stop line từ detections"""
-        stop_line_det = next(
-            (d for d in detections if d.class_name == 'stop_line'), 
-            None
-        )
+    def _update_stop_line(self, detections: DetectionBatch):
+        """Update stop line từ detections (stop_line đầu tiên)"""
+        indices = np.flatnonzero(detections.class_mask(('stop_line',)))
         
-        if stop_line_det:
-            self.stop_line = StopLine(detection=stop_line_det)
+        if indices.size:
+            self.stop_line = StopLine(detection=detections[int(indices[0])])
     
     # ========================================================================
     # VEHICLE STATE MANAGEMENT - Quản lý state xe
@@ -661,8 +814,9 @@ class ViolationDetector:
         if track_id not in self.vehicle_states:
             vehicle_y = self._get_vehicle_bottom_y(vehicle)
             
-            # Create new state
-            state = VehicleState(track_id=track_id)
+            # Create new state (slot mới trong history store)
+            state = VehicleState(track_id=track_id, history=self._history,
+                                 slot=self._history.allocate())
             
             # Nếu đèn đang đỏ, record vị trí ban đầu
             if self.traffic_light.current_state == "RED":
@@ -670,7 +824,7 @@ class ViolationDetector:
                 state.was_before_line_when_red = (vehicle_y <= stop_line_y)
             
             self.vehicle_states[track_id] = state
-            logger.debug(f"New vehicle state: Track {track_id}, y={vehicle_y}")
+            logger.debug("New vehicle state: Track {}, y={}", track_id, vehicle_y)
         
         return self.vehicle_states[track_id]
     
@@ -685,9 +839,9 @@ class ViolationDetector:
     # VIOLATION DETECTION - CORE LOGIC
     # ========================================================================
     
-    def _check_vehicle_violation(self, vehicle: TrackedObject, state: VehicleState,
-                                  stop_line_y: int, frame: np.ndarray,
-                                  frame_number: int, timestamp: datetime) -> Optional[Violation]:
+    def _check_vehicles(self, tracked_vehicles: List[TrackedObject], stop_line_y: int,
+                        frame: np.ndarray, frame_number: int,
+                        timestamp: datetime) -> List[Violation]:
         """
         ==========================================================================
         CORE VIOLATION DETECTION LOGIC - VERSION 3
@@ -702,90 +856,114 @@ class ViolationDetector:
         6. Đủ số frame xác nhận
         
         KHÔNG CẦN stop_line - xe di chuyển về camera khi đèn đỏ = vi phạm
+        
+        Mọi xe check trong một lượt: lọc confidence / ROI, history vị trí và
+        counter xác nhận (TrackHistoryStore, theo slot) tính bằng numpy. Kết quả
+        giống check từng xe; violations tạo theo thứ tự tracked_vehicles.
+        
+        Returns:
+            List violations MỚI xác nhận trong frame này
         """
-        track_id = vehicle.track_id
+        # Filter: chỉ check vehicle classes
+        vehicles = [v for v in tracked_vehicles if v.detection.class_name in VEHICLE_CLASSES]
+        if not vehicles:
+            return []
+        
+        # Filter: chỉ check xe có confidence đủ cao
+        confidence = np.array([v.detection.confidence for v in vehicles], dtype=np.float64)
+        keep = np.flatnonzero(~(confidence < self.min_vehicle_confidence))
+        if keep.size == 0:
+            return []
+        vehicles = [vehicles[i] for i in keep.tolist()]
+        boxes = np.array([v.detection.bbox for v in vehicles], dtype=np.int32).reshape(-1, 4)
+        
+        # Filter: chỉ check xe trong ROI (vùng giám sát của đèn đỏ)
+        in_roi = self._roi_mask(boxes, frame.shape)
+        if not in_roi.all():
+            if frame_number % 30 == 0:
+                h, w = frame.shape[:2]
+                for i in np.flatnonzero(~in_roi).tolist():
+                    x1, y1, x2, y2 = boxes[i].tolist()
+                    logger.debug("Track {} OUTSIDE ROI: cx={:.2f}, cy={:.2f}", vehicles[i].track_id,
+                                 (x1 + x2) / 2 / w, (y1 + y2) / 2 / h)
+            keep = np.flatnonzero(in_roi)
+            if keep.size == 0:
+                return []
+            vehicles = [vehicles[i] for i in keep.tolist()]
+            boxes = boxes[keep]
+        
+        self.total_vehicles_tracked += len(vehicles)
+        
+        # Get hoặc create vehicle states, update vị trí (Y = bottom, X = center)
+        states = [self._get_or_create_vehicle_state(v, stop_line_y) for v in vehicles]
+        slots = np.array([state.slot for state in states], dtype=np.intp)
+        history = self._history
+        history.append(slots, boxes[:, 3], (boxes[:, 0] + boxes[:, 2]) // 2)
         
         # ========== ĐÃ VI PHẠM - SKIP ==========
-        if track_id in self.violations:
-            return None
-        
-        if state.violation_confirmed:
-            return None
+        active = ~history.confirmed[slots] & np.array(
+            [v.track_id not in self.violations for v in vehicles], dtype=bool)
         
         # ========== ĐIỀU KIỆN 1: ĐÈN PHẢI ĐỎ ==========
         if self.traffic_light.current_state != "RED":
             # Reset violation count khi không phải đèn đỏ
-            state.violation_frames_count = 0
-            return None
+            history.counts[slots[active]] = 0
+            return []
         
         # ========== ĐIỀU KIỆN 2: KHÔNG TRONG GRACE PERIOD ==========
         red_start = self.traffic_light.red_start_time
         if red_start is None:
-            logger.debug(f"Track {track_id}: red_start is None")
-            return None
+            logger.debug("red_start is None")
+            return []
         
         time_since_red = (timestamp - red_start).total_seconds()
-        vehicle_y = self._get_vehicle_bottom_y(vehicle)
-        
         if time_since_red < self.grace_period:
-            logger.debug(f"Track {track_id}: trong grace period ({time_since_red:.1f}s < {self.grace_period}s)")
-            return None
-        
-        # ========== ĐIỀU KIỆN 3: XE ĐANG DI CHUYỂN VỀ PHÍA CAMERA ==========
-        # Y tăng = xe tiến về phía camera = VƯỢT ĐÈN ĐỎ
-        is_moving_forward = self._is_vehicle_moving_towards_camera(state)
-        
-        # ========== ĐIỀU KIỆN 4: XE KHÔNG ĐI NGANG (từ lane khác) ==========
-        is_moving_sideways = self._is_vehicle_moving_sideways(state)
-        
-        # Log chi tiết cho debug
-        y_positions = list(state.y_positions)
-        x_positions = list(state.x_positions)
-        y_change = y_positions[-1] - y_positions[0] if len(y_positions) >= 2 else 0
-        x_change = abs(x_positions[-1] - x_positions[0]) if len(x_positions) >= 2 else 0
+            logger.debug("{} xe trong grace period ({:.1f}s < {}s)",
+                         len(vehicles), time_since_red, self.grace_period)
+            return []
         
-        # Log EVERY frame khi đèn đỏ - quan trọng để debug
-        logger.info(f"🔍 Track {track_id}: y={vehicle_y}, y_change={y_change:.0f}, x_change={x_change:.0f}, "
-                    f"forward={is_moving_forward}, sideways={is_moving_sideways}, "
-                    f"positions={len(y_positions)}, red_dur={time_since_red:.1f}s")
+        # ========== ĐIỀU KIỆN 3 + 4: DI CHUYỂN VỀ PHÍA CAMERA, KHÔNG ĐI NGANG ==========
+        is_moving_forward, is_moving_sideways = history.motion(slots)
         
-        # Xe đi ngang = KHÔNG PHẠT
-        if is_moving_sideways:
-            state.violation_frames_count = 0
-            return None
-        
-        # Xe KHÔNG di chuyển về camera = KHÔNG PHẠT
-        if not is_moving_forward:
-            state.violation_frames_count = 0
-            return None
+        # Xe đi ngang / KHÔNG di chuyển về camera = KHÔNG PHẠT (reset count)
+        moving = active & is_moving_forward & ~is_moving_sideways
+        history.counts[slots[active & ~moving]] = 0
         
         # ========== ĐIỀU KIỆN 5: MULTI-FRAME CONFIRMATION ==========
-        state.violation_frames_count += 1
-        
-        logger.warning(f"🚨 Track {track_id}: VIOLATION frame {state.violation_frames_count}/{self.min_frames}")
-        
-        if state.violation_frames_count < self.min_frames:
-            return None
+        history.counts[slots[moving]] += 1
+        confirmed = moving & (history.counts[slots] >= self.min_frames)
         
-        # ==========================================================
-        # ✅ VI PHẠM ĐƯỢC XÁC NHẬN
-        # ==========================================================
-        state.violation_confirmed = True
-        state.crossing_frame = frame_number
-        state.crossing_time = timestamp
+        # Log mỗi frame khi đèn đỏ (DEBUG): chỉ tính khi level DEBUG bật
+        logger.opt(lazy=True).debug(
+            "🔍 {} xe: forward={}, sideways={}, counting={}, confirmed={}, red_dur={:.1f}s",
+            lambda: int(active.sum()), lambda: int((active & is_moving_forward).sum()),
+            lambda: int((active & is_moving_sideways).sum()), lambda: int(moving.sum()),
+            lambda: int(confirmed.sum()), lambda: time_since_red)
         
-        violation = self._create_violation(
-            vehicle=vehicle,
-            state=state,
-            stop_line_y=stop_line_y,
-            frame=frame,
-            frame_number=frame_number,
-            timestamp=timestamp,
-            time_since_red=time_since_red
-        )
+        new_violations = []
+        for i in np.flatnonzero(confirmed).tolist():
+            # ==========================================================
+            # ✅ VI PHẠM ĐƯỢC XÁC NHẬN
+            # ==========================================================
+            vehicle, state = vehicles[i], states[i]
+            state.violation_confirmed = True
+            state.crossing_frame = frame_number
+            state.crossing_time = timestamp
+            
+            violation = self._create_violation(
+                vehicle=vehicle,
+                state=state,
+                stop_line_y=stop_line_y,
+                frame=frame,
+                frame_number=frame_number,
+                timestamp=timestamp,
+                time_since_red=time_since_red
+            )
+            
+            self.violations[vehicle.track_id] = violation
+            new_violations.append(violation)
         
-        self.violations[track_id] = violation
-        return violation
+        return new_violations
     
     def _is_vehicle_moving_towards_camera(self, state: VehicleState) -> bool:
         """
@@ -795,26 +973,11 @@ class ViolationDetector:
         - Camera từ TRƯỚC (nhìn vào xe): Y TĂNG = xe tiến tới
         - Camera từ SAU (nhìn theo xe): Y GIẢM = xe tiến tới (đi xa camera)
         
-        Solution: Check CẢ HAI trường hợp - xe đang di chuyển đáng kể là vi phạm
-        
-        QUAN TRỌNG: Giảm threshold vì xe di chuyển chậm có y_change nhỏ
+        Solution: Check CẢ HAI trường hợp - xe đang di chuyển đáng kể (> 5px
+        trong 8 vị trí gần nhất) là vi phạm. Xem TrackHistoryStore.motion.
         """
-        y_positions = list(state.y_positions)
-        if len(y_positions) < 3:
-            return False  # Cần ít nhất 3 positions
-        
-        # Lấy positions gần nhất
-        recent = y_positions[-8:] if len(y_positions) >= 8 else y_positions
-        
-        # Tính tổng di chuyển Y (có thể âm hoặc dương)
-        y_change = recent[-1] - recent[0]
-        
-        # GIẢM threshold xuống 5px - xe di chuyển chậm cũng bắt được
-        # Xe đứng yên (|y_change| < 5) = không vi phạm
-        min_movement = 5
-        
-        # Trả về True nếu xe di chuyển nhiều (dương HOẶC âm)
-        return abs(y_change) > min_movement
+        forward, _ = state.history.motion(np.array([state.slot]))
+        return bool(forward[0])
     
     def _is_vehicle_moving(self, state: VehicleState) -> bool:
         """Check if vehicle is moving (not stationary)"""
@@ -832,44 +995,14 @@ class ViolationDetector:
         Check if vehicle is moving SIDEWAYS (left-right) - xe đi ngang từ lane khác
         
         Xe đi ngang từ lane khác có đặc điểm:
-        - X thay đổi RẤT NHIỀU (di chuyển ngang mạnh)
-        - Y thay đổi ÍT (không tiến về phía camera)
-        - Tỷ lệ X_change / Y_change RẤT cao (> 5)
+        - X thay đổi RẤT NHIỀU (> 80px, di chuyển ngang mạnh)
+        - Y thay đổi ÍT (< 10px, không tiến về phía camera)
+        - Hoặc tỷ lệ X_change / Y_change RẤT cao (> 5)
         
-        QUAN TRỌNG: Tăng threshold để không filter nhầm xe đi thẳng có quẹo nhẹ
-        
-        Returns True nếu xe đang đi ngang -> KHÔNG PHẠT
+        Returns True nếu xe đang đi ngang -> KHÔNG PHẠT. Xem TrackHistoryStore.motion.
         """
-        x_positions = list(state.x_positions)
-        y_positions = list(state.y_positions)
-        
-        if len(x_positions) < 5 or len(y_positions) < 5:
-            return False  # Không đủ data
-        
-        # Lấy nhiều positions hơn để xác định chính xác hướng
-        recent_x = x_positions[-10:] if len(x_positions) >= 10 else x_positions
-        recent_y = y_positions[-10:] if len(y_positions) >= 10 else y_positions
-        
-        x_change = abs(recent_x[-1] - recent_x[0])  # Tổng di chuyển X
-        y_change = abs(recent_y[-1] - recent_y[0])  # Tổng di chuyển Y (lấy abs)
-        
-        # CHỈ coi là xe đi ngang khi:
-        # 1. X thay đổi RẤT nhiều (> 80px) - tăng từ 50 lên 80
-        # 2. Y gần như không đổi (< 10px) - giữ nguyên
-        # 3. Hoặc tỷ lệ X/Y > 5 (tăng từ 3 lên 5)
-        
-        if x_change > 80:  # X di chuyển rất nhiều
-            # Xe đi NGANG: X >> Y 
-            if y_change < 10:  # Y gần như không đổi
-                logger.debug(f"Xe đi ngang: x_change={x_change:.0f}, y_change={y_change:.0f}")
-                return True
-            
-            # Tỷ lệ X/Y rất cao = chắc chắn đi ngang
-            if y_change > 0 and x_change / y_change > 5.0:
-                logger.debug(f"Xe đi chéo (nhiều X): x_change={x_change:.0f}, y_change={y_change:.0f}, ratio={x_change/y_change:.1f}")
-                return True
-        
-        return False
+        _, sideways = state.history.motion(np.array([state.slot]))
+        return bool(sideways[0])
     
     def _is_vehicle_moving_any_direction(self, state: VehicleState) -> bool:
         """
@@ -966,7 +1099,9 @@ class ViolationDetector:
         vehicle_y = self._get_vehicle_bottom_y(vehicle)
         crossing_distance = vehicle_y - stop_line_y
         
-        violation_id = f"VL_{timestamp.strftime('%Y%m%d_%H%M%S')}_{vehicle.track_id:04d}"
+        # camera_id trong ID: store dùng chung cho nhiều camera (service, batch)
+        violation_id = (f"VL_{self.camera_id}_{timestamp.strftime('%Y%m%d_%H%M%S')}"
+                        f"_{self.session_token}_{vehicle.track_id:04d}")
         
         violation = Violation(
             violation_id=violation_id,
@@ -996,42 +1131,90 @@ class ViolationDetector:
     
     def _collect_evidence_frames(self, violation: Violation, current_frame: int):
         """
-        Collect 3 evidence frames: before, during, after
+        Collect evidence frames: before, during, after
         
         Theo chuẩn quốc tế về bằng chứng vi phạm giao thông
-        Lưu kèm detections để annotate sau
+        Lưu kèm detections để annotate sau. Frame trước/trong vi phạm lấy
+        ngay từ buffer; frame sau vi phạm (post_violation_offsets) được đăng ký
+        và lấy trong update() khi frame đó tới (deferred capture).
         """
-        fps = 30  # Assume 30 fps
+        fps = int(round(self.fps))
         
-        # Target frames: 1 giây trước, hiện tại, 1 giây sau
+        # Target frames: 1 giây trước, hiện tại
         target_frames = [
-            current_frame - fps,      # Pre-violation (~1s trước)
-            current_frame,            # During violation
-            # current_frame + fps     # Post-violation (chưa có)
+            (current_frame - fps, 'pre'),      # Pre-violation (~1s trước)
+            (current_frame, 'during'),         # During violation
         ]
         
-        for target in target_frames:
-            # Tìm frame gần nhất trong buffer
-            for frame_data in self.frame_buffer:
-                if frame_data['frame_number'] == target:
-                    # Lưu cả frame và detections
-                    evidence_data = {
-                        'frame': frame_data['frame'].copy(),
-                        'detections': frame_data.get('detections', [])
-                    }
-                    violation.evidence_frames.append(evidence_data)
-                    break
-            else:
-                # Frame không tìm thấy - dùng current nếu là target
-                if target == current_frame:
-                    for frame_data in self.frame_buffer:
-                        if frame_data['frame_number'] == current_frame:
-                            evidence_data = {
-                                'frame': frame_data['frame'].copy(),
-                                'detections': frame_data.get('detections', [])
-                            }
-                            violation.evidence_frames.append(evidence_data)
-                            break
+        for target, label in target_frames:
+            # Đọc trực tiếp slot theo frame number
+            frame_data = self.frame_buffer.get(target, copy=True)
+            if frame_data is None:
+                continue  # Frame đã bị ghi đè / chưa có
+            
+            # Lưu cả frame và detections
+            violation.evidence_frames.append({
+                'frame': frame_data['frame'],
+                'detections': frame_data['detections'] or [],
+                'label': label
+            })
+        
+        # Post-violation: đăng ký frame tương lai
+        for i, offset in enumerate(self.post_violation_offsets, 1):
+            label = 'post' if len(self.post_violation_offsets) == 1 else f'post_{i}'
+            self._pending_evidence.setdefault(current_frame + offset, []).append((violation, label))
+        
+        self._pending_counts[violation.violation_id] = len(self.post_violation_offsets)
+        if not self.post_violation_offsets:
+            self._finalize_violation(violation)
+    
+    def _fulfill_pending_evidence(self, frame_number: int):
+        """
+        Lấy frame bằng chứng đã đăng ký cho frame này
+        
+        Target đã qua mà không có frame (frame bị bỏ qua / đọc lỗi) thì dùng
+        frame hiện tại - frame gần nhất sau target. Mỗi frame chỉ copy một
+        lần, dùng chung cho các violation cùng target (annotate tạo bản sao).
+        """
+        targets = [t for t in self._pending_evidence if t <= frame_number]
+        if not targets:
+            return
+        
+        frame_data = self.frame_buffer.get(frame_number, copy=True)
+        for target in sorted(targets):
+            for violation, label in self._pending_evidence.pop(target):
+                if frame_data is not None:
+                    violation.evidence_frames.append({
+                        'frame': frame_data['frame'],
+                        'detections': frame_data['detections'] or [],
+                        'label': label
+                    })
+                self._pending_counts[violation.violation_id] -= 1
+                if self._pending_counts[violation.violation_id] == 0:
+                    self._finalize_violation(violation)
+    
+    def _finalize_violation(self, violation: Violation):
+        self._pending_counts.pop(violation.violation_id, None)
+        self._finalized_violations.append(violation)
+    
+    def pop_finalized_violations(self, flush: bool = False) -> List[Violation]:
+        """
+        Violations đã đủ evidence frames (sẵn sàng ghi ra đĩa)
+        
+        Args:
+            flush: Hết video - finalize cả violations còn chờ frame sau vi phạm
+                   (với các frame đã lấy được)
+        """
+        if flush:
+            for target in sorted(self._pending_evidence):
+                for violation, _ in self._pending_evidence[target]:
+                    if violation.violation_id in self._pending_counts:
+                        self._finalize_violation(violation)
+            self._pending_evidence.clear()
+        
+        finalized = self._finalized_violations
+        self._finalized_violations = []
+        return finalized
     
     def save_violation_evidence(self, violation: Violation, 
                                 output_dir: Path) -> List[str]:
@@ -1044,6 +1227,8 @@ class ViolationDetector:
         
         for i, evidence_data in enumerate(violation.evidence_frames):
             label = labels[i] if i < len(labels) else f'frame_{i}'
+            if isinstance(evidence_data, dict):
+                label = evidence_data.get('label', label)
             filename = f"{violation.violation_id}_{label}.jpg"
             filepath = output_dir / filename
             
@@ -1169,9 +1354,14 @@ class ViolationDetector:
     def reset(self):
         """Reset detector state"""
         self.vehicle_states.clear()
+        self._history.clear()
         self.violations.clear()
+        self.session_token = uuid.uuid4().hex[:6]
         self.traffic_light = TrafficLightState()
         self.frame_buffer.clear()
+        self._pending_evidence.clear()
+        self._pending_counts.clear()
+        self._finalized_violations.clear()
         logger.info("🔄 ViolationDetector reset")
 
 
@@ -0,0 +1,290 @@
+"""
+Violation Store
+Lưu violations (Violation.to_dict() + evidence paths) vào SQLite để GUI và
+report generator lọc / phân trang nhanh trên dữ liệu nhiều tuần, nhiều camera
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+from loguru import logger
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS violations (
+    violation_id        TEXT PRIMARY KEY,
+    camera_id           TEXT,
+    location            TEXT,
+    timestamp           TEXT,
+    frame_number        INTEGER,
+    track_id            INTEGER,
+    vehicle_class       TEXT,
+    vehicle_confidence  REAL,
+    light_state         TEXT,
+    red_duration        REAL,
+    status              TEXT,
+    license_plate       TEXT,
+    source_video        TEXT,
+    evidence_paths      TEXT,
+    clip_path           TEXT,
+    record              TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_violations_camera_time ON violations (camera_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations (timestamp);
+CREATE INDEX IF NOT EXISTS idx_violations_class ON violations (vehicle_class);
+CREATE INDEX IF NOT EXISTS idx_violations_status ON violations (status);
+"""
+
+_INSERT = """
+INSERT OR REPLACE INTO violations (
+    violation_id, camera_id, location, timestamp, frame_number, track_id,
+    vehicle_class, vehicle_confidence, light_state, red_duration, status,
+    license_plate, source_video, evidence_paths, clip_path, record
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Project root: db_path tương đối tính từ đây (không phụ thuộc thư mục chạy)
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Cột được phép sort (tránh SQL injection qua order_by)
+SORT_COLUMNS = ('timestamp', 'camera_id', 'vehicle_class', 'status',
+                'vehicle_confidence', 'red_duration', 'violation_id')
+
+
+class ViolationStore:
+    """
+    SQLite store (WAL) cho violation records
+
+    add() gom record vào buffer và ghi theo lô (batch_size record / transaction);
+    flush() / close() ghi phần còn lại. Thread-safe (EvidenceWriter gọi add()
+    từ thread pool). Nhiều process (batch mode, nhiều camera) có thể ghi cùng
+    một file: WAL cho phép đọc song song với ghi, ghi chờ nhau qua busy_timeout.
+
+    Query trả về record dict (cùng format Violation.to_dict() + 'clip_path'),
+    lọc theo camera_id / vehicle_class / status / khoảng thời gian, có
+    limit / offset để phân trang.
+    """
+
+    def __init__(self, db_path: Union[str, Path], batch_size: int = 50):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = max(1, batch_size)
+
+        self._lock = threading.RLock()
+        self._pending: List[tuple] = []
+
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30.0,
+                                     check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['ViolationStore']:
+        """Create store từ config['storage'] (None nếu tắt), db_path tương đối theo project root"""
+        storage_config = config.get('storage', {})
+        if not storage_config.get('enabled', False):
+            return None
+        db_path = Path(storage_config.get('db_path', 'data/violations.db'))
+        if not db_path.is_absolute():
+            db_path = PROJECT_ROOT / db_path
+        return cls(
+            db_path=db_path,
+            batch_size=storage_config.get('batch_size', 50)
+        )
+
+    # ========================================================================
+    # WRITE
+    # ========================================================================
+
+    def add(self, record: Union[dict, 'Violation']):
+        """Thêm / cập nhật một violation (ghi khi đủ batch_size)"""
+        if not isinstance(record, dict):
+            record = record.to_dict()
+
+        row = (
+            record['violation_id'],
+            record.get('camera_id'),
+            record.get('location'),
+            record.get('timestamp'),
+            record.get('frame_number'),
+            record.get('track_id'),
+            record.get('vehicle', {}).get('class'),
+            record.get('vehicle', {}).get('confidence'),
+            record.get('traffic_light', {}).get('state'),
+            record.get('traffic_light', {}).get('red_duration_seconds'),
+            record.get('status'),
+            record.get('license_plate'),
+            record.get('source', {}).get('video'),
+            json.dumps(record.get('evidence_paths', []), ensure_ascii=False),
+            record.get('clip_path'),
+            json.dumps(record, ensure_ascii=False)
+        )
+
+        with self._lock:
+            self._pending.append(row)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def add_many(self, records):
+        for record in records:
+            self.add(record)
+
+    def flush(self):
+        """Ghi các record đang chờ"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(_INSERT, self._pending)
+        logger.debug(f"ViolationStore: {len(self._pending)} records written")
+        self._pending = []
+
+    def update_status(self, violation_id: str, status: str,
+                      officer_note: Optional[str] = None,
+                      license_plate: Optional[str] = None) -> bool:
+        """Cập nhật trạng thái xử lý (Chưa xử lý / Đã xử lý / Đã hủy)"""
+        record = self.get(violation_id)
+        if record is None:
+            return False
+
+        record['status'] = status
+        if officer_note is not None:
+            record['officer_note'] = officer_note
+        if license_plate is not None:
+            record['license_plate'] = license_plate
+
+        with self._lock:
+            self.add(record)
+            self._flush_locked()
+        return True
+
+    # ========================================================================
+    # QUERY
+    # ========================================================================
+
+    @staticmethod
+    def _where(camera_id: Optional[str] = None, vehicle_class: Optional[str] = None,
+               status: Optional[str] = None, start: Optional[datetime] = None,
+               end: Optional[datetime] = None, search: Optional[str] = None) -> tuple:
+        clauses, params = [], []
+        if camera_id:
+            clauses.append("camera_id = ?")
+            params.append(camera_id)
+        if vehicle_class:
+            clauses.append("vehicle_class = ?")
+            params.append(vehicle_class)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if start:
+            clauses.append("timestamp >= ?")
+            params.append(start.isoformat() if isinstance(start, datetime) else start)
+        if end:
+            clauses.append("timestamp < ?")
+            params.append(end.isoformat() if isinstance(end, datetime) else end)
+        if search:
+            clauses.append("(violation_id LIKE ? OR license_plate LIKE ?)")
+            params.extend([f"%{search}%"] * 2)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def query(self, limit: int = 100, offset: int = 0, order_by: str = 'timestamp',
+              descending: bool = True, **filters) -> List[dict]:
+        """
+        Lọc + phân trang violations
+
+        Args:
+            limit / offset: Phân trang
+            order_by: Một trong SORT_COLUMNS
+            **filters: camera_id, vehicle_class, status, start, end, search
+
+        Returns:
+            List record dict
+        """
+        if order_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by '{order_by}' (allowed: {', '.join(SORT_COLUMNS)})")
+
+        where, params = self._where(**filters)
+        direction = 'DESC' if descending else 'ASC'
+        sql = (f"SELECT record, clip_path FROM violations{where} "
+               f"ORDER BY {order_by} {direction}, violation_id {direction} LIMIT ? OFFSET ?")
+
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit, offset)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def count(self, **filters) -> int:
+        """Số violations khớp filters"""
+        where, params = self._where(**filters)
+        self.flush()
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM violations{where}", params).fetchone()[0]
+
+    def get(self, violation_id: str) -> Optional[dict]:
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record, clip_path FROM violations WHERE violation_id = ?",
+                (violation_id,)).fetchone()
+        return self._to_record(row) if row else None
+
+    def iter_records(self, page_size: int = 500, **filters) -> Iterator[dict]:
+        """Duyệt tất cả records khớp filters theo trang (cũ -> mới)"""
+        offset = 0
+        while True:
+            page = self.query(limit=page_size, offset=offset, descending=False, **filters)
+            yield from page
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+    def iter_violations(self, page_size: int = 500, **filters) -> Iterator['Violation']:
+        """Như iter_records() nhưng trả về Violation objects (cho report generator)"""
+        from .violation_logic import Violation
+
+        for record in self.iter_records(page_size, **filters):
+            yield Violation.from_dict(record)
+
+    def distinct(self, column: str) -> List[str]:
+        """Giá trị khác nhau của một cột (cho combo box filter)"""
+        if column not in ('camera_id', 'vehicle_class', 'status', 'location'):
+            raise ValueError(f"Unsupported column: {column}")
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT {column} FROM violations WHERE {column} IS NOT NULL "
+                f"ORDER BY {column}").fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> dict:
+        record = json.loads(row['record'])
+        if row['clip_path']:
+            record['clip_path'] = row['clip_path']
+        return record
+
+    # ========================================================================
+    # LIFECYCLE
+    # ========================================================================
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+    def __enter__(self) -> 'ViolationStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
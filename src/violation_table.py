@@ -0,0 +1,171 @@
+"""
+Violation Table Model (Qt model/view)
+Bảng vi phạm cho GUI: chỉ thêm dòng mới (không dựng lại cả bảng mỗi frame),
+lịch sử load lazy theo trang từ ViolationStore, sort / filter qua proxy model
+"""
+
+from typing import Dict, List, Optional
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+# (header, hàm lấy giá trị thô từ record - dùng để sort)
+COLUMNS = [
+    ("ID", lambda r: r['violation_id']),
+    ("Thời gian", lambda r: r['timestamp']),
+    ("Frame", lambda r: r['frame_number']),
+    ("Loại xe", lambda r: r['vehicle']['class']),
+    ("Trạng thái đèn", lambda r: r['traffic_light']['state']),
+    ("Độ tin cậy", lambda r: r['vehicle']['confidence']),
+    ("Tình trạng", lambda r: r['status']),
+]
+
+SORT_ROLE = Qt.UserRole + 1
+
+
+def _display(column: int, value) -> str:
+    if column == 1:
+        return str(value).replace('T', ' ')[:19]
+    if column == 5:
+        return f"{value:.2f}"
+    return str(value)
+
+
+class ViolationTableModel(QAbstractTableModel):
+    """
+    Model bảng vi phạm (record = Violation.to_dict())
+
+    append_violations() chỉ insert các dòng mới (beginInsertRows) nên chi phí
+    mỗi frame = O(số vi phạm mới), không phụ thuộc tổng số dòng. Có store:
+    lịch sử được load theo trang khi view cuộn tới cuối (canFetchMore /
+    fetchMore), không load hết khi mở GUI. Model không ghi vào store: record
+    được EvidenceWriter thêm sau khi ảnh bằng chứng đã ghi.
+    """
+
+    def __init__(self, store=None, page_size: int = 200, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+
+        self._records: List[dict] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._violations: Dict[str, object] = {}  # Violation objects của session hiện tại
+
+        self._history_offset = 0
+        self._history_done = store is None
+
+    # ========================================================================
+    # QAbstractTableModel
+    # ========================================================================
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._records)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        record = self._records[index.row()]
+        value = COLUMNS[index.column()][1](record)
+
+        if role == Qt.DisplayRole:
+            return _display(index.column(), value)
+        if role == SORT_ROLE:
+            return value
+        if role == Qt.ForegroundRole and index.column() == 6 and record['status'] == 'Chưa xử lý':
+            return Qt.red
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self._history_done
+
+    def fetchMore(self, parent=QModelIndex()):
+        """Load trang lịch sử tiếp theo từ store (mới -> cũ)"""
+        if parent.isValid() or self._history_done:
+            return
+
+        page = self.store.query(limit=self.page_size, offset=self._history_offset)
+        self._history_offset += len(page)
+        if len(page) < self.page_size:
+            self._history_done = True
+
+        self._insert([r for r in page if r['violation_id'] not in self._row_by_id])
+
+    # ========================================================================
+    # UPDATE
+    # ========================================================================
+
+    def append_violations(self, violations: list):
+        """Thêm violations mới phát hiện (gọi từ UI thread)"""
+        records = []
+        for violation in violations:
+            if violation.violation_id in self._row_by_id:
+                continue
+            self._violations[violation.violation_id] = violation
+            records.append(violation.to_dict())
+
+        # Dòng của session hiện tại xuất hiện lại trong trang lịch sử thì
+        # fetchMore bỏ qua (theo violation_id)
+        self._insert(records)
+
+    def _insert(self, records: List[dict]):
+        if not records:
+            return
+        first = len(self._records)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        for i, record in enumerate(records):
+            self._row_by_id[record['violation_id']] = first + i
+            self._records.append(record)
+        self.endInsertRows()
+
+    def record(self, row: int) -> dict:
+        return self._records[row]
+
+    def violation(self, row: int):
+        """Violation object (có evidence frames trong RAM) nếu thuộc session hiện tại"""
+        return self._violations.get(self._records[row]['violation_id'])
+
+    def clear(self):
+        self.beginResetModel()
+        self._records.clear()
+        self._row_by_id.clear()
+        self._violations.clear()
+        self._history_offset = 0
+        self._history_done = self.store is None
+        self.endResetModel()
+
+
+class ViolationFilterProxy(QSortFilterProxyModel):
+    """Sort theo giá trị thô (SORT_ROLE) + filter theo loại xe / tình trạng / text"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.setFilterKeyColumn(0)
+        self.setDynamicSortFilter(True)
+        self.vehicle_class: Optional[str] = None
+        self.status: Optional[str] = None
+
+    def set_vehicle_class(self, vehicle_class: Optional[str]):
+        self.vehicle_class = vehicle_class or None
+        self.invalidateFilter()
+
+    def set_status(self, status: Optional[str]):
+        self.status = status or None
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row: int, source_parent: QModelIndex) -> bool:
+        record = self.sourceModel().record(source_row)
+        if self.vehicle_class and record['vehicle']['class'] != self.vehicle_class:
+            return False
+        if self.status and record['status'] != self.status:
+            return False
+        return super().filterAcceptsRow(source_row, source_parent)